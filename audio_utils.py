@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音频工具
+MP3 帧解析，以及线性时间、不重新编码的音频拼接：
+  - 格式一致的 MP3 直接按帧拼接（流复制）
+  - 其他格式一致的文件使用 ffmpeg concat demuxer 流复制
+  - 只有格式不一致时才解码后拼接
+以及只读文件头的时长探测（按路径、大小和修改时间缓存）
+"""
+
+import os
+import io
+import json
+import wave
+import tempfile
+import struct
+import subprocess
+import threading
+import logging
+from typing import List, Optional, Dict, Tuple
+
+# 探测时长时读取的文件头大小（足够覆盖常见的 ID3v2 标签和 Xing/VBRI 帧）
+DURATION_PROBE_HEAD_BYTES = 256 * 1024
+
+logger = logging.getLogger(__name__)
+
+# 时长缓存：绝对路径 -> (大小, 修改时间, 时长)
+_duration_cache: Dict[str, Tuple[int, int, float]] = {}
+_duration_cache_lock = threading.Lock()
+
+# MPEG 版本位 -> 版本号（2.5 / 保留 / 2 / 1）
+_MPEG_VERSIONS = {0: 2.5, 2: 2, 3: 1}
+
+# 层位 -> 层号
+_MPEG_LAYERS = {1: 3, 2: 2, 3: 1}
+
+# 比特率表（kbps），按 (版本是否为 1, 层) 索引
+_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# 采样率表（Hz）
+_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+
+def skip_id3v2(data: bytes) -> int:
+    """返回跳过 ID3v2 标签后的偏移"""
+    if len(data) >= 10 and data[:3] == b'ID3':
+        size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def parse_frame_header(data: bytes, offset: int) -> Optional[Dict]:
+    """解析 offset 处的 MPEG 音频帧头，不是合法帧头时返回 None"""
+    if offset + 4 > len(data):
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = _MPEG_VERSIONS.get((b1 >> 3) & 0x03)
+    layer = _MPEG_LAYERS.get((b1 >> 1) & 0x03)
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    bitrate = _BITRATES[(version == 1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+    channel_mode = (b3 >> 6) & 0x03
+
+    if layer == 1:
+        samples = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or version == 1:
+        samples = 1152
+        frame_length = 144 * bitrate // sample_rate + padding
+    else:
+        samples = 576
+        frame_length = 72 * bitrate // sample_rate + padding
+
+    return {
+        'version': version,
+        'layer': layer,
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+        'channels': 1 if channel_mode == 3 else 2,
+        'channel_mode': channel_mode,
+        'samples': samples,
+        'frame_length': frame_length,
+    }
+
+
+def _side_info_length(header: Dict) -> int:
+    """Layer III 侧信息长度（Xing/Info 标签紧跟其后）"""
+    if header['version'] == 1:
+        return 17 if header['channels'] == 1 else 32
+    return 9 if header['channels'] == 1 else 17
+
+
+def is_vbr_info_frame(data: bytes, offset: int, header: Dict) -> bool:
+    """判断是否为 Xing/Info/VBRI 信息帧（不含音频数据，拼接时需跳过）"""
+    xing_offset = offset + 4 + _side_info_length(header)
+    if data[xing_offset:xing_offset + 4] in (b'Xing', b'Info'):
+        return True
+    return data[offset + 36:offset + 40] == b'VBRI'
+
+
+def find_first_frame(data: bytes, offset: int = 0, end: Optional[int] = None) -> Optional[Tuple[int, Dict]]:
+    """在 [offset, end) 内寻找第一个可信的帧（要求下一帧也能接上，避免误判同步字）"""
+    end = len(data) if end is None else end
+    while offset < end - 4:
+        offset = data.find(b'\xff', offset, end)
+        if offset < 0:
+            return None
+        header = parse_frame_header(data, offset)
+        if header and header['frame_length'] > 0:
+            next_offset = offset + header['frame_length']
+            next_header = parse_frame_header(data, next_offset) if next_offset + 4 <= end else None
+            if next_offset >= end or (next_header and next_header['sample_rate'] == header['sample_rate']):
+                return offset, header
+        offset += 1
+    return None
+
+
+def parse_mp3(data: bytes) -> Dict:
+    """
+    解析 MP3 数据
+
+    Returns:
+        {'format': (版本, 层, 采样率, 声道数), 'frames': [(开始, 结束), ...],
+         'samples': 总采样数, 'duration': 时长（秒）, 'info_frame': 信息帧头或 None}
+    """
+    audio_end = len(data)
+    if audio_end >= 128 and data[audio_end - 128:audio_end - 125] == b'TAG':
+        audio_end -= 128
+
+    first = find_first_frame(data, skip_id3v2(data), audio_end)
+    if not first:
+        raise ValueError("未找到 MP3 帧")
+
+    offset, header = first
+    audio_format = (header['version'], header['layer'], header['sample_rate'], header['channels'])
+    info_frame = None
+    frames = []
+    samples = 0
+
+    if is_vbr_info_frame(data, offset, header):
+        info_frame = (offset, header)
+        offset += header['frame_length']
+
+    while offset < audio_end:
+        header = parse_frame_header(data, offset)
+        if not header or header['frame_length'] <= 0:
+            # 帧间有杂数据时重新同步
+            found = find_first_frame(data, offset + 1, audio_end)
+            if not found:
+                break
+            offset, header = found
+        frame_end = min(offset + header['frame_length'], audio_end)
+        frames.append((offset, frame_end))
+        samples += header['samples']
+        offset = frame_end
+
+    return {
+        'format': audio_format,
+        'frames': frames,
+        'samples': samples,
+        'duration': samples / audio_format[2],
+        'info_frame': info_frame,
+    }
+
+
+def concat_mp3_bytes(chunks: List[bytes]) -> Tuple[bytes, List[float]]:
+    """
+    按帧拼接多段 MP3 数据，线性时间、不重新编码
+
+    各段的 ID3 标签和 Xing/Info 信息帧会被去掉。每段编码器自带的前后填充
+    （几十毫秒）会保留在拼接处。
+
+    Returns:
+        (拼接后的数据, 每段时长列表（秒）)
+
+    Raises:
+        ValueError: 各段的版本/层/采样率/声道数不一致，无法直接按帧拼接
+    """
+    parsed = [parse_mp3(chunk) for chunk in chunks]
+    formats = {p['format'] for p in parsed}
+    if len(formats) > 1:
+        raise ValueError(f"MP3 格式不一致，无法按帧拼接: {formats}")
+
+    pieces = []
+    for chunk, info in zip(chunks, parsed):
+        view = memoryview(chunk)
+        pieces.extend(view[start:end] for start, end in info['frames'])
+    return b''.join(pieces), [p['duration'] for p in parsed]
+
+
+def probe_audio_format(path: str) -> Optional[Tuple]:
+    """读取音频的编码格式，用于判断能否流复制拼接"""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == '.mp3':
+            with open(path, 'rb') as f:
+                head = f.read(256 * 1024)
+            found = find_first_frame(head, skip_id3v2(head))
+            if found:
+                header = found[1]
+                return ('mp3', header['version'], header['layer'], header['sample_rate'], header['channels'])
+        elif ext == '.wav':
+            with wave.open(path, 'rb') as w:
+                return ('wav', w.getframerate(), w.getnchannels(), w.getsampwidth())
+
+        cmd = ['ffprobe', '-v', 'error', '-select_streams', 'a:0',
+               '-show_entries', 'stream=codec_name,sample_rate,channels,sample_fmt',
+               '-of', 'json', path]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        stream = json.loads(result.stdout)['streams'][0]
+        return (stream['codec_name'], stream['sample_rate'], stream['channels'], stream.get('sample_fmt'))
+    except Exception as e:
+        logger.warning(f"读取音频格式失败 {path}: {e}")
+        return None
+
+
+def concat_audio_files(paths: List[str], output_path: str) -> List[float]:
+    """
+    拼接多个音频文件到 output_path
+
+    MP3 且格式一致时按帧流复制；其他格式一致时用 ffmpeg concat demuxer 流复制；
+    格式不一致时才解码拼接。
+
+    Returns:
+        每个输入文件的时长列表（秒），可用于计算偏移
+    """
+    if not paths:
+        raise ValueError("没有需要拼接的音频文件")
+
+    formats = [probe_audio_format(p) for p in paths]
+    same_format = None not in formats and len(set(formats)) == 1
+    out_ext = os.path.splitext(output_path)[1].lower()
+    tmp_path = f"{output_path}.tmp{out_ext}"
+
+    try:
+        if same_format and formats[0][0] == 'mp3' and out_ext == '.mp3':
+            durations = _concat_mp3_files(paths, tmp_path)
+        elif same_format and os.path.splitext(paths[0])[1].lower() == out_ext:
+            durations = _concat_with_demuxer(paths, tmp_path)
+        else:
+            logger.info(f"音频格式不一致，解码后拼接: {set(formats)}")
+            durations = _concat_with_decode(paths, tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    logger.info(f"拼接 {len(paths)} 个音频 -> {output_path}，总时长 {sum(durations):.2f}s")
+    return durations
+
+
+def _concat_mp3_files(paths: List[str], output_path: str) -> List[float]:
+    durations = []
+    with open(output_path, 'wb') as out:
+        for path in paths:
+            with open(path, 'rb') as f:
+                data = f.read()
+            info = parse_mp3(data)
+            view = memoryview(data)
+            for start, end in info['frames']:
+                out.write(view[start:end])
+            durations.append(info['duration'])
+    return durations
+
+
+def _concat_with_demuxer(paths: List[str], output_path: str) -> List[float]:
+    fd, list_file = tempfile.mkstemp(suffix='.txt')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for path in paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        cmd = ['ffmpeg', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_file,
+               '-c', 'copy', '-y', output_path]
+        subprocess.run(cmd, capture_output=True, check=True)
+    finally:
+        os.remove(list_file)
+    return [ffprobe_duration(p) or 0.0 for p in paths]
+
+
+def _join_decoded(segments):
+    """统一到第一段的参数后一次性拼接原始 PCM，避免 += 反复复制整个缓冲区"""
+    first = segments[0]
+    segments = [s.set_frame_rate(first.frame_rate).set_channels(first.channels).set_sample_width(first.sample_width)
+                for s in segments]
+    return first._spawn(b''.join(s.raw_data for s in segments))
+
+
+def _concat_with_decode(paths: List[str], output_path: str) -> List[float]:
+    from pydub import AudioSegment
+
+    segments = [AudioSegment.from_file(p) for p in paths]
+    out_format = os.path.splitext(output_path)[1].lstrip('.').lower() or 'mp3'
+    _join_decoded(segments).export(output_path, format=out_format)
+    return [len(s) / 1000.0 for s in segments]
+
+
+def ffprobe_duration(path: str) -> Optional[float]:
+    """使用 ffprobe 读取时长（秒）"""
+    try:
+        cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+               '-of', 'default=noprint_wrappers=1:nokey=1', path]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return float(result.stdout.strip())
+    except Exception as e:
+        logger.warning(f"ffprobe 读取时长失败 {path}: {e}")
+        return None
+
+
+def _mp3_header_duration(head: bytes, file_size: int, tail: bytes) -> Optional[float]:
+    """根据 Xing/Info、VBRI 帧或 CBR 比特率计算 MP3 时长，不扫描全部帧"""
+    found = find_first_frame(head, skip_id3v2(head))
+    if not found:
+        return None
+    offset, header = found
+
+    xing_offset = offset + 4 + _side_info_length(header)
+    if head[xing_offset:xing_offset + 4] in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', head[xing_offset + 4:xing_offset + 8])[0]
+        if flags & 0x01:
+            frames = struct.unpack('>I', head[xing_offset + 8:xing_offset + 12])[0]
+            return frames * header['samples'] / header['sample_rate']
+
+    if head[offset + 36:offset + 40] == b'VBRI':
+        frames = struct.unpack('>I', head[offset + 50:offset + 54])[0]
+        return frames * header['samples'] / header['sample_rate']
+
+    # 没有 VBR 信息帧时按 CBR 处理：音频字节数 / 比特率
+    audio_bytes = file_size - offset
+    if tail[:3] == b'TAG':  # ID3v1 标签
+        audio_bytes -= 128
+    return max(0, audio_bytes) * 8 / header['bitrate']
+
+
+def _wav_header_duration(head: bytes, file_size: int) -> Optional[float]:
+    """遍历 RIFF 块，按 fmt 块的字节率和 data 块的大小计算 WAV 时长"""
+    if head[:4] != b'RIFF' or head[8:12] != b'WAVE':
+        return None
+
+    byte_rate = None
+    pos = 12
+    while pos + 8 <= len(head):
+        chunk_id = head[pos:pos + 4]
+        chunk_size = struct.unpack('<I', head[pos + 4:pos + 8])[0]
+        if chunk_id == b'fmt ':
+            byte_rate = struct.unpack('<I', head[pos + 16:pos + 20])[0]
+        elif chunk_id == b'data':
+            if not byte_rate:
+                return None
+            # 流式写出的 WAV 可能没有回填 data 大小
+            data_size = min(chunk_size, file_size - pos - 8)
+            return data_size / byte_rate
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def probe_audio_duration(path: str) -> Optional[float]:
+    """
+    获取音频时长（秒），只读文件头，不解码
+
+    MP3 读取 Xing/Info/VBRI 帧或按 CBR 比特率计算，WAV 读取 RIFF 头，
+    其他格式或解析失败时使用 ffprobe。结果按 (路径, 大小, 修改时间) 缓存。
+
+    Returns:
+        时长（秒），无法获取时返回 None
+    """
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        logger.warning(f"读取音频时长失败 {path}: {e}")
+        return None
+
+    key = os.path.abspath(path)
+    with _duration_cache_lock:
+        cached = _duration_cache.get(key)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+
+    duration = None
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext in ('.mp3', '.wav'):
+            with open(path, 'rb') as f:
+                head = f.read(DURATION_PROBE_HEAD_BYTES)
+                tail = b''
+                if st.st_size >= 128:
+                    f.seek(-128, os.SEEK_END)
+                    tail = f.read(128)
+            if ext == '.mp3':
+                duration = _mp3_header_duration(head, st.st_size, tail)
+            else:
+                duration = _wav_header_duration(head, st.st_size)
+    except (OSError, struct.error) as e:
+        logger.warning(f"解析音频头失败 {path}: {e}")
+
+    if duration is None:
+        duration = ffprobe_duration(path)
+    if duration is None:
+        return None
+
+    with _duration_cache_lock:
+        _duration_cache[key] = (st.st_size, st.st_mtime_ns, duration)
+    return duration
+
+
+def decode_concat_mp3_bytes(chunks: List[bytes]) -> bytes:
+    """格式不一致时的兜底：解码后一次性拼接再编码为 MP3"""
+    from pydub import AudioSegment
+
+    segments = [AudioSegment.from_file(io.BytesIO(c), format="mp3") for c in chunks]
+    output = io.BytesIO()
+    _join_decoded(segments).export(output, format="mp3")
+    return output.getvalue()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+草稿生成微基准
+用合成的故事（静音 WAV + 逐词 SRT）测量单个故事的草稿生成耗时，
+对比编译模板工厂与逐个 deepcopy 两种方式，并校验两者输出一致
+"""
+
+import os
+import sys
+import time
+import uuid
+import wave
+import hashlib
+import logging
+import argparse
+import tempfile
+import itertools
+import statistics
+
+import draft_gen
+from data_models import StoryContent
+from srt_utils import format_srt, format_srt_time
+
+
+def build_story(work_dir: str, dialogues: int, words: int) -> StoryContent:
+    """生成合成故事：每段对话 3 个视频片段、一段静音语音和逐词字幕"""
+    dialogue_data = []
+    position = 10.0
+    for i in range(dialogues):
+        segments = []
+        for _ in range(3):
+            segments.append({'start': format_srt_time(position), 'end': format_srt_time(position + 1.5)})
+            position += 1.5
+        position += 0.5
+        dialogue_data.append({'index': i, 'video_segments': segments, 'chinese': '测试', 'english': 'word ' * words})
+
+    story = StoryContent('Benchmark Story Title #bench', 1, dialogues, dialogue_data)
+    word_seconds = 0.25
+    for dialogue in story.dialogue_list:
+        audio_path = os.path.join(work_dir, f"story_1_dialogue_{dialogue.index}.wav")
+        with wave.open(audio_path, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(b'\0\0' * int(16000 * words * word_seconds))
+
+        entries = [{'start': k * word_seconds, 'end': (k + 1) * word_seconds, 'text': f"Word{k},"}
+                   for k in range(words)]
+        srt_path = os.path.join(work_dir, f"story_1_dialogue_{dialogue.index}.srt")
+        with open(srt_path, 'w', encoding='utf-8') as f:
+            f.write(format_srt(entries))
+
+        dialogue.audio_path = audio_path
+        dialogue.srt_path = srt_path
+    return story
+
+
+def deterministic_ids():
+    """固定 ID 序列，使两种模式的输出可以逐字节比较"""
+    counter = itertools.count()
+    draft_gen.generate_uuid = lambda: str(uuid.UUID(int=next(counter))).upper()
+    draft_gen.uuid.uuid4 = lambda: uuid.UUID(int=next(counter))
+
+
+def run(story: StoryContent, video_path: str, work_dir: str, compiled: bool, repeat: int):
+    """返回 (每次耗时列表, 最后一次输出的哈希)"""
+    draft_gen.USE_COMPILED_TEMPLATES = compiled
+    generator = draft_gen.DraftGenerator(output_dir=os.path.join(work_dir, 'drafts'),
+                                         background_audio_path=None)
+    timings = []
+    digest = None
+    for i in range(repeat):
+        deterministic_ids()
+        start = time.perf_counter()
+        draft_file = generator.generate_from_story(story, video_path, i, 'BENCH')
+        timings.append(time.perf_counter() - start)
+        with open(draft_file, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    return timings, digest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="草稿生成微基准")
+    parser.add_argument('--dialogues', type=int, default=20, help='每个故事的对话数')
+    parser.add_argument('--words', type=int, default=10, help='每段对话的字幕词数')
+    parser.add_argument('--repeat', type=int, default=10, help='每种模式生成的故事数')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    original_uuid4 = draft_gen.uuid.uuid4
+    with tempfile.TemporaryDirectory() as work_dir:
+        story = build_story(work_dir, args.dialogues, args.words)
+        video_path = os.path.join(work_dir, 'bench.mp4')
+        with open(video_path, 'wb') as f:
+            f.write(b'\0' * 1024)
+
+        # 预热：解析模板
+        draft_gen.get_draft_template(draft_gen.DEFAULT_TEMPLATE_FILE)
+
+        results = {}
+        try:
+            for label, compiled in (('deepcopy', False), ('compiled', True)):
+                results[label] = run(story, video_path, work_dir, compiled, args.repeat)
+        finally:
+            draft_gen.uuid.uuid4 = original_uuid4
+            draft_gen.USE_COMPILED_TEMPLATES = True
+
+    print(f"故事: {args.dialogues} 段对话 x 3 个视频片段, {args.dialogues * args.words} 个字幕词, 重复 {args.repeat} 次")
+    for label, (timings, _) in results.items():
+        print(f"  {label:<9} 中位数 {statistics.median(timings) * 1000:8.2f} ms/故事  最小 {min(timings) * 1000:8.2f} ms")
+
+    identical = results['deepcopy'][1] == results['compiled'][1]
+    print(f"  输出一致: {'是' if identical else '否'}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,6 +20,7 @@ class StoryDialogue:
         self.english = english
         self.audio_path: Optional[str] = None
         self.srt_path: Optional[str] = None
+        self.audio_duration: Optional[float] = None  # 语音时长（秒），TTS 完成后写入
 
     def to_dict(self) -> Dict:
         return {
@@ -28,7 +29,29 @@ class StoryDialogue:
             'chinese': self.chinese,
             'english': self.english,
             'audio_path': self.audio_path,
-            'srt_path': self.srt_path
+            'srt_path': self.srt_path,
+            'audio_duration': self.audio_duration
+        }
+
+
+class StoryPart:
+    """故事成片 - 长故事按对话边界拆成的一段，每段单独生成草稿并导出"""
+    def __init__(self, part_index: int,
+                 dialogue_indices: List[int],  # 该段包含的对话 index
+                 duration: float):  # 嵌套时间线上的时长（秒，加速前）
+        self.part_index = part_index
+        self.dialogue_indices = dialogue_indices
+        self.duration = duration
+        self.draft_path: Optional[str] = None  # 草稿文件路径
+        self.exported_video_path: Optional[str] = None  # 导出视频路径
+
+    def to_dict(self) -> Dict:
+        return {
+            'part_index': self.part_index,
+            'dialogue_indices': self.dialogue_indices,
+            'duration': self.duration,
+            'draft_path': self.draft_path,
+            'exported_video_path': self.exported_video_path
         }
 
 
@@ -43,6 +66,9 @@ class StoryContent:
         self.end_index = end_index
         self.dialogue_list: List[StoryDialogue] = []
         self.exported_video_path: Optional[str] = None  # 导出视频路径
+        self.narration_path: Optional[str] = None  # 整段旁白音频路径（单文件旁白模式）
+        self.narration_map_path: Optional[str] = None  # 旁白中各对话起止时间的映射文件
+        self.parts: List[StoryPart] = []  # 成片分段，生成草稿时写入
 
         # 将字典数据转换为 StoryDialogue 对象
         for d in dialogue:
@@ -60,9 +86,17 @@ class StoryContent:
             'start_index': self.start_index,
             'end_index': self.end_index,
             'dialogue': [d.to_dict() for d in self.dialogue_list],
-            'exported_video_path': self.exported_video_path
+            'exported_video_path': self.exported_video_path,
+            'narration_path': self.narration_path,
+            'narration_map_path': self.narration_map_path,
+            'parts': [part.to_dict() for part in self.parts]
         }
 
+    def exported_video_paths(self) -> List[str]:
+        """全部导出视频路径（整个故事或各个成片）"""
+        paths = [self.exported_video_path] + [part.exported_video_path for part in self.parts]
+        return list(dict.fromkeys(path for path in paths if path))
+
 
 class VideoSegment:
     """视频段数据结构"""
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+草稿打包导出客户端
+把草稿文件夹作为一个 tar 流发送给远程导出服务（不再依赖两边能看到同一路径），
+文件按内容摘要去重：服务端已有的素材不再发送；导出的 MP4 流式传回本地
+服务端协议见 draft_bundle_server.py
+"""
+
+import io
+import os
+import json
+import time
+import queue
+import tarfile
+import threading
+import requests
+import logging
+from typing import Dict, Iterator, List, Optional, Set
+
+from jy_export import EXPORT_VIDEO_TARGET_DIR
+from export_cache import get_digest_index
+
+# 打包导出服务地址，未配置时使用 EXPORT_VIDEO_URL
+EXPORT_BUNDLE_URL = os.environ.get('EXPORT_BUNDLE_URL') or os.environ.get('EXPORT_VIDEO_URL', 'http://localhost:51053')
+
+# 上传和下载的分块大小（字节）
+BUNDLE_CHUNK_SIZE = 1024 * 1024
+
+# 服务端报告缺少文件（例如刚被清理）时的重试次数
+BUNDLE_RETRIES = 1
+
+logger = logging.getLogger(__name__)
+
+
+class _QueueWriter:
+    """tarfile 的输出端：写入的数据放入有界队列，由上传线程逐块取走"""
+
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        self.chunks = chunks
+        self.cancelled = cancelled
+
+    def write(self, data) -> int:
+        while True:
+            if self.cancelled.is_set():
+                raise IOError("上传已中止")
+            try:
+                self.chunks.put(bytes(data), timeout=1)
+                return len(data)
+            except queue.Full:
+                continue
+
+
+def iter_bundle(manifest: Dict, files: Dict[str, str]) -> Iterator[bytes]:
+    """
+    生成草稿包的 tar 流：manifest.json + blobs/<sha256>
+
+    Args:
+        manifest: 草稿清单
+        files: 需要发送的文件 {sha256: 本地路径}
+    """
+    chunks: queue.Queue = queue.Queue(maxsize=16)
+    cancelled = threading.Event()
+    errors = []
+
+    def produce():
+        try:
+            with tarfile.open(fileobj=_QueueWriter(chunks, cancelled), mode='w|', bufsize=BUNDLE_CHUNK_SIZE) as tar:
+                data = json.dumps(manifest, ensure_ascii=False).encode('utf-8')
+                info = tarfile.TarInfo('manifest.json')
+                info.size = len(data)
+                info.mtime = int(time.time())
+                tar.addfile(info, io.BytesIO(data))
+                for digest, path in files.items():
+                    info = tarfile.TarInfo(f"blobs/{digest}")
+                    info.size = os.path.getsize(path)
+                    info.mtime = int(os.path.getmtime(path))
+                    with open(path, 'rb') as f:
+                        tar.addfile(info, f)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    done = threading.Event()
+    threading.Thread(target=produce, name='bundle-tar', daemon=True).start()
+    try:
+        while not (done.is_set() and chunks.empty()):
+            try:
+                yield chunks.get(timeout=0.1)
+            except queue.Empty:
+                continue
+    finally:
+        # 上传提前结束（服务端报错或连接断开）时让打包线程退出
+        cancelled.set()
+    if errors:
+        raise errors[0]
+
+
+class BundleVideoExporter:
+    """打包导出器，export_video / test_export_service 与 VideoExporter 一致"""
+
+    def __init__(self, export_url: Optional[str] = None, output_dir: str = EXPORT_VIDEO_TARGET_DIR):
+        """
+        Args:
+            export_url: 打包导出服务URL
+            output_dir: 传回的视频保存目录
+        """
+        self.export_url = export_url or EXPORT_BUNDLE_URL
+        self.output_dir = output_dir
+        self.digests = get_digest_index()
+        # requests.Session 不保证线程安全，导出队列并发调用时每个线程使用独立的会话
+        self._local = threading.local()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def session(self) -> requests.Session:
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def build_manifest(self, draft_abs_path: str) -> Dict:
+        """草稿文件夹清单：相对路径、大小和内容摘要"""
+        entries = []
+        for root, dirs, names in os.walk(draft_abs_path):
+            dirs.sort()
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                if not os.path.isfile(path):
+                    continue
+                entries.append({
+                    'path': os.path.relpath(path, draft_abs_path).replace(os.sep, '/'),
+                    'size': os.path.getsize(path),
+                    'sha256': self.digests.digest(path),
+                })
+        return {'draft_name': os.path.basename(os.path.normpath(draft_abs_path)), 'files': entries}
+
+    def export_video(self, draft_abs_path: str, move_to_target: bool = False) -> Optional[str]:
+        """
+        打包发送草稿并下载导出的视频
+
+        Returns:
+            成功返回本地视频文件路径，失败返回None
+        """
+        try:
+            manifest = self.build_manifest(draft_abs_path)
+            local_paths = {entry['sha256']: os.path.join(draft_abs_path, entry['path']) for entry in manifest['files']}
+            total_bytes = sum(entry['size'] for entry in manifest['files'])
+            self.logger.info(f"正在打包导出草稿: {manifest['draft_name']}")
+
+            missing = self._check(list(local_paths))
+            for attempt in range(BUNDLE_RETRIES + 1):
+                files = {digest: local_paths[digest] for digest in missing}
+                sent_bytes = sum(os.path.getsize(path) for path in files.values())
+                self.logger.info(f"发送 {len(files)}/{len(local_paths)} 个文件, "
+                                 f"{sent_bytes / 1048576:.1f}/{total_bytes / 1048576:.1f} MB（其余服务端已有）")
+
+                start = time.time()
+                # 流式响应在 with 结束时关闭，重试和失败时也把连接归还连接池
+                with self.session.post(f"{self.export_url}/api/bundle/export",
+                                       data=iter_bundle(manifest, files),
+                                       headers={'Content-Type': 'application/x-tar'},
+                                       stream=True, timeout=(10, 3600)) as response:
+                    if response.status_code == 409 and attempt < BUNDLE_RETRIES:
+                        missing = set(response.json().get('missing', [])) & set(local_paths)
+                        self.logger.warning(f"服务端缺少 {len(missing)} 个文件，重新发送")
+                        continue
+                    if response.status_code != 200:
+                        try:
+                            detail = response.json().get('detail', 'Unknown error')
+                        except ValueError:
+                            detail = f"HTTP {response.status_code}"
+                        self.logger.error(f"打包导出失败: {detail}")
+                        return None
+
+                    output_path = self._download(response, manifest['draft_name'])
+                    self.logger.info(f"视频导出成功 ({time.time() - start:.1f}s): {output_path}")
+                    return output_path
+            return None
+
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"无法连接到打包导出服务 {self.export_url}: {e}")
+            return None
+        except Exception as e:
+            self.logger.error(f"打包导出过程中发生错误: {e}")
+            return None
+
+    def _check(self, digests: List[str]) -> Set[str]:
+        """询问服务端缺少哪些文件"""
+        response = self.session.post(f"{self.export_url}/api/bundle/check", json={'digests': digests}, timeout=30)
+        response.raise_for_status()
+        return set(response.json().get('missing', [])) & set(digests)
+
+    def _download(self, response: requests.Response, draft_name: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        output_path = os.path.abspath(os.path.join(self.output_dir, f"{draft_name}.mp4"))
+        tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(BUNDLE_CHUNK_SIZE):
+                    f.write(chunk)
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return output_path
+
+    def test_export_service(self) -> bool:
+        """测试打包导出服务是否可用"""
+        try:
+            response = self.session.get(f"{self.export_url}/api/test", timeout=5)
+            if response.status_code == 200 and response.json().get('status') == 'success':
+                self.logger.info("打包导出服务测试成功")
+                return True
+        except Exception as e:
+            self.logger.error(f"打包导出服务测试失败: {e}")
+        self.logger.error("打包导出服务不可用")
+        return False
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+草稿打包导出服务（本地替身）
+只用标准库实现 draft_bundle.py 的服务端协议，可在导出机器上运行，也可在本机测试：
+
+    GET  /api/test           -> {"status": "success"}
+    POST /api/bundle/check   {"digests": [...]} -> {"missing": [...]}
+    POST /api/bundle/export  tar 流（manifest.json + blobs/<sha256>）-> MP4 流
+                             清单中的文件缺失时返回 409 {"missing": [...]}
+
+收到的文件按 SHA-256 存入 blob 存储，草稿文件夹用硬链接重建后交给导出引擎：
+默认用本地 ffmpeg 渲染（FFmpegRenderer），指定 --export-url 时转交同机的剪映导出服务
+
+用法: python draft_bundle_server.py [--port 51054] [--store ./output/bundle_store] [--export-url http://localhost:51053]
+"""
+
+import io
+import os
+import re
+import json
+import shutil
+import hashlib
+import tarfile
+import tempfile
+import argparse
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from draft_bundle import BUNDLE_CHUNK_SIZE
+from ffmpeg_render import FFmpegRenderer
+from jy_export import VideoExporter
+from material_store import hardlink
+
+# 服务端 blob 存储目录
+BUNDLE_STORE_DIR = os.environ.get('BUNDLE_STORE_DIR', './output/bundle_store')
+
+_DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+logger = logging.getLogger(__name__)
+
+
+def _valid_digest(digest) -> bool:
+    """blob 名只能是小写十六进制的 SHA-256，防止路径穿越"""
+    return isinstance(digest, str) and _DIGEST_PATTERN.fullmatch(digest) is not None
+
+
+def _check_digest(digest: str) -> str:
+    if not _valid_digest(digest):
+        raise ValueError(f"非法文件摘要: {digest!r}")
+    return digest
+
+
+class _ChunkedReader(io.RawIOBase):
+    """HTTP 请求体读取：支持 chunked 传输编码和 Content-Length"""
+
+    def __init__(self, rfile, content_length: Optional[int]):
+        self.rfile = rfile
+        self.chunked = content_length is None
+        self.remaining = content_length or 0
+        self.finished = content_length == 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.finished:
+            return 0
+        if self.chunked and self.remaining == 0:
+            size = int(self.rfile.readline().split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                self.finished = True
+                return 0
+            self.remaining = size
+
+        data = self.rfile.read(min(len(buffer), self.remaining))
+        if not data:
+            raise IOError("请求体不完整")
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        if self.remaining == 0:
+            if self.chunked:
+                self.rfile.readline()
+            else:
+                self.finished = True
+        return len(data)
+
+
+class BundleStore:
+    """按 SHA-256 存放文件的 blob 存储"""
+
+    def __init__(self, store_dir: str):
+        self.store_dir = os.path.abspath(store_dir)
+        os.makedirs(os.path.join(self.store_dir, 'blobs'), exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.store_dir, 'blobs', _check_digest(digest))
+
+    def has(self, digest: str) -> bool:
+        return _valid_digest(digest) and os.path.exists(self.path(digest))
+
+    def put(self, digest: str, stream) -> None:
+        """写入并校验一个 blob（先写临时文件，校验通过后改名）"""
+        _check_digest(digest)
+        tmp_path = f"{self.path(digest)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        h = hashlib.sha256()
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in iter(lambda: stream.read(BUNDLE_CHUNK_SIZE), b''):
+                    h.update(chunk)
+                    f.write(chunk)
+            if h.hexdigest() != digest:
+                raise ValueError(f"文件摘要不匹配: {digest}")
+            os.replace(tmp_path, self.path(digest))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def materialize(self, manifest: Dict, target_dir: str) -> None:
+        """按清单在 target_dir 下重建草稿文件夹"""
+        for entry in manifest['files']:
+            relative = os.path.normpath(entry['path'])
+            if os.path.isabs(relative) or relative.startswith('..'):
+                raise ValueError(f"非法路径: {entry['path']}")
+            path = os.path.join(target_dir, relative)
+            blob = self.path(_check_digest(entry['sha256']))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not hardlink(blob, path):
+                shutil.copyfile(blob, path)
+
+
+class BundleRequestHandler(BaseHTTPRequestHandler):
+    store: BundleStore = None
+    exporter = None
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s" % (self.address_string(), format % args))
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> _ChunkedReader:
+        length = self.headers.get('Content-Length')
+        return _ChunkedReader(self.rfile, int(length) if length is not None else None)
+
+    def do_GET(self):
+        if self.path == '/api/test':
+            self._send_json(200, {'status': 'success'})
+        else:
+            self._send_json(404, {'detail': 'Not found'})
+
+    def do_POST(self):
+        try:
+            if self.path == '/api/bundle/check':
+                digests = json.loads(self._body().read() or b'{}').get('digests', [])
+                self._send_json(200, {'missing': [d for d in digests if not self.store.has(d)]})
+            elif self.path == '/api/bundle/export':
+                self._export()
+            else:
+                self._send_json(404, {'detail': 'Not found'})
+        except Exception as e:
+            logger.error(f"处理请求失败: {e}")
+            self._send_json(500, {'detail': str(e)})
+
+    def _export(self):
+        manifest = None
+        received = 0
+        body = io.BufferedReader(self._body(), BUNDLE_CHUNK_SIZE)
+        with tarfile.open(fileobj=body, mode='r|') as tar:
+            for member in tar:
+                if member.name == 'manifest.json':
+                    manifest = json.loads(tar.extractfile(member).read())
+                elif member.name.startswith('blobs/') and member.isfile():
+                    self.store.put(member.name[len('blobs/'):], tar.extractfile(member))
+                    received += member.size
+        # 读完 tar 结尾的填充，避免客户端还在发送时连接被关闭
+        while body.read(BUNDLE_CHUNK_SIZE):
+            pass
+
+        if not manifest:
+            self._send_json(400, {'detail': '缺少 manifest.json'})
+            return
+        bad = [e.get('sha256') for e in manifest['files'] if not _valid_digest(e.get('sha256'))]
+        if bad:
+            self._send_json(400, {'detail': f"非法文件摘要: {bad[:3]}"})
+            return
+        missing = sorted({e['sha256'] for e in manifest['files'] if not self.store.has(e['sha256'])})
+        if missing:
+            self._send_json(409, {'missing': missing})
+            return
+
+        draft_name = os.path.basename(manifest['draft_name'])
+        work_dir = tempfile.mkdtemp(prefix='bundle_', dir=self.store.store_dir)
+        try:
+            draft_dir = os.path.join(work_dir, draft_name)
+            self.store.materialize(manifest, draft_dir)
+            logger.info(f"收到草稿 {draft_name}: 新文件 {received / 1048576:.1f} MB")
+
+            output_path = self.exporter.export_video(draft_dir)
+            if not output_path or not os.path.exists(output_path):
+                self._send_json(500, {'detail': '导出失败'})
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'video/mp4')
+            self.send_header('Content-Length', str(os.path.getsize(output_path)))
+            self.end_headers()
+            with open(output_path, 'rb') as f:
+                shutil.copyfileobj(f, self.wfile, BUNDLE_CHUNK_SIZE)
+            os.remove(output_path)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="草稿打包导出服务（本地替身）")
+    parser.add_argument('--host', default='0.0.0.0', help='监听地址')
+    parser.add_argument('--port', type=int, default=51054, help='监听端口')
+    parser.add_argument('--store', default=BUNDLE_STORE_DIR, help='blob 存储目录')
+    parser.add_argument('--export-url', default=None, help='转交的剪映导出服务URL，不指定时用本地 ffmpeg 渲染')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    BundleRequestHandler.store = BundleStore(args.store)
+    if args.export_url:
+        BundleRequestHandler.exporter = VideoExporter(args.export_url)
+    else:
+        BundleRequestHandler.exporter = FFmpegRenderer(output_dir=os.path.join(args.store, 'rendered'))
+
+    server = ThreadingHTTPServer((args.host, args.port), BundleRequestHandler)
+    logger.info(f"草稿打包导出服务已启动: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -18,12 +18,44 @@ ENABLE_ENGLISH_SUBTITLES = True
 # 调试模式下的字幕数量限制
 DEBUG_SUBTITLE_LIMIT = 1
 
+# 使用编译后的模板工厂生成草稿元素 - 关闭时退回逐个 deepcopy（用于对比性能）
+USE_COMPILED_TEMPLATES = True
+
+# 按故事裁剪视频素材 - 开启时只把故事用到的源时间范围（关键帧对齐、流复制）放进草稿
+ENABLE_STORY_SUBCLIP = False
+
+# 确定性ID - 开启时草稿中的ID由故事内容推导，相同输入生成逐字节相同的草稿
+DETERMINISTIC_DRAFT_IDS = False
+
+# 批量生成草稿的进程数（None 表示按 CPU 核数）
+DRAFT_BATCH_WORKERS = None
+
+# 精简草稿材料 - 为每个片段生成独立的速度/画布材料，并删除没有被任何片段引用的材料
+ENABLE_MATERIAL_PRUNING = True
+
+# 合并片段 - 同一对话中首尾相接的源时间范围合并为一个片段，所有片段共用一个视频材料
+ENABLE_SEGMENT_COALESCING = True
+
+# 判断首尾相接时允许的误差（秒）
+COALESCE_TOLERANCE_SECONDS = 0.001
+
 # ================== 速度控制配置 ==================
 # 目标视频时长（秒）- 控制最终视频在1分钟内
 TARGET_DURATION_SECONDS = 60
 
 # 最大播放速度倍数 - 限制最大速度为2.5倍
 MAX_SPEED_FACTOR = 2.0
+
+# ================== 成片分段配置 ==================
+# 成片分段 - 长故事按对话边界拆成多个成片，每个成片生成一个草稿，导出后无需再切割
+ENABLE_DRAFT_PARTS = True
+
+# 成片时长范围（秒）：最短按原速计算，最长按最大速度计算（与生成时的截断时长一致）
+PART_MIN_DURATION_SECONDS = 36
+PART_MAX_DURATION_SECONDS = 59
+
+# 多个成片时的标题格式（也用于草稿文件夹名）
+PART_TITLE_FORMAT = "{title} Part {part}"
 # ================================================
 
 import json
@@ -33,11 +65,20 @@ import uuid
 import shutil
 import copy
 import re
+import marshal
+import random
+import hashlib
+import threading
 import logging
+import multiprocessing
 from pathlib import Path
-from pydub import AudioSegment as PydubAudioSegment
-from typing import List, Dict, Optional
-from data_models import StoryDialogue, StoryContent
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+from data_models import StoryDialogue, StoryContent, StoryPart
+from audio_utils import probe_audio_duration, ffprobe_duration
+from material_store import MaterialStore
+from video_subclip import cut_subclip, map_source_time
 
 # 配置日志
 logging.basicConfig(
@@ -46,26 +87,258 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# 字幕模板加载函数
-def load_subtitle_templates_from_draft(template_file):
-    """从草稿模板文件中加载字幕模板"""
-    try:
-        with open(template_file, 'r', encoding='utf-8') as f:
-            template_data = json.load(f)
+class ElementFactory:
+    """
+    编译后的模板元素工厂
+
+    每次调用只做一次顶层浅拷贝，模板中不会被修改的子结构（如 extra_material_refs、
+    各类配置对象）在所有元素间共享；mutable 中列出的嵌套字段再浅拷贝一层，
+    供调用方就地修改其中的键。调用方只能替换顶层字段，不能修改共享的子结构。
+    """
+
+    def __init__(self, template: Optional[Dict], mutable: Tuple[str, ...] = ()):
+        self._template = template or {}
+        self._mutable = tuple(key for key in mutable if isinstance(self._template.get(key), dict))
+
+    def __call__(self, fields: Optional[Dict] = None) -> Dict:
+        element = self._template.copy()
+        for key in self._mutable:
+            element[key] = element[key].copy()
+        if fields:
+            element.update(fields)
+        return element
+
+
+# 字幕内容模板中的占位符（编译时替换为格式化字段）
+_TEXT_PLACEHOLDER = '@@subtitle_text@@'
+_LENGTH_PLACEHOLDER = '@@subtitle_length@@'
 
-        # 从嵌套草稿中获取字幕模板
-        nested_draft = template_data['materials']['drafts'][0]['draft']
-        texts_templates = nested_draft['materials'].get('texts', [])
 
-        # 获取字幕轨道模板
+def compile_text_content(content: str) -> str:
+    """
+    把文本材料的 content 模板编译为 str.format 模板
+
+    结果与 json.loads 后修改 text 和各样式的 range、再 json.dumps 完全一致；
+    使用时 text 字段传入 json.dumps(文本, ensure_ascii=False)，length 传入文本长度。
+    """
+    content_obj = json.loads(content)
+    content_obj['text'] = _TEXT_PLACEHOLDER
+    for style in content_obj.get('styles') or []:
+        if 'range' in style:
+            style['range'] = [0, _LENGTH_PLACEHOLDER]
+
+    dumped = json.dumps(content_obj, ensure_ascii=False)
+    dumped = dumped.replace('{', '{{').replace('}', '}}')
+    return (dumped.replace(json.dumps(_TEXT_PLACEHOLDER), '{text}')
+                  .replace(json.dumps(_LENGTH_PLACEHOLDER), '{length}'))
+
+
+# 字幕文本清理用的正则
+_SUBTITLE_PUNCTUATION = re.compile(r'[.,!?;:\'"\-\(\)\[\]{}]')
+_WHITESPACE = re.compile(r'\s+')
+
+# 各子模板中会被就地修改的嵌套字段
+_MUTABLE_FIELDS = {
+    'video_segment': ('clip',),
+}
+
+
+class DraftTemplate:
+    """
+    解析后的草稿模板（只读）
+
+    模板只解析一次并序列化为 marshal 数据，new_draft / new_part 用它快速生成
+    互不影响的工作副本；常用的子模板在加载时预先提取。
+    """
+
+    def __init__(self, template_file: str):
+        st = os.stat(template_file)
+        self.template_file = template_file
+        self.signature = (st.st_size, st.st_mtime_ns)
+
+        with open(template_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self._draft_blob = marshal.dumps(data)
+
+        nested_draft = data['materials']['drafts'][0]['draft']
+        nested_materials = nested_draft['materials']
         text_tracks = [t for t in nested_draft['tracks'] if t.get('type') == 'text']
-        track_template = text_tracks[0] if text_tracks else None
 
-        return texts_templates, track_template
+        # 字幕模板
+        self.text_materials = nested_materials.get('texts', [])
+        self.text_track = text_tracks[0] if text_tracks else None
+        self.text_content_format = None
+        if self.text_materials:
+            try:
+                self.text_content_format = compile_text_content(self.text_materials[0]['content'])
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"⚠️ 字幕内容模板解析失败: {e}")
+
+        # 其他子模板，缺失时为 None
+        self.parts = {
+            'video_material': _first(nested_materials.get('videos')),
+            'audio_material': _first(nested_materials.get('audios')),
+            'video_segment': _first(nested_draft['tracks'][0]['segments']),
+            'audio_segment': _first(nested_draft['tracks'][1]['segments']),
+            'text_material': _first(self.text_materials),
+            'text_track': self.text_track,
+            'text_segment': _first(self.text_track['segments']) if self.text_track else None,
+            'main_audio_material': _first(data['materials']['audios']),
+            'main_audio_segment': _first(data['tracks'][2]['segments']),
+        }
+        self._part_blobs = {name: marshal.dumps(part) for name, part in self.parts.items() if part}
+        self._factories = {name: ElementFactory(marshal.loads(blob), _MUTABLE_FIELDS.get(name, ()))
+                           for name, blob in self._part_blobs.items()}
+
+    def new_draft(self) -> Dict:
+        """返回完整草稿的独立副本"""
+        return marshal.loads(self._draft_blob)
+
+    def new_part(self, name: str) -> Dict:
+        """返回子模板的独立副本，模板中没有时返回空字典"""
+        blob = self._part_blobs.get(name)
+        return marshal.loads(blob) if blob else {}
+
+    def build(self, name: str, fields: Optional[Dict] = None) -> Dict:
+        """
+        基于子模板生成一个草稿元素，fields 覆盖顶层字段
+
+        与深拷贝后 update 的结果序列化后完全一致，但只复制会被修改的部分
+        """
+        if not USE_COMPILED_TEMPLATES:
+            element = copy.deepcopy(self.parts[name]) if self.parts.get(name) else {}
+            if fields:
+                element.update(fields)
+            return element
+
+        factory = self._factories.get(name)
+        if factory is None:
+            return dict(fields) if fields else {}
+        return factory(fields)
+
+
+def _first(items):
+    return items[0] if items else None
+
+
+# 进程内模板缓存：绝对路径 -> DraftTemplate，文件修改后自动重新加载
+_template_cache: Dict[str, DraftTemplate] = {}
+_template_cache_lock = threading.Lock()
+
+
+def get_draft_template(template_file: str) -> DraftTemplate:
+    """获取解析后的草稿模板，同一文件每个进程只解析一次"""
+    st = os.stat(template_file)
+    key = os.path.abspath(template_file)
+    with _template_cache_lock:
+        template = _template_cache.get(key)
+        if template is None or template.signature != (st.st_size, st.st_mtime_ns):
+            template = DraftTemplate(template_file)
+            _template_cache[key] = template
+            logger.info(f"✓ 加载草稿模板: {template_file}")
+        return template
+
+
+# 字幕模板加载函数
+def load_subtitle_templates_from_draft(template_file):
+    """从草稿模板文件中加载字幕模板（返回副本）"""
+    try:
+        template = get_draft_template(template_file)
+        if template.text_track is None:
+            return copy.deepcopy(template.text_materials), None
+        return copy.deepcopy((template.text_materials, template.text_track))
     except Exception as e:
         logger.error(f"❌ 从草稿模板加载字幕失败: {e}")
         return [], None
 
+def coalesce_segments_info(segments_info: List[Dict], tolerance: float = COALESCE_TOLERANCE_SECONDS) -> List[Dict]:
+    """
+    合并同一对话中源时间首尾相接、速度相同的相邻片段
+
+    合并后的片段保留第一个片段的目标起点和序号，源时长和目标时长累加
+    """
+    merged = []
+    for info in segments_info:
+        prev = merged[-1] if merged else None
+        if (prev is not None
+                and prev['dialogue_obj'] is info['dialogue_obj']
+                and prev['audio_path'] == info['audio_path']
+                and prev['video_speed'] == info['video_speed']
+                and abs(prev['source_start'] + prev['source_duration'] - info['source_start']) <= tolerance):
+            prev['source_duration'] = info['source_start'] + info['source_duration'] - prev['source_start']
+            prev['audio_duration'] += info['audio_duration']
+            continue
+        merged.append(dict(info))
+    return merged
+
+
+def _referenced_ids(value, index: Dict[str, str], found: List[str]):
+    """收集材料内部引用的其他材料ID（跳过嵌套草稿本身）"""
+    if isinstance(value, str):
+        if value in index:
+            found.append(value)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if key not in ('id', 'draft'):
+                _referenced_ids(item, index, found)
+    elif isinstance(value, list):
+        for item in value:
+            _referenced_ids(item, index, found)
+
+
+def prune_unreferenced_materials(draft: Dict) -> Dict[str, int]:
+    """
+    删除草稿中没有被轨道片段直接或间接引用的材料
+
+    从各轨道片段的 material_id 和 extra_material_refs 出发遍历引用关系，
+    只保留可达的材料；重复ID的条目只保留第一条。
+
+    Returns:
+        {材料类别: 删除数量}
+    """
+    materials = draft.get('materials', {})
+    by_id = {}
+    index = {}
+    for kind, items in materials.items():
+        if isinstance(items, list):
+            for item in items:
+                if isinstance(item, dict) and isinstance(item.get('id'), str):
+                    by_id[item['id']] = item
+                    index[item['id']] = kind
+
+    pending = []
+    for track in draft.get('tracks', []):
+        for segment in track.get('segments', []):
+            pending.append(segment.get('material_id'))
+            pending.extend(segment.get('extra_material_refs') or [])
+
+    reachable = set()
+    while pending:
+        material_id = pending.pop()
+        if material_id in index and material_id not in reachable:
+            reachable.add(material_id)
+            _referenced_ids(by_id[material_id], index, pending)
+
+    # 同一ID只保留第一条（模板中存在重复ID的条目）
+    removed = {}
+    seen = set()
+    for kind, items in materials.items():
+        if not isinstance(items, list):
+            continue
+        kept = []
+        for item in items:
+            material_id = item.get('id') if isinstance(item, dict) else None
+            if material_id in index:
+                if material_id not in reachable or material_id in seen:
+                    continue
+                seen.add(material_id)
+            kept.append(item)
+        if len(kept) != len(items):
+            removed[kind] = len(items) - len(kept)
+            materials[kind] = kept
+    return removed
+
+
 # 默认配置常量
 DEFAULT_TEMPLATE_FILE = "./templates/draft_content_fuhe.json"
 DEFAULT_TEMPLATE_SETTINGS= "./templates/draft_settings"
@@ -106,8 +379,12 @@ def time_to_microseconds(time_str):
 
 
 def get_audio_duration(audio_path):
-    """获取音频文件时长（秒）"""
+    """获取音频文件时长（秒），优先读取文件头，失败时才完整解码"""
+    duration = probe_audio_duration(audio_path)
+    if duration is not None:
+        return duration
     try:
+        from pydub import AudioSegment as PydubAudioSegment
         audio = PydubAudioSegment.from_file(audio_path)
         return len(audio) / 1000.0
     except Exception as e:
@@ -148,9 +425,96 @@ def calculate_speed_factor(original_duration_seconds):
     return final_speed
 
 
+def plan_parts(durations: List[float], min_seconds: float, max_seconds: float) -> List[List[int]]:
+    """
+    按对话边界把故事分段：每段总时长在 [min_seconds, max_seconds] 内，段数尽量少、各段尽量均匀
+
+    Args:
+        durations: 各对话在嵌套时间线上的时长（秒）
+        min_seconds: 每段最短时长
+        max_seconds: 每段最长时长（单个对话超长时单独成段）
+
+    Returns:
+        各段包含的对话下标，覆盖全部对话：凑不满一段的尾部对话并入上一段（生成时再加速压到上限内），
+        完全无法分段时整个故事作为一段
+    """
+    n = len(durations)
+    total = sum(durations)
+    if n == 0 or total <= max_seconds:
+        return [list(range(n))] if n else []
+
+    edges = [0.0]
+    for duration in durations:
+        edges.append(edges[-1] + duration)
+
+    # best[j]: 前 j 个对话分段的 (段数, 各段时长平方和, 上一个边界)
+    best: List[Optional[Tuple[int, float, int]]] = [None] * (n + 1)
+    best[0] = (0, 0.0, -1)
+    for j in range(1, n + 1):
+        for i in range(j - 1, -1, -1):
+            length = edges[j] - edges[i]
+            if length > max_seconds and j - i > 1:
+                break
+            if best[i] is None or length < min_seconds:
+                continue
+            candidate = (best[i][0] + 1, best[i][1] + length * length, i)
+            if best[j] is None or candidate[:2] < best[j][:2]:
+                best[j] = candidate
+
+    # 覆盖全部对话优先，否则取能覆盖的最长前缀，剩下的尾部对话并入最后一段
+    end = max((j for j in range(n + 1) if best[j] is not None and best[j][0] > 0),
+              key=lambda j: (edges[j], j), default=None)
+    if end is None:
+        return [list(range(n))]
+
+    parts = []
+    tail = list(range(end, n))
+    while end > 0:
+        start = best[end][2]
+        parts.append(list(range(start, end)))
+        end = start
+    parts = parts[::-1]
+    parts[-1].extend(tail)
+    return parts
+
+
+# 当前线程的确定性ID随机源，为 None 时使用 uuid4
+_id_state = threading.local()
+
+
 def generate_uuid():
-    """生成UUID"""
-    return str(uuid.uuid4()).upper()
+    """生成UUID；在 deterministic_ids 上下文中按种子生成可复现的ID"""
+    rng = getattr(_id_state, 'rng', None)
+    if rng is None:
+        return str(uuid.uuid4()).upper()
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4)).upper()
+
+
+@contextmanager
+def deterministic_ids(seed: str):
+    """在该上下文内 generate_uuid 按 seed 生成固定序列"""
+    previous = getattr(_id_state, 'rng', None)
+    _id_state.rng = random.Random(seed)
+    try:
+        yield
+    finally:
+        _id_state.rng = previous
+
+
+def story_id_seed(story: StoryContent, video_path: str, story_idx: int, video_id: Optional[str]) -> str:
+    """由故事内容计算确定性ID的种子（不含导出路径等运行时状态）"""
+    payload = {
+        'video': os.path.basename(video_path),
+        'video_id': video_id,
+        'story_idx': story_idx,
+        'title': story.story_title,
+        'range': [story.start_index, story.end_index],
+        'dialogues': [[d.index, d.video_segments, d.chinese, d.english,
+                       os.path.basename(d.audio_path) if d.audio_path else None]
+                      for d in story.dialogue_list],
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
 
 
 class VideoMaterial:
@@ -211,7 +575,95 @@ class DraftGenerator:
         self.gap = gap
         self.blur_strength = blur_strength
         self.background_audio_path = background_audio_path
+        self.material_store = MaterialStore()
+
+
+    def _load_narration_map(self, story: StoryContent) -> Optional[Dict]:
+        """加载故事的单文件旁白映射，不可用时返回 None（退回逐句音频）"""
+        if not story.narration_path or not story.narration_map_path:
+            return None
+        if not os.path.exists(story.narration_path) or not os.path.exists(story.narration_map_path):
+            logger.warning(f"⚠️ 旁白文件不存在，使用逐句音频: {story.narration_path}")
+            return None
 
+        try:
+            with open(story.narration_map_path, 'r', encoding='utf-8') as f:
+                narration_map = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ 旁白映射读取失败，使用逐句音频: {e}")
+            return None
+
+        dialogues = {d['index']: d for d in narration_map.get('dialogues', [])}
+        missing = [d.index for d in story.dialogue_list if d.audio_path and d.index not in dialogues]
+        if missing:
+            logger.warning(f"⚠️ 旁白映射缺少对话 {missing}，使用逐句音频")
+            return None
+
+        logger.info(f"🎙️ 使用单文件旁白: {os.path.basename(story.narration_path)}")
+        return {
+            'path': story.narration_path,
+            'duration': narration_map['duration'],
+            'dialogues': dialogues
+        }
+
+    def _dialogue_audio(self, dialogue: StoryDialogue, narration: Optional[Dict]) -> Tuple[str, float, float]:
+        """对话的音频：(音频文件, 在音频材料中的起点, 时长)，单位秒"""
+        if narration:
+            narration_entry = narration['dialogues'][dialogue.index]
+            return narration['path'], narration_entry['start'], narration_entry['end'] - narration_entry['start']
+        return dialogue.audio_path, 0.0, dialogue.audio_duration or get_audio_duration(dialogue.audio_path)
+
+    def dialogue_durations(self, story: StoryContent) -> List[float]:
+        """各对话在嵌套时间线上占用的时长（秒），与 create_nested_draft_simple 的排布一致，被跳过的对话为 0"""
+        narration = self._load_narration_map(story)
+        durations = []
+        for dialogue in story.dialogue_list:
+            total_video = sum(time_to_microseconds(seg['end']) - time_to_microseconds(seg['start'])
+                              for seg in dialogue.video_segments)
+            if not dialogue.audio_path or total_video == 0:
+                durations.append(0.0)
+                continue
+            durations.append(self.gap + self._dialogue_audio(dialogue, narration)[2])
+        return durations
+
+    def plan_story_parts(self, story: StoryContent) -> List[StoryPart]:
+        """
+        按对话边界规划成片：每段加速后的时长在 PART_MIN_DURATION_SECONDS ~ PART_MAX_DURATION_SECONDS 内
+        关闭 ENABLE_DRAFT_PARTS 或故事本身不超长时只有一段（即整个故事）
+        """
+        durations = self.dialogue_durations(story)
+        if ENABLE_DRAFT_PARTS:
+            groups = plan_parts(durations, PART_MIN_DURATION_SECONDS, PART_MAX_DURATION_SECONDS * MAX_SPEED_FACTOR)
+        else:
+            groups = [list(range(len(durations)))]
+
+        parts = [StoryPart(part_index=i + 1,
+                           dialogue_indices=[story.dialogue_list[k].index for k in group],
+                           duration=round(sum(durations[k] for k in group), 3))
+                 for i, group in enumerate(groups)]
+
+        if len(parts) > 1:
+            summary = ', '.join(f"{part.duration:.1f}s" for part in parts)
+            logger.info(f"✂️ 故事 {story.story_title} 总时长 {sum(durations):.1f}s，按对话边界分为 {len(parts)} 个成片: {summary}")
+            overlong = [part.part_index for part in parts
+                        if part.duration > PART_MAX_DURATION_SECONDS * MAX_SPEED_FACTOR]
+            if overlong:
+                logger.warning(f"⚠️ 成片 {overlong} 包含凑不满一段的尾部对话，生成时会超过最大速度压到 "
+                               f"{PART_MAX_DURATION_SECONDS}s 内")
+        return parts
+
+    def part_story(self, story: StoryContent, part: StoryPart) -> StoryContent:
+        """成片对应的故事对象（只含该段对话）；只有一段时直接使用原故事"""
+        if len(story.parts) <= 1:
+            return story
+        indices = set(part.dialogue_indices)
+        dialogues = [d for d in story.dialogue_list if d.index in indices]
+        title = PART_TITLE_FORMAT.format(title=story.story_title, part=part.part_index, parts=len(story.parts))
+        part_story = StoryContent(title, dialogues[0].index, dialogues[-1].index, [])
+        part_story.dialogue_list = dialogues
+        part_story.narration_path = story.narration_path
+        part_story.narration_map_path = story.narration_map_path
+        return part_story
 
     def create_nested_draft_simple(self, story: StoryContent, video_path: str):
         """创建简化的嵌套草稿 - 支持一个音频对应多个视频片段"""
@@ -219,6 +671,9 @@ class DraftGenerator:
         current_time = 0.0
         segments_info = []
 
+        # 单文件旁白模式：所有对话共用一个音频材料，按映射中的偏移截取
+        narration = self._load_narration_map(story)
+
         for dialogue in story.dialogue_list:
             # 如果没有语音文件，跳过（或创建虚拟音频用于字幕处理）
             if not dialogue.audio_path:
@@ -227,8 +682,8 @@ class DraftGenerator:
 
             current_time += self.gap
 
-            # 🔑 获取音频时长
-            audio_duration = get_audio_duration(dialogue.audio_path)
+            # 🔑 获取音频时长及其在音频材料中的起点
+            audio_path, audio_source_start, audio_duration = self._dialogue_audio(dialogue, narration)
 
             # 🔑 计算所有视频片段的总时长
             total_video_duration = 0.0
@@ -259,7 +714,9 @@ class DraftGenerator:
                     'audio_duration': adjusted_duration,  # 调整后的时长
                     'source_start': source_start_seconds,
                     'source_duration': source_duration,
-                    'audio_path': dialogue.audio_path,  # 共享同一音频
+                    'audio_path': audio_path,  # 共享同一音频
+                    'audio_source_start': audio_source_start,  # 音频在材料中的起点
+                    'audio_source_duration': audio_duration,  # 音频时长
                     'video_speed': video_speed,  # 🆕 视频速度
                     'dialogue_obj': dialogue,
                     'video_seg_idx': video_seg_idx,  # 当前是第几个视频片段
@@ -270,6 +727,12 @@ class DraftGenerator:
 
         total_duration = int(current_time * 1000000)
 
+        # 合并首尾相接的片段
+        if ENABLE_SEGMENT_COALESCING:
+            original_count = len(segments_info)
+            segments_info = coalesce_segments_info(segments_info)
+            logger.info(f"  🔗 合并相邻片段: {original_count} -> {len(segments_info)}")
+
         # 生成材料和片段对象
         video_materials = []
         audio_materials = []
@@ -295,18 +758,18 @@ class DraftGenerator:
             if info['audio_path'] is None:
                 continue
 
-            # 视频材料（每个视频片段独立）
-            video_id = generate_uuid()
-            video_file_name = os.path.basename(video_path)
-
-            video_material = VideoMaterial(
-                material_id=video_id,
-                material_name=video_file_name,
-                path=f"##_draftpath_placeholder_0E685133-18CE-45ED-8CB8-2904A212EC80_##/materials/{video_file_name}",
-                duration=44733333,
-                crop=crop_config
-            )
-            video_materials.append(video_material)
+            # 视频材料（合并模式下所有片段共用同一源文件的材料，否则每个视频片段独立）
+            if not (ENABLE_SEGMENT_COALESCING and video_materials):
+                video_file_name = os.path.basename(video_path)
+                video_material = VideoMaterial(
+                    material_id=generate_uuid(),
+                    material_name=video_file_name,
+                    path=f"##_draftpath_placeholder_0E685133-18CE-45ED-8CB8-2904A212EC80_##/materials/{video_file_name}",
+                    duration=44733333,
+                    crop=crop_config
+                )
+                video_materials.append(video_material)
+            video_id = video_materials[-1].id
 
             # 🔑 音频材料去重
             if info['audio_path'] not in audio_path_to_material_id:
@@ -315,7 +778,7 @@ class DraftGenerator:
                 audio_path_to_info[info['audio_path']] = info
 
                 # 获取完整音频时长
-                full_audio_duration = get_audio_duration(info['audio_path'])
+                full_audio_duration = narration['duration'] if narration else info['audio_source_duration']
 
                 audio_material = AudioMaterial(
                     material_id=audio_id,
@@ -349,16 +812,15 @@ class DraftGenerator:
 
             # 🔑 音频片段（只在第一个视频片段时创建）
             if info['video_seg_idx'] == 0:
-                full_audio_duration = get_audio_duration(info['audio_path'])
                 audio_segment = AudioSegment(
                     segment_id=generate_uuid(),
                     material_id=audio_id,
                     source_timerange={
-                        "duration": int(full_audio_duration * 1000000),
-                        "start": 0
+                        "duration": int(info['audio_source_duration'] * 1000000),
+                        "start": int(info['audio_source_start'] * 1000000)
                     },
                     target_timerange={
-                        "duration": int(full_audio_duration * 1000000),
+                        "duration": int(info['audio_source_duration'] * 1000000),
                         "start": int(info['target_start'] * 1000000)
                     },
                     speed=1.0,
@@ -372,6 +834,7 @@ class DraftGenerator:
 
         return {
             'duration': total_duration,
+            'audio_files': list(audio_path_to_material_id.keys()),  # 需要复制到草稿的音频文件
             'video_materials': video_materials,
             'audio_materials': audio_materials,
             'video_segments': video_segments,
@@ -386,13 +849,13 @@ class DraftGenerator:
         subtitle_materials = []
         subtitle_tracks = []
 
-        # 从草稿模板文件中加载字幕模板
-        material_templates, track_template = load_subtitle_templates_from_draft(self.template_file)
-        if not material_templates or not track_template:
+        # 从缓存的草稿模板中获取字幕模板
+        template = get_draft_template(self.template_file)
+        if not template.text_materials or not template.text_track or not template.text_content_format:
             logger.warning("❌ 无字幕模板，跳过字幕生成")
             return [], [], []
 
-        logger.info(f"✓ 加载字幕模板: {len(material_templates)} 个材料模板")
+        logger.info(f"✓ 加载字幕模板: {len(template.text_materials)} 个材料模板")
 
         # 确定处理的字幕数量
         process_count = len(segments_info)
@@ -401,7 +864,7 @@ class DraftGenerator:
             logger.info(f"🔧 字幕调试模式：只处理前 {process_count} 个字幕")
 
         # 创建字幕轨道（基于模板）
-        subtitle_track = copy.deepcopy(track_template)
+        subtitle_track = template.new_part('text_track')
         subtitle_track['id'] = generate_uuid()
         subtitle_track['segments'] = []
 
@@ -428,43 +891,26 @@ class DraftGenerator:
             audio_target_start = int(info['target_start'] * 1000000)
 
             for j, subtitle_entry in enumerate(srt_subtitles):
-                # 使用第一个模板（只有英文字幕逻辑）
-                template_idx = 0
-
-                # 创建字幕材料（基于模板复制）
-                subtitle_material = copy.deepcopy(material_templates[template_idx])
-                subtitle_material['id'] = generate_uuid()
+                # 创建字幕材料（基于第一个模板复制，只有英文字幕逻辑）
+                material_id = generate_uuid()
 
-                # 解析并修改content中的text字段
-                try:
-                    content_obj = json.loads(subtitle_material['content'])
-
-                    # 去除标点符号并清理文本
-                    clean_text = self._clean_subtitle_text(subtitle_entry['text'])
-                    if not clean_text:  # 如果清理后为空，跳过
-                        continue
-
-                    # 设置文本内容
-                    content_obj['text'] = clean_text
-
-                    # 根据文本长度计算range
-                    text_length = len(clean_text)
-                    if 'styles' in content_obj and content_obj['styles']:
-                        for style in content_obj['styles']:
-                            if 'range' in style:
-                                style['range'] = [0, text_length]
-
-                    subtitle_material['content'] = json.dumps(content_obj, ensure_ascii=False)
-                except Exception as e:
-                    logger.warning(f"⚠️ 字幕内容解析失败: {e}")
+                # 去除标点符号并清理文本
+                clean_text = self._clean_subtitle_text(subtitle_entry['text'])
+                if not clean_text:  # 如果清理后为空，跳过
                     continue
 
+                # 预编译的内容模板一次格式化得到 content，range 按文本长度计算
+                subtitle_material = template.build('text_material', {
+                    'id': material_id,
+                    'content': template.text_content_format.format(
+                        text=json.dumps(clean_text, ensure_ascii=False), length=len(clean_text))
+                })
+
                 subtitle_materials.append(subtitle_material)
 
                 # 创建字幕片段（基于模板复制）
-                if track_template['segments']:
-                    segment_template = track_template['segments'][0]
-                    subtitle_segment = copy.deepcopy(segment_template)
+                if template.parts['text_segment']:
+                    subtitle_segment = template.build('text_segment')
                     subtitle_segment['id'] = generate_uuid()
                     subtitle_segment['material_id'] = subtitle_material['id']
 
@@ -534,14 +980,11 @@ class DraftGenerator:
 
     def _clean_subtitle_text(self, text):
         """清理字幕文本，去除标点符号和多余空格"""
-        import re
-
         # 去除常见标点符号
-        punctuation_pattern = r'[.,!?;:\'"\-\(\)\[\]{}]'
-        clean_text = re.sub(punctuation_pattern, '', text)
+        clean_text = _SUBTITLE_PUNCTUATION.sub('', text)
 
         # 去除多余空格并转换为单个空格
-        clean_text = re.sub(r'\s+', ' ', clean_text)
+        clean_text = _WHITESPACE.sub(' ', clean_text)
 
         # 去除首尾空格
         clean_text = clean_text.strip()
@@ -623,6 +1066,42 @@ class DraftGenerator:
 
         logging.info(f"✓ 字幕更新完成: {len(nested_data['subtitle_materials'])} 个材料")
 
+    def _assign_segment_materials(self, nested_draft):
+        """
+        为每个视频/音频片段生成独立的速度材料（与片段速度一致），视频片段再生成独立的画布材料
+
+        模板片段共享同一组 extra_material_refs，这里为每个片段换成新的引用列表
+        """
+        materials = nested_draft['materials']
+        templates = {}
+        for kind in ('speeds', 'canvases'):
+            for item in materials.get(kind, []):
+                templates[item['id']] = (kind, item)
+
+        created = {'speeds': [], 'canvases': []}
+        for track in nested_draft['tracks']:
+            if track.get('type') not in ('video', 'audio'):
+                continue
+            for segment in track['segments']:
+                refs = []
+                for ref in segment.get('extra_material_refs') or []:
+                    kind, template = templates.get(ref, (None, None))
+                    if kind is None:
+                        refs.append(ref)
+                        continue
+                    entry = dict(template)
+                    entry['id'] = generate_uuid()
+                    if kind == 'speeds':
+                        entry['speed'] = segment.get('speed', 1.0)
+                    elif entry.get('type') == 'canvas_blur':
+                        entry['blur'] = self.blur_strength
+                    created[kind].append(entry)
+                    refs.append(entry['id'])
+                segment['extra_material_refs'] = refs
+
+        for kind, entries in created.items():
+            materials.setdefault(kind, []).extend(entries)
+
     def _update_main_title_text(self, draft, story_title, total_duration):
         """更新主轴的标题文本内容和时长"""
         try:
@@ -665,6 +1144,51 @@ class DraftGenerator:
         except Exception as e:
             logging.info(f"⚠️ 更新主轴标题失败: {e}")
 
+    def _trim_story_video(self, nested_data, video_path: str, output_dir: str) -> str:
+        """
+        把故事用到的源视频范围切成子片段放入草稿素材目录，并改写视频片段和材料
+
+        Returns:
+            草稿应引用的视频文件路径，失败时返回原视频
+        """
+        video_segments = nested_data['video_segments']
+        if not video_segments:
+            return video_path
+
+        ranges = [(seg.source_timerange['start'] / 1000000.0,
+                   (seg.source_timerange['start'] + seg.source_timerange['duration']) / 1000000.0)
+                  for seg in video_segments]
+
+        stem, ext = os.path.splitext(os.path.basename(video_path))
+        subclip_name = f"{stem}_subclip{ext}"
+        materials_dir = os.path.join(output_dir, "materials")
+        subclip_path = os.path.join(materials_dir, subclip_name)
+
+        try:
+            os.makedirs(materials_dir, exist_ok=True)
+            mapping = cut_subclip(video_path, ranges, subclip_path)
+            new_starts = [map_source_time(mapping, start) for start, _ in ranges]
+            if any(start is None for start in new_starts):
+                raise ValueError("片段不在裁剪范围内")
+            subclip_duration = ffprobe_duration(subclip_path)
+        except Exception as e:
+            logger.warning(f"⚠️ 裁剪视频素材失败，使用完整视频: {e}")
+            if os.path.exists(subclip_path):
+                os.remove(subclip_path)
+            return video_path
+
+        for seg, new_start in zip(video_segments, new_starts):
+            seg.source_timerange['start'] = int(round(new_start * 1000000))
+
+        for material in nested_data['video_materials']:
+            material.material_name = subclip_name
+            material.path = f"##_draftpath_placeholder_0E685133-18CE-45ED-8CB8-2904A212EC80_##/materials/{subclip_name}"
+            if subclip_duration:
+                material.duration = int(subclip_duration * 1000000)
+
+        logger.info(f"✓ 使用裁剪后的视频素材: {subclip_name}")
+        return subclip_path
+
     def generate_from_file(self, enhanced_srt_file: str, video_path: str) -> str:
         """从文件生成草稿，先转换为 StoryContent 对象"""
         logging.info(f"开始从文件生成草稿: {enhanced_srt_file}")
@@ -700,7 +1224,8 @@ class DraftGenerator:
         # 如果清理后为空，使用默认名称
         return sanitized if sanitized else 'untitled'
 
-    def generate_from_story(self, story: StoryContent, video_path: str, story_idx: int = 0, video_id: str = None) -> str:
+    def generate_from_story(self, story: StoryContent, video_path: str, story_idx: int = 0, video_id: str = None,
+                            deterministic: Optional[bool] = None) -> str:
         """从 StoryContent 对象生成草稿，直接使用对象"""
         logging.info(f"开始为故事生成草稿: {story.story_title}")
 
@@ -710,8 +1235,97 @@ class DraftGenerator:
         # 更新输出目录，为每个故事创建独立的目录
         story_output_dir = os.path.join(self.output_dir, f"{video_id}_story_{story_idx + 1}_{safe_title}")
 
+        if deterministic is None:
+            deterministic = DETERMINISTIC_DRAFT_IDS
+        if deterministic:
+            with deterministic_ids(story_id_seed(story, video_path, story_idx, video_id)):
+                return self._generate_draft_internal(story, video_path, story_output_dir)
         return self._generate_draft_internal(story, video_path, story_output_dir)
 
+    def generate_batch(self, stories: List[StoryContent], video_path: str, video_id: str = None,
+                       max_workers: Optional[int] = DRAFT_BATCH_WORKERS,
+                       deterministic: Optional[bool] = None) -> List[List[str]]:
+        """
+        在进程池中为同一视频段的多个故事生成草稿
+
+        子进程以 spawn 方式启动（主进程已有 TTS、对齐、导出等后台线程，fork 不安全），
+        每个子进程在初始化时重建生成器并解析一次模板。进程池异常时未完成的草稿改为串行生成。
+        每个故事先按对话边界规划成片（story.parts），每个成片生成一个草稿，路径写回 part.draft_path。
+
+        Returns:
+            与 stories 一一对应的列表，每项是该故事各成片的草稿文件路径，跳过或失败的成片不在其中
+        """
+        if not stories:
+            return []
+
+        get_draft_template(self.template_file)
+        jobs = []
+        owners = []
+        for story_idx, story in enumerate(stories):
+            try:
+                story.parts = self.plan_story_parts(story)
+            except Exception as e:
+                logger.error(f"❌ 故事 {story_idx + 1} 成片规划失败: {e}")
+                story.parts = []
+            for part in story.parts:
+                jobs.append((self.part_story(story, part), video_path, story_idx, video_id, deterministic))
+                owners.append(part)
+        workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+
+        if workers <= 1:
+            draft_files = [self._generate_batch_item(job) for job in jobs]
+        else:
+            logging.info(f"🚀 并行生成 {len(jobs)} 个草稿，进程数: {workers}")
+            draft_files = self._generate_batch_parallel(jobs, workers)
+
+        for part, draft_file in zip(owners, draft_files):
+            part.draft_path = draft_file
+        return [[part.draft_path for part in story.parts if part.draft_path] for story in stories]
+
+    def _generate_batch_parallel(self, jobs: List, workers: int) -> List[Optional[str]]:
+        """在进程池中生成草稿；进程池崩溃、任务无法序列化等情况下，未完成的草稿在主进程中串行生成"""
+        draft_files = [None] * len(jobs)
+        finished = [False] * len(jobs)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_batch_worker, initargs=(self._config(),)) as executor:
+                futures = [executor.submit(_run_batch_item, job) for job in jobs]
+                for i, future in enumerate(futures):
+                    try:
+                        draft_files[i] = future.result()
+                        finished[i] = True
+                    except Exception as e:
+                        logger.warning(f"⚠️ 进程池生成草稿 {i + 1} 失败: {e}")
+        except Exception as e:
+            logger.warning(f"⚠️ 进程池异常: {e}")
+
+        remaining = [i for i, done in enumerate(finished) if not done]
+        if remaining:
+            logger.warning(f"⚠️ {len(remaining)} 个草稿改为串行生成")
+            for i in remaining:
+                draft_files[i] = self._generate_batch_item(jobs[i])
+        return draft_files
+
+    def _config(self) -> Dict:
+        """构造参数，用于在子进程中重建生成器"""
+        return {
+            'template_file': self.template_file,
+            'output_dir': self.output_dir,
+            'scale_x': self.scale_x,
+            'scale_y': self.scale_y,
+            'gap': self.gap,
+            'blur_strength': self.blur_strength,
+            'background_audio_path': self.background_audio_path,
+        }
+
+    def _generate_batch_item(self, job) -> Optional[str]:
+        story, video_path, story_idx, video_id, deterministic = job
+        try:
+            return self.generate_from_story(story, video_path, story_idx, video_id, deterministic)
+        except Exception as e:
+            logger.error(f"❌ 故事 {story_idx + 1} 草稿生成失败: {e}")
+            return None
+
     def _generate_draft_internal(self, story: StoryContent, video_path: str, custom_output_dir: str = None) -> str:
         """内部草稿生成方法，直接使用 StoryContent 对象"""
         output_dir = custom_output_dir or self.output_dir
@@ -721,9 +1335,9 @@ class DraftGenerator:
         if self.background_audio_path:
             logging.info(f"背景音频: {self.background_audio_path}")
 
-        # 读取模板文件
-        with open(self.template_file, 'r', encoding='utf-8') as f:
-            draft = json.load(f)
+        # 获取模板副本（模板每个进程只解析一次）
+        template = get_draft_template(self.template_file)
+        draft = template.new_draft()
 
         # 统计有语音文件的对话数量
         audio_dialogues_count = sum(1 for d in story.dialogue_list if d.audio_path)
@@ -758,6 +1372,10 @@ class DraftGenerator:
             speed_factor = nested_duration / main_duration
             logging.info(f"✓ 调整后速度: {speed_factor:.2f}x, 最终时长: {main_duration/1000000:.2f}s")
 
+        # 按故事裁剪视频素材，片段的源时间改为子片段中的时间（放在时长检查之后，跳过的故事不做裁剪）
+        if ENABLE_STORY_SUBCLIP:
+            video_path = self._trim_story_video(nested_data, video_path, output_dir)
+
         # 1. 更新主草稿基本信息
         draft['id'] = generate_uuid()
         draft['duration'] = main_duration
@@ -774,29 +1392,26 @@ class DraftGenerator:
         nested_draft['duration'] = nested_duration
 
         # 替换嵌套草稿的材料 - 使用模板复制
-        video_template = nested_draft['materials']['videos'][0] if nested_draft['materials']['videos'] else None
-        audio_template = nested_draft['materials']['audios'][0] if nested_draft['materials']['audios'] else None
-
         # 清空原有材料
         nested_draft['materials']['videos'] = []
         nested_draft['materials']['audios'] = []
 
         # 复制并修改视频材料
         for video_mat in nested_data['video_materials']:
-            new_video_material = copy.deepcopy(video_template) if video_template else {}
+            new_video_material = template.build('video_material')
             new_video_material.update({
                 "id": video_mat.id,
                 "material_name": video_mat.material_name,
                 "path": video_mat.path,
                 "duration": video_mat.duration,
                 "crop": video_mat.crop,
-                "local_material_id": str(uuid.uuid4())
+                "local_material_id": generate_uuid().lower()
             })
             nested_draft['materials']['videos'].append(new_video_material)
 
         # 复制并修改音频材料
         for audio_mat in nested_data['audio_materials']:
-            new_audio_material = copy.deepcopy(audio_template) if audio_template else {}
+            new_audio_material = template.build('audio_material')
             new_audio_material.update({
                 "id": audio_mat.id,
                 "name": audio_mat.name,
@@ -810,17 +1425,13 @@ class DraftGenerator:
         video_track = nested_draft['tracks'][0]
         audio_track = nested_draft['tracks'][1]
 
-        # 获取模板片段
-        video_seg_template = video_track['segments'][0] if video_track['segments'] else None
-        audio_seg_template = audio_track['segments'][0] if audio_track['segments'] else None
-
         # 清空现有片段
         video_track['segments'] = []
         audio_track['segments'] = []
 
         # 复制并修改视频片段
         for video_seg in nested_data['video_segments']:
-            new_video_seg = copy.deepcopy(video_seg_template) if video_seg_template else {}
+            new_video_seg = template.build('video_segment')
             new_video_seg.update({
                 "id": video_seg.id,
                 "material_id": video_seg.material_id,
@@ -832,15 +1443,12 @@ class DraftGenerator:
             # 更新clip中的scale
             if 'clip' in new_video_seg:
                 new_video_seg['clip']['scale'] = video_seg.clip['scale']
-            # 🆕 保留模板中的 extra_material_refs (音效引用)
-            # 如果模板有 extra_material_refs,则保留它
-            if video_seg_template and 'extra_material_refs' in video_seg_template:
-                new_video_seg['extra_material_refs'] = video_seg_template['extra_material_refs']
+            # 🆕 模板副本中已保留 extra_material_refs (音效引用)
             video_track['segments'].append(new_video_seg)
 
         # 复制并修改音频片段
         for audio_seg in nested_data['audio_segments']:
-            new_audio_seg = copy.deepcopy(audio_seg_template) if audio_seg_template else {}
+            new_audio_seg = template.build('audio_segment')
             new_audio_seg.update({
                 "id": audio_seg.id,
                 "material_id": audio_seg.material_id,
@@ -849,15 +1457,18 @@ class DraftGenerator:
                 "speed": audio_seg.speed,
                 "volume": audio_seg.volume
             })
-            # 🆕 保留模板中的 extra_material_refs (音效引用)
-            # 如果模板有 extra_material_refs,则保留它
-            if audio_seg_template and 'extra_material_refs' in audio_seg_template:
-                new_audio_seg['extra_material_refs'] = audio_seg_template['extra_material_refs']
+            # 🆕 模板副本中已保留 extra_material_refs (音效引用)
             audio_track['segments'].append(new_audio_seg)
 
         # 处理字幕轨道
         self._add_subtitle_tracks(nested_draft, nested_data)
 
+        # 每个片段使用独立的速度/画布材料，删除模板遗留的未引用材料
+        if ENABLE_MATERIAL_PRUNING:
+            self._assign_segment_materials(nested_draft)
+            removed = prune_unreferenced_materials(nested_draft)
+            logging.info(f"🧹 删除未引用的材料: {removed}")
+
         # 3. 更新主草稿的复合视频材料时长
         composite_video = draft['materials']['videos'][0]
         composite_video['duration'] = nested_duration
@@ -868,6 +1479,12 @@ class DraftGenerator:
         main_video_segment['target_timerange']['duration'] = main_duration
         main_video_segment['speed'] = speed_factor
 
+        # 主轴片段引用的速度材料与片段速度保持一致
+        main_refs = set(main_video_segment.get('extra_material_refs') or [])
+        for speed_material in draft['materials'].get('speeds', []):
+            if speed_material.get('id') in main_refs:
+                speed_material['speed'] = speed_factor
+
         # 5. 处理背景音频 - 使用深度拷贝
         if self.background_audio_path:
             # 创建背景音频对象
@@ -883,9 +1500,8 @@ class DraftGenerator:
             )
 
             # 获取模板音频材料并深度拷贝
-            main_audio_template = draft['materials']['audios'][0] if draft['materials']['audios'] else None
-            if main_audio_template:
-                new_bg_audio_material = copy.deepcopy(main_audio_template)
+            if template.parts['main_audio_material']:
+                new_bg_audio_material = template.build('main_audio_material')
                 new_bg_audio_material.update({
                     "id": bg_audio.id,
                     "name": bg_audio.name,
@@ -898,9 +1514,7 @@ class DraftGenerator:
             # 🆕 计算需要多少个背景音频片段来覆盖整个视频时长
             # 如果视频时长超过音频长度，需要循环播放音频
             bg_segments = []
-            main_audio_seg_template = draft['tracks'][2]['segments'][0] if draft['tracks'][2]['segments'] else None
-
-            if main_audio_seg_template:
+            if template.parts['main_audio_segment']:
                 current_position = 0  # 当前时间位置（微秒）
                 segment_index = 0
 
@@ -910,7 +1524,7 @@ class DraftGenerator:
                     segment_duration = min(bg_audio_duration_microseconds, remaining_duration)
 
                     # 创建背景音频 segment
-                    new_bg_audio_segment = copy.deepcopy(main_audio_seg_template)
+                    new_bg_audio_segment = template.build('main_audio_segment')
                     new_bg_audio_segment.update({
                         "id": generate_uuid(),
                         "material_id": bg_audio.id,
@@ -940,39 +1554,23 @@ class DraftGenerator:
             # 清空音频轨道
             draft['tracks'][2]['segments'] = []
 
-        # 6. 复制文件和保存
+        # 6. 放置素材文件和保存
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         materials_dir = output_path / "materials"
         materials_dir.mkdir(exist_ok=True)
 
-        # 直接复制原始视频文件
-        video_src = Path(video_path)
-        video_dest = materials_dir / os.path.basename(video_path)
-
-        if not video_dest.exists():
-            shutil.copy2(video_src, video_dest)
-            logging.info(f"复制视频文件: {video_dest}")
-        else:
-            logging.info(f"视频文件已存在: {video_dest}")
-
-        # 复制音频文件
-        for dialogue in story.dialogue_list:
-            if dialogue.audio_path:
-                audio_src = Path(dialogue.audio_path)
-                audio_dest = materials_dir / os.path.basename(dialogue.audio_path)
-                if not audio_dest.exists():
-                    shutil.copy2(audio_src, audio_dest)
-                    logging.info(f"复制音频文件: {audio_dest}")
-
-        # 复制背景音频
+        # 视频、语音和背景音频通过共享存储放置（优先 reflink/硬链接，不再整份复制）
+        material_files = [video_path] + [f for f in nested_data['audio_files'] if f]
         if self.background_audio_path:
-            bg_audio_src = Path(self.background_audio_path)
-            bg_audio_dest = materials_dir / os.path.basename(self.background_audio_path)
-            if not bg_audio_dest.exists():
-                shutil.copy2(bg_audio_src, bg_audio_dest)
-                logging.info(f"复制背景音频文件: {bg_audio_dest}")
+            material_files.append(self.background_audio_path)
 
+        for material_file in material_files:
+            material_dest = materials_dir / os.path.basename(material_file)
+            method = self.material_store.place(material_file, str(material_dest))
+            logging.info(f"放置素材文件 ({method}): {material_dest}")
+
+        # 模板设置和信息文件会被剪映改写，保持独立复制
         # 复制模板设置文件
         settings_src = Path(DEFAULT_TEMPLATE_SETTINGS)
         if settings_src.exists():
@@ -991,13 +1589,28 @@ class DraftGenerator:
 
         # 保存草稿文件
         draft_file = output_path / "draft_content.json"
+        # 一次性编码后写入：json.dump 逐块写文件时走纯 Python 编码器，慢很多
         with open(draft_file, 'w', encoding='utf-8') as f:
-            json.dump(draft, f, ensure_ascii=False, separators=(',', ':'))
+            f.write(json.dumps(draft, ensure_ascii=False, separators=(',', ':')))
 
         logging.info(f"✓ 简化版复合草稿生成完成: {draft_file}")
         return str(draft_file)
 
 
+# 批量生成的子进程状态
+_batch_generator: Optional[DraftGenerator] = None
+
+
+def _init_batch_worker(config: Dict):
+    global _batch_generator
+    _batch_generator = DraftGenerator(**config)
+    get_draft_template(config['template_file'])
+
+
+def _run_batch_item(job) -> Optional[str]:
+    return _batch_generator._generate_batch_item(job)
+
+
 # 为了向后兼容，保留原有的函数接口
 def generate_simple_composite_draft(enhanced_srt_file, video_path, template_file, output_dir,
                                    scale_x=1.0, scale_y=1.0, gap=0, blur_strength=0.375,
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+草稿导出前检查
+在提交导出前快速检查草稿的结构和时间线（毫秒级），有错误的草稿不再交给导出服务：
+轨道内片段重叠、引用不存在的材料、时长为零或负数、片段超出草稿时长、
+速度与源/目标时长对不上、速度材料与片段速度不一致、文本内容无法解析
+
+用法: python draft_lint.py <draft_content.json> [...]
+"""
+
+import sys
+import json
+from typing import Dict, List, Optional
+
+# 时间误差容忍（微秒）：生成时各处按微秒取整，允许 1 毫秒误差
+LINT_TIME_TOLERANCE = 1000
+
+# 速度校验误差容忍：源时长 / 速度 与目标时长相差不超过 1 帧
+LINT_SPEED_TOLERANCE_FRAMES = 1.0
+
+
+def _issue(path: str, code: str, message: str, level: str = 'error') -> Dict:
+    return {'level': level, 'path': path, 'code': code, 'message': message}
+
+
+def errors_only(issues: List[Dict]) -> List[Dict]:
+    """只保留会导致导出失败的错误（去掉警告）"""
+    return [issue for issue in issues if issue['level'] == 'error']
+
+
+def _fmt(microseconds) -> str:
+    return f"{microseconds / 1000000.0:.3f}s"
+
+
+def _material_index(materials: Dict) -> Dict[str, str]:
+    """材料 ID -> 材料种类（materials 下每个列表都算一种）"""
+    index = {}
+    for kind, items in materials.items():
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            if isinstance(item, dict) and item.get('id'):
+                index[item['id']] = kind
+    return index
+
+
+def lint_draft(draft: Dict, path: str = 'draft') -> List[Dict]:
+    """
+    检查一个草稿（包括其中的嵌套草稿）
+
+    Returns:
+        问题列表 [{'level': 'error'/'warning', 'path': 位置, 'code': 类型, 'message': 说明}, ...]，为空表示通过
+    """
+    issues = []
+    materials = draft.get('materials') or {}
+    index = _material_index(materials)
+    duration = draft.get('duration') or 0
+    fps = float(draft.get('fps') or 30.0)
+    frame = 1000000.0 / fps
+
+    if duration <= 0:
+        issues.append(_issue(path, 'duration', f"草稿时长不是正数: {duration}"))
+
+    speeds = {item['id']: item for item in materials.get('speeds', []) if isinstance(item, dict) and 'id' in item}
+    texts = {item['id']: item for item in materials.get('texts', []) if isinstance(item, dict) and 'id' in item}
+    audios = {item['id']: item for item in materials.get('audios', []) if isinstance(item, dict) and 'id' in item}
+
+    for t, track in enumerate(draft.get('tracks') or []):
+        track_type = track.get('type', '')
+        track_path = f"{path}.tracks[{t}]({track_type})"
+        previous_end = None
+        previous_label = None
+
+        segments = track.get('segments') or []
+        order = sorted(range(len(segments)), key=lambda i: (segments[i].get('target_timerange') or {}).get('start', 0))
+        for s in order:
+            seg = segments[s]
+            label = f"{track_path}.segments[{s}] id={seg.get('id', '?')}"
+
+            # 引用
+            material_id = seg.get('material_id')
+            if material_id not in index:
+                issues.append(_issue(label, 'dangling_material', f"material_id 不存在: {material_id}"))
+            for ref in seg.get('extra_material_refs') or []:
+                if ref not in index:
+                    issues.append(_issue(label, 'dangling_ref', f"extra_material_refs 引用不存在: {ref}"))
+
+            # 时长
+            target = seg.get('target_timerange') or {}
+            start, length = target.get('start'), target.get('duration')
+            if start is None or length is None:
+                issues.append(_issue(label, 'timerange', "缺少 target_timerange"))
+                continue
+            if start < 0:
+                issues.append(_issue(label, 'timerange', f"目标起点为负数: {start}"))
+            if length <= 0:
+                issues.append(_issue(label, 'duration', f"目标时长不是正数: {length}"))
+            end = start + length
+
+            source = seg.get('source_timerange')
+            if source is not None and source.get('duration') is not None and source['duration'] <= 0:
+                issues.append(_issue(label, 'duration', f"源时长不是正数: {source['duration']}"))
+
+            # 超出草稿时长（字幕单独标出）
+            if duration > 0 and end > duration + LINT_TIME_TOLERANCE:
+                code = 'subtitle_past_end' if track_type == 'text' else 'past_end'
+                issues.append(_issue(label, code, f"片段结束 {_fmt(end)} 超出草稿时长 {_fmt(duration)}"))
+
+            # 轨道内重叠
+            if previous_end is not None and start < previous_end - LINT_TIME_TOLERANCE:
+                issues.append(_issue(label, 'overlap',
+                                     f"目标范围 [{_fmt(start)}, {_fmt(end)}) 与 {previous_label} "
+                                     f"(结束于 {_fmt(previous_end)}) 重叠 {_fmt(previous_end - start)}"))
+            if previous_end is None or end > previous_end:
+                previous_end, previous_label = end, f"segments[{s}]"
+
+            # 速度
+            if track_type in ('video', 'audio') and source is not None and source.get('duration'):
+                speed = seg.get('speed', 1.0)
+                if not speed or speed <= 0:
+                    issues.append(_issue(label, 'speed', f"速度不是正数: {speed}"))
+                else:
+                    expected = source['duration'] / speed
+                    if length > 0 and abs(expected - length) > LINT_SPEED_TOLERANCE_FRAMES * frame:
+                        issues.append(_issue(label, 'speed_mismatch',
+                                             f"源时长 {_fmt(source['duration'])} / 速度 {speed:.4f} = {_fmt(expected)}，"
+                                             f"与目标时长 {_fmt(length)} 不一致"))
+                    for ref in seg.get('extra_material_refs') or []:
+                        speed_material = speeds.get(ref)
+                        if speed_material and abs(speed_material.get('speed', 1.0) - speed) > 1e-6:
+                            # 关闭材料清理时片段共用模板的速度材料，只作为警告
+                            issues.append(_issue(label, 'speed_material',
+                                                 f"速度材料 {ref} 的速度 {speed_material.get('speed')} "
+                                                 f"与片段速度 {speed} 不一致", level='warning'))
+
+                # 音频源范围不能超出音频文件
+                audio = audios.get(material_id)
+                if audio and audio.get('duration') and source.get('start') is not None:
+                    source_end = source['start'] + source['duration']
+                    if source_end > audio['duration'] + LINT_TIME_TOLERANCE:
+                        issues.append(_issue(label, 'source_past_end',
+                                             f"源范围结束 {_fmt(source_end)} 超出音频时长 {_fmt(audio['duration'])}"))
+
+            # 文本内容
+            if track_type == 'text' and material_id in texts:
+                try:
+                    content = json.loads(texts[material_id].get('content') or '')
+                    if not isinstance(content, dict) or 'text' not in content:
+                        raise ValueError("缺少 text 字段")
+                except ValueError as e:
+                    issues.append(_issue(label, 'text_content', f"文本材料 {material_id} 内容无法解析: {e}"))
+
+    for d, item in enumerate(materials.get('drafts') or []):
+        if isinstance(item, dict) and isinstance(item.get('draft'), dict):
+            issues.extend(lint_draft(item['draft'], f"{path}.materials.drafts[{d}].draft"))
+    return issues
+
+
+def lint_draft_file(draft_file: str) -> List[Dict]:
+    """检查 draft_content.json，文件无法读取或解析时作为一个问题返回"""
+    try:
+        with open(draft_file, 'r', encoding='utf-8') as f:
+            draft = json.load(f)
+    except (OSError, ValueError) as e:
+        return [_issue(draft_file, 'unreadable', f"草稿无法读取: {e}")]
+    return lint_draft(draft)
+
+
+def format_issues(issues: List[Dict], limit: Optional[int] = 20) -> str:
+    """问题列表 -> 多行报告"""
+    lines = [f"{issue['level'].upper()} [{issue['code']}] {issue['path']}: {issue['message']}"
+             for issue in issues[:limit]]
+    if limit is not None and len(issues) > limit:
+        lines.append(f"... 另有 {len(issues) - limit} 个问题")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python draft_lint.py <draft_content.json> [...]")
+        sys.exit(1)
+
+    failed = False
+    for draft_file in sys.argv[1:]:
+        issues = lint_draft_file(draft_file)
+        errors = errors_only(issues)
+        failed = failed or bool(errors)
+        print(f"[{'ERROR' if errors else 'OK'}] {draft_file}: {len(errors)} 个错误, {len(issues) - len(errors)} 个警告")
+        if issues:
+            print(format_issues(issues, limit=None))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出结果缓存
+以草稿内容（去掉易变字段、ID 归一化）和素材文件摘要计算缓存键，
+草稿和素材都没变时直接返回上次导出的视频，不再调用导出服务；超出容量时按最近最少使用淘汰
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import threading
+import logging
+from typing import Dict, List, Optional
+
+from jy_export import EXPORT_VIDEO_TARGET_DIR
+from material_store import reflink, hardlink
+from tts_cache import touch
+
+# 缓存目录，应与导出目录在同一文件系统（命中时硬链接）
+EXPORT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR', './output/export_cache')
+
+# 缓存容量上限（MB），超出时按最近使用时间淘汰
+EXPORT_CACHE_MAX_MB = int(os.environ.get('EXPORT_CACHE_MAX_MB', '20480'))
+
+# 计算缓存键时忽略的字段（剪映打开草稿时会改写）
+EXPORT_CACHE_VOLATILE_FIELDS = ('create_time', 'update_time', 'last_modified_platform')
+
+# 草稿中素材路径的占位前缀
+DRAFT_PATH_PLACEHOLDER = "##_draftpath_placeholder_0E685133-18CE-45ED-8CB8-2904A212EC80_##"
+
+_UUID_PATTERN = re.compile(r'[0-9A-Fa-f]{8}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{12}')
+
+logger = logging.getLogger(__name__)
+
+
+def _strip_volatile(node):
+    if isinstance(node, dict):
+        return {k: _strip_volatile(v) for k, v in node.items() if k not in EXPORT_CACHE_VOLATILE_FIELDS}
+    if isinstance(node, list):
+        return [_strip_volatile(v) for v in node]
+    return node
+
+
+def canonical_draft_json(draft: Dict) -> str:
+    """
+    草稿的规范化 JSON：去掉易变字段，按键排序，
+    每个 UUID 按首次出现的顺序替换为序号（每次生成的随机 ID 不影响缓存键）
+    """
+    text = json.dumps(_strip_volatile(draft), ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    ordinals: Dict[str, str] = {}
+
+    def replace(match):
+        value = match.group(0).lower()
+        if value not in ordinals:
+            ordinals[value] = f"#id{len(ordinals)}"
+        return ordinals[value]
+
+    return _UUID_PATTERN.sub(replace, text)
+
+
+def material_paths(draft: Dict) -> List[str]:
+    """草稿引用的素材路径（占位路径，去重排序）"""
+    paths = set()
+
+    def walk(node):
+        if isinstance(node, dict):
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+        elif isinstance(node, str) and node.startswith(DRAFT_PATH_PLACEHOLDER):
+            paths.add(node)
+
+    walk(draft)
+    return sorted(paths)
+
+
+class FileDigestIndex:
+    """
+    文件内容 SHA-256 的持久化索引
+    按 (设备, inode, 大小, 修改时间) 记录，共享存储硬链接出来的同一素材在各个草稿中只计算一次
+    """
+
+    def __init__(self, index_file: str):
+        self.index_file = index_file
+        self._lock = threading.Lock()
+        self._digests: Optional[Dict[str, str]] = None
+
+    def digest(self, path: str) -> str:
+        st = os.stat(path)
+        stat_key = f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+        with self._lock:
+            digest = self._load().get(stat_key)
+        if digest:
+            return digest
+
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+
+        with self._lock:
+            self._digests[stat_key] = digest
+            self._save()
+        return digest
+
+    def _load(self) -> Dict[str, str]:
+        if self._digests is None:
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self._digests = json.load(f)
+            except (OSError, ValueError):
+                self._digests = {}
+        return self._digests
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.index_file)), exist_ok=True)
+            tmp_path = f"{self.index_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._digests, f)
+            os.replace(tmp_path, self.index_file)
+        except OSError as e:
+            logger.warning(f"保存素材摘要失败: {e}")
+
+
+_digest_indexes: Dict[str, FileDigestIndex] = {}
+_digest_indexes_lock = threading.Lock()
+
+
+def get_digest_index(cache_dir: str = EXPORT_CACHE_DIR) -> FileDigestIndex:
+    """同一缓存目录的摘要索引在进程内共享"""
+    index_file = os.path.abspath(os.path.join(cache_dir, 'digests.json'))
+    with _digest_indexes_lock:
+        if index_file not in _digest_indexes:
+            _digest_indexes[index_file] = FileDigestIndex(index_file)
+        return _digest_indexes[index_file]
+
+
+class CachedVideoExporter:
+    """带结果缓存的导出器，包装 VideoExporter 或接口相同的导出器"""
+
+    def __init__(self, exporter, cache_dir: str = EXPORT_CACHE_DIR, output_dir: str = EXPORT_VIDEO_TARGET_DIR,
+                 engine: str = '', max_bytes: int = EXPORT_CACHE_MAX_MB * 1024 * 1024):
+        """
+        Args:
+            exporter: 实际执行导出的导出器
+            cache_dir: 缓存目录
+            output_dir: 导出器没有自己的输出目录时，命中缓存的视频放置的目录
+            engine: 导出引擎标识，参与缓存键（不同引擎的成片不通用）
+            max_bytes: 缓存容量上限（字节）
+        """
+        self.exporter = exporter
+        self.cache_dir = cache_dir
+        self.output_dir = output_dir
+        self.engine = engine
+        self.max_bytes = max_bytes
+        self.digests = get_digest_index(cache_dir)
+        self._lock = threading.Lock()
+        self._total_bytes = None  # 首次写入时扫描目录得到
+
+    def export_video(self, draft_abs_path: str, move_to_target: bool = False) -> Optional[str]:
+        """命中缓存时直接返回上次导出的视频，否则调用导出器并把结果放入缓存"""
+        draft_name = os.path.basename(os.path.normpath(draft_abs_path))
+        try:
+            key = self.cache_key(draft_abs_path)
+        except Exception as e:
+            logger.warning(f"计算导出缓存键失败，直接导出: {e}")
+            return self.exporter.export_video(draft_abs_path, move_to_target)
+
+        cached = os.path.join(self.cache_dir, f"{key}.mp4")
+        if os.path.exists(cached):
+            # 放到当前导出器的输出目录，后续整理步骤与本次正常导出一致
+            try:
+                output_path = self._place(cached, os.path.join(self._hit_dir(move_to_target), f"{draft_name}.mp4"))
+                # 最近使用时间记在标记文件上，视频已硬链接到导出目录，不能改它的 mtime
+                touch(f"{cached[:-4]}.used")
+                logger.info(f"💾 导出缓存命中: {draft_name} -> {output_path}")
+                return output_path
+            except OSError as e:
+                logger.warning(f"读取导出缓存失败，重新导出: {e}")
+
+        output_path = self.exporter.export_video(draft_abs_path, move_to_target)
+        if output_path and os.path.exists(output_path):
+            try:
+                self._put(key, output_path, draft_name)
+                logger.info(f"💾 导出结果已缓存: {key[:12]}")
+            except OSError as e:
+                logger.warning(f"写入导出缓存失败: {e}")
+        return output_path
+
+    def _hit_dir(self, move_to_target: bool) -> str:
+        """命中时视频放置的目录：与当前导出器正常导出时一致"""
+        target_dir = getattr(self.exporter, 'target_dir', None)
+        output_dir = getattr(self.exporter, 'output_dir', None)
+        if move_to_target and target_dir:
+            return target_dir
+        return output_dir or target_dir or self.output_dir
+
+    def _put(self, key: str, output_path: str, draft_name: str):
+        cached = os.path.join(self.cache_dir, f"{key}.mp4")
+        with self._lock:
+            self._ensure_total()
+            old_size = os.path.getsize(cached) if os.path.exists(cached) else 0
+            self._place(output_path, cached)
+            with open(f"{cached[:-4]}.json", 'w', encoding='utf-8') as f:
+                json.dump({'draft_name': draft_name}, f, ensure_ascii=False)
+            touch(f"{cached[:-4]}.used")
+            self._total_bytes += os.path.getsize(cached) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _ensure_total(self):
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, _, size in self._scan())
+
+    def _scan(self):
+        """遍历缓存的视频，返回 [(最近使用时间, 路径, 大小), ...]（取 .used 标记文件的 mtime，没有标记时取视频的 mtime）"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.mp4'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            try:
+                used = os.stat(f"{path[:-4]}.used").st_mtime
+            except OSError:
+                used = st.st_mtime
+            entries.append((used, path, st.st_size))
+        return entries
+
+    def _evict(self):
+        """按最近使用时间从旧到新删除，直到总大小回到上限的 90%"""
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._scan())
+        self._total_bytes = sum(size for _, _, size in entries)
+
+        removed = 0
+        for _, path, size in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                # 已链接到导出目录的视频不受影响，只减少一个链接
+                os.remove(path)
+                self._total_bytes -= size
+                removed += 1
+            except OSError as e:
+                logger.warning(f"删除导出缓存失败 {path}: {e}")
+                continue
+            for sidecar in (f"{path[:-4]}.json", f"{path[:-4]}.used"):
+                try:
+                    os.remove(sidecar)
+                except OSError:
+                    pass
+
+        logger.info(f"💾 导出缓存淘汰 {removed} 个视频，当前大小: {self._total_bytes / 1048576:.1f}MB")
+
+    def test_export_service(self) -> bool:
+        return self.exporter.test_export_service()
+
+    def cache_key(self, draft_abs_path: str) -> str:
+        """草稿规范化内容 + 素材摘要 + 引擎标识的 SHA-256"""
+        with open(os.path.join(draft_abs_path, 'draft_content.json'), 'r', encoding='utf-8') as f:
+            draft = json.load(f)
+
+        h = hashlib.sha256()
+        h.update(self.engine.encode('utf-8') + b'\0')
+        h.update(canonical_draft_json(draft).encode('utf-8'))
+        for path in material_paths(draft):
+            local_path = path.replace(DRAFT_PATH_PLACEHOLDER, draft_abs_path)
+            h.update(b'\0' + path.encode('utf-8') + b'\0')
+            h.update(self.digests.digest(local_path).encode('ascii') if os.path.exists(local_path) else b'missing')
+        return h.hexdigest()
+
+    @staticmethod
+    def _place(src: str, dst: str) -> str:
+        """把 src 放到 dst（优先 reflink/硬链接），dst 已是同一文件时不处理"""
+        if os.path.exists(dst) and os.path.samefile(src, dst):
+            return dst
+        os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+        tmp_path = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if not reflink(src, tmp_path) and not hardlink(src, tmp_path):
+            shutil.copy2(src, tmp_path)
+        os.replace(tmp_path, dst)
+        return dst
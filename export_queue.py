@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步导出队列
+草稿提交后立即返回 Future，后台最多同时进行 N 个导出，
+草稿生成不再等待前面故事的导出完成
+"""
+
+import os
+import time
+import threading
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, Set
+
+# 同时在途的导出任务数
+EXPORT_MAX_IN_FLIGHT = int(os.environ.get('EXPORT_MAX_IN_FLIGHT', '2'))
+
+logger = logging.getLogger(__name__)
+
+
+class ExportQueue:
+    """导出任务队列，exporter 为 VideoExporter 或接口相同的导出器"""
+
+    def __init__(self, exporter, max_in_flight: int = EXPORT_MAX_IN_FLIGHT):
+        self.exporter = exporter
+        self.max_in_flight = max(1, max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='export')
+        self._lock = threading.Lock()
+        self._pending: Set[Future] = set()
+        self.stats = {'submitted': 0, 'succeeded': 0, 'failed': 0}
+
+    def submit(self, draft_abs_path: str,
+               on_done: Optional[Callable[[Optional[str]], None]] = None) -> Future:
+        """
+        提交导出任务
+
+        Args:
+            draft_abs_path: 草稿文件夹绝对路径
+            on_done: 导出结束后在工作线程中调用，参数为视频路径（失败为 None）；
+                     回调执行完 Future 才完成，wait_all 返回时结果都已回填
+
+        Returns:
+            结果为视频路径（失败为 None）的 Future
+        """
+        with self._lock:
+            future = self._executor.submit(self._export, draft_abs_path, on_done)
+            self._pending = {f for f in self._pending if not f.done()}
+            self._pending.add(future)
+            self.stats['submitted'] += 1
+            in_queue = len(self._pending)
+        logger.info(f"📤 导出任务已排队: {os.path.basename(draft_abs_path)}（队列中 {in_queue} 个）")
+        return future
+
+    def _export(self, draft_abs_path: str, on_done) -> Optional[str]:
+        start = time.time()
+        try:
+            output_path = self.exporter.export_video(draft_abs_path)
+        except Exception as e:
+            logger.error(f"❌ 导出异常 {os.path.basename(draft_abs_path)}: {e}")
+            output_path = None
+
+        with self._lock:
+            self.stats['succeeded' if output_path else 'failed'] += 1
+        logger.info(f"📹 导出{'完成' if output_path else '失败'} ({time.time() - start:.1f}s): "
+                    f"{os.path.basename(draft_abs_path)}")
+
+        if on_done:
+            try:
+                on_done(output_path)
+            except Exception as e:
+                logger.error(f"❌ 导出回调失败: {e}")
+
+        return output_path
+
+    def wait_all(self, timeout: Optional[float] = None) -> Dict[str, int]:
+        """等待已提交的导出全部结束，返回统计"""
+        with self._lock:
+            pending = list(self._pending)
+        if pending:
+            logger.info(f"⏳ 等待 {len(pending)} 个导出任务完成...")
+        wait(pending, timeout=timeout)
+        with self._lock:
+            self._pending = {f for f in self._pending if not f.done()}
+            return dict(self.stats)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
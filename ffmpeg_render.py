@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 ffmpeg 渲染引擎
+直接读取 DraftGenerator 生成的 draft_content.json，按草稿时间线用一个 ffmpeg 滤镜图渲染成片，
+不依赖剪映导出服务；接口与 VideoExporter 相同，可作为替代导出器
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from jy_export import EXPORT_VIDEO_TARGET_DIR
+
+# 草稿中素材路径的占位前缀，渲染时替换为草稿目录
+DRAFT_PATH_PLACEHOLDER = "##_draftpath_placeholder_0E685133-18CE-45ED-8CB8-2904A212EC80_##"
+
+# 渲染输出目录
+FFMPEG_RENDER_OUTPUT_DIR = os.environ.get('FFMPEG_RENDER_OUTPUT_DIR', './output/rendered_videos')
+
+# x264 编码参数
+FFMPEG_RENDER_PRESET = os.environ.get('FFMPEG_RENDER_PRESET', 'veryfast')
+FFMPEG_RENDER_CRF = int(os.environ.get('FFMPEG_RENDER_CRF', '20'))
+
+# 字幕和标题字体（剪映草稿中的字体路径是 Windows 路径，这里按字体名查找）
+FFMPEG_RENDER_FONT = os.environ.get('FFMPEG_RENDER_FONT', 'Arial')
+FFMPEG_RENDER_FONTS_DIR = os.environ.get('FFMPEG_RENDER_FONTS_DIR', '')
+
+# 剪映字号换算为画布像素：字号 15 在 1920 高的画布上约 107 像素（经验值）
+TEXT_SIZE_RATIO = 0.0037
+
+# 剪映模糊强度换算为 boxblur 半径（在 1/4 分辨率上模糊后放大，省去全分辨率模糊的开销）
+BLUR_DOWNSCALE = 4
+BLUR_RADIUS_PER_STRENGTH = 40
+
+logger = logging.getLogger(__name__)
+
+# 视频尺寸缓存：绝对路径 -> (大小, 修改时间, (宽, 高))
+_size_cache: Dict[str, Tuple[int, int, Tuple[int, int]]] = {}
+_size_cache_lock = threading.Lock()
+
+
+def _seconds(microseconds) -> float:
+    return microseconds / 1000000.0
+
+
+def _even(value: float) -> int:
+    return max(2, int(round(value / 2.0)) * 2)
+
+
+def probe_video_size(video_path: str) -> Tuple[int, int]:
+    """读取视频流的宽高，同一文件只探测一次"""
+    st = os.stat(video_path)
+    key = os.path.abspath(video_path)
+    with _size_cache_lock:
+        cached = _size_cache.get(key)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+
+    cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+           '-show_entries', 'stream=width,height', '-of', 'csv=p=0:s=x', video_path]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    width, height = (int(v) for v in result.stdout.strip().splitlines()[0].split('x')[:2])
+
+    with _size_cache_lock:
+        _size_cache[key] = (st.st_size, st.st_mtime_ns, (width, height))
+    return width, height
+
+
+def atempo_chain(speed: float) -> List[str]:
+    """把变速拆成若干个 0.5~2.0 之间的 atempo，兼容旧版 ffmpeg"""
+    filters = []
+    while speed > 2.0:
+        filters.append('atempo=2.0')
+        speed /= 2.0
+    while speed < 0.5:
+        filters.append('atempo=0.5')
+        speed /= 0.5
+    if abs(speed - 1.0) > 1e-6:
+        filters.append(f'atempo={speed:.6f}')
+    return filters
+
+
+def _ass_time(seconds: float) -> str:
+    centiseconds = max(0, int(round(seconds * 100)))
+    hours, rest = divmod(centiseconds, 360000)
+    minutes, rest = divmod(rest, 6000)
+    secs, cs = divmod(rest, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{cs:02d}"
+
+
+def _ass_color(rgb: List[float]) -> str:
+    """剪映颜色 [r, g, b]（0~1）-> ASS &HBBGGRR&"""
+    r, g, b = (max(0, min(255, int(round(c * 255)))) for c in rgb[:3])
+    return f"&H{b:02X}{g:02X}{r:02X}&"
+
+
+def _hex_to_rgb(color: str) -> List[float]:
+    color = (color or '#ffffff').lstrip('#')
+    if len(color) != 6:
+        return [1.0, 1.0, 1.0]
+    return [int(color[i:i + 2], 16) / 255.0 for i in (0, 2, 4)]
+
+
+class FFmpegRenderer:
+    """本地 ffmpeg 渲染器，export_video / test_export_service 与 VideoExporter 一致"""
+
+    def __init__(self, output_dir: str = FFMPEG_RENDER_OUTPUT_DIR, target_dir: str = EXPORT_VIDEO_TARGET_DIR,
+                 ffmpeg_bin: str = 'ffmpeg'):
+        """
+        初始化渲染器
+
+        Args:
+            output_dir: 渲染输出目录
+            target_dir: move_to_target 时的输出目录
+            ffmpeg_bin: ffmpeg 可执行文件
+        """
+        self.output_dir = output_dir
+        self.target_dir = target_dir
+        self.ffmpeg_bin = ffmpeg_bin
+        self.logger = logging.getLogger(__name__)
+
+    def export_video(self, draft_abs_path: str, move_to_target: bool = False) -> Optional[str]:
+        """
+        渲染草稿为视频
+
+        Args:
+            draft_abs_path: 草稿文件夹绝对路径
+            move_to_target: 是否直接输出到目标目录
+
+        Returns:
+            成功返回视频文件路径，失败返回None
+        """
+        draft_name = os.path.basename(os.path.normpath(draft_abs_path))
+        output_dir = self.target_dir if move_to_target else self.output_dir
+        output_path = os.path.abspath(os.path.join(output_dir, f"{draft_name}.mp4"))
+        self.logger.info(f"正在本地渲染草稿: {draft_name}")
+
+        work_dir = None
+        try:
+            with open(os.path.join(draft_abs_path, 'draft_content.json'), 'r', encoding='utf-8') as f:
+                draft = json.load(f)
+
+            os.makedirs(output_dir, exist_ok=True)
+            work_dir = tempfile.mkdtemp(prefix='render_')
+            tmp_output = os.path.join(work_dir, 'output.mp4')
+            cmd = self.build_command(draft, draft_abs_path, work_dir, tmp_output)
+
+            start = time.time()
+            result = subprocess.run(cmd, cwd=work_dir, capture_output=True, text=True)
+            if result.returncode != 0:
+                self.logger.error(f"ffmpeg 渲染失败: {result.stderr[-2000:]}")
+                return None
+
+            shutil.move(tmp_output, output_path)
+            self.logger.info(f"视频渲染成功 ({time.time() - start:.1f}s): {output_path}")
+            return output_path
+
+        except Exception as e:
+            self.logger.error(f"渲染过程中发生错误: {e}")
+            return None
+        finally:
+            if work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    def test_export_service(self) -> bool:
+        """
+        测试 ffmpeg 是否可用（需要 libass 烧录字幕）
+
+        Returns:
+            可用返回True，否则返回False
+        """
+        try:
+            result = subprocess.run([self.ffmpeg_bin, '-hide_banner', '-filters'],
+                                    capture_output=True, text=True, timeout=10)
+            if result.returncode == 0 and ' subtitles ' in result.stdout:
+                self.logger.info("本地渲染引擎可用")
+                return True
+            self.logger.error("ffmpeg 缺少 subtitles 滤镜（需要 libass）")
+        except Exception as e:
+            self.logger.error(f"本地渲染引擎测试失败: {e}")
+        return False
+
+    def build_command(self, draft: Dict, draft_dir: str, work_dir: str, output_path: str) -> List[str]:
+        """
+        根据草稿构造 ffmpeg 命令，字幕文件和滤镜脚本写到 work_dir（命令需在 work_dir 中执行）
+
+        时间线：嵌套草稿的视频片段逐段裁剪、变速后拼接（同一素材共用输入，见 add_ranges）-> 主轴片段整体变速 ->
+        模糊背景 + 裁剪后的前景合成 -> 烧录逐词字幕和标题；
+        语音按目标起点混音后随主轴变速，再与循环的背景音乐混音
+        """
+        main_segment = self._main_video_segment(draft)
+        nested = self._nested_draft(draft, main_segment)
+        canvas = draft.get('canvas_config') or {}
+        width, height = int(canvas.get('width', 1080)), int(canvas.get('height', 1920))
+        fps = float(draft.get('fps') or 30.0)
+        duration = _seconds(draft['duration'])
+
+        main_start = _seconds(main_segment['source_timerange']['start'])
+        main_source_duration = _seconds(main_segment['source_timerange']['duration'])
+        main_target_start = _seconds(main_segment['target_timerange']['start'])
+        main_speed = float(main_segment.get('speed') or 1.0)
+
+        inputs: List[str] = []
+        graph: List[str] = []
+
+        def add_input(path: str, start: float, length: Optional[float], loop: bool = False) -> int:
+            if loop:
+                inputs.extend(['-stream_loop', '-1'])
+            inputs.extend(['-ss', f"{start:.6f}"])
+            if length is not None:
+                inputs.extend(['-t', f"{length:.6f}"])
+            inputs.extend(['-i', path])
+            return inputs.count('-i') - 1
+
+        def add_ranges(items: List[Tuple[str, float, float]], stream: str) -> List[str]:
+            """
+            按时间线顺序的 (素材, 源起点, 源时长) -> 各片段从 0 开始的流标签
+            同一素材中源起点不回退的连续片段共用一个输入（一个解码器），用 split + trim 分出各片段；
+            源起点回退时另开输入，避免 split 为后面的片段缓存大量帧
+            """
+            prefix = 'a' if stream == 'a' else ''
+            labels: List[Optional[str]] = [None] * len(items)
+            runs: Dict[str, List[List[int]]] = {}
+            for k, (path, start, _) in enumerate(items):
+                path_runs = runs.setdefault(path, [])
+                if path_runs and start >= items[path_runs[-1][-1]][1]:
+                    path_runs[-1].append(k)
+                else:
+                    path_runs.append([k])
+
+            for path, path_runs in runs.items():
+                for run in path_runs:
+                    run_start = items[run[0]][1]
+                    run_end = max(items[k][1] + items[k][2] for k in run)
+                    index = add_input(path, run_start, run_end - run_start)
+                    sources = [f"[{index}:{stream}]"]
+                    if len(run) > 1:
+                        sources = [f"[{stream}split{k}]" for k in run]
+                        graph.append(f"[{index}:{stream}]{prefix}split={len(run)}" + ''.join(sources))
+                    for k, source in zip(run, sources):
+                        labels[k] = f"{stream}src{k}"
+                        graph.append(f"{source}{prefix}trim=start={items[k][1] - run_start:.6f}:duration={items[k][2]:.6f},"
+                                     f"{prefix}setpts=PTS-STARTPTS[{labels[k]}]")
+            return labels
+
+        # 1. 嵌套草稿视频：逐段裁剪、变速，空隙补黑帧
+        video_segments = self._segments(nested, 'video')
+        if not video_segments:
+            raise ValueError("草稿中没有视频片段")
+        videos = {m['id']: m for m in nested['materials'].get('videos', [])}
+        layout = self._layout(videos[video_segments[0]['material_id']], video_segments[0], draft_dir, width, height)
+        fg_width, fg_height = layout['size']
+        video_sources = add_ranges([(self._resolve(videos[seg['material_id']]['path'], draft_dir),
+                                     _seconds(seg['source_timerange']['start']),
+                                     _seconds(seg['source_timerange']['duration'])) for seg in video_segments], 'v')
+
+        sequence = []
+        position = 0.0
+        for seg, source in zip(video_segments, video_sources):
+            material = videos[seg['material_id']]
+            target_start = _seconds(seg['target_timerange']['start'])
+            target_duration = _seconds(seg['target_timerange']['duration'])
+            if target_start - position > 0.5 / fps:
+                label = f"gap{len(sequence)}"
+                graph.append(f"color=c=black:s={fg_width}x{fg_height}:r={fps}:d={target_start - position:.6f},"
+                             f"format=yuv420p,setsar=1[{label}]")
+                sequence.append(label)
+
+            crop_w, crop_h, crop_x, crop_y = self._crop_box(material, draft_dir)
+            speed = float(seg.get('speed') or 1.0)
+            label = f"v{len(sequence)}"
+            graph.append(f"[{source}]setpts=PTS/{speed:.6f},fps={fps},"
+                         f"crop={crop_w}:{crop_h}:{crop_x}:{crop_y},scale={fg_width}:{fg_height},setsar=1,"
+                         f"format=yuv420p,tpad=stop_mode=clone:stop_duration={target_duration:.6f},"
+                         f"trim=duration={target_duration:.6f},setpts=PTS-STARTPTS[{label}]")
+            sequence.append(label)
+            position = target_start + target_duration
+
+        graph.append(''.join(f"[{label}]" for label in sequence) +
+                     f"concat=n={len(sequence)}:v=1:a=0[nested]")
+
+        # 2. 主轴变速后再合成，只对输出帧做缩放、模糊和叠加
+        graph.append(f"[nested]trim=start={main_start:.6f}:duration={main_source_duration:.6f},"
+                     f"setpts=(PTS-STARTPTS)/{main_speed:.6f}+{main_target_start:.6f}/TB,fps={fps},"
+                     f"split=2[bgsrc][fg]")
+        blur = self._canvas_blur(nested, video_segments[0])
+        if blur > 0:
+            small_w, small_h = _even(width / BLUR_DOWNSCALE), _even(height / BLUR_DOWNSCALE)
+            radius = max(1, min(int(round(blur * BLUR_RADIUS_PER_STRENGTH)), min(small_w, small_h) // 4))
+            graph.append(f"[bgsrc]scale={small_w}:{small_h}:force_original_aspect_ratio=increase,"
+                         f"crop={small_w}:{small_h},boxblur=luma_radius={radius}:luma_power=2,"
+                         f"scale={width}:{height},setsar=1[bg]")
+        else:
+            graph.append(f"[bgsrc]scale={width}:{height},drawbox=c=black:t=fill,setsar=1[bg]")
+        graph.append(f"[bg][fg]overlay=x={layout['x']}:y={layout['y']},format=yuv420p[comp]")
+
+        # 3. 字幕和标题写入一个 ASS 文件（字幕时间换算到主轴时间）
+        def to_main(seconds: float) -> float:
+            return (seconds - main_start) / main_speed + main_target_start
+
+        events = self._text_events(nested, width, height, to_main)
+        events += self._text_events(draft, width, height, lambda t: t)
+        subtitle_file = os.path.join(work_dir, 'render.ass')
+        with open(subtitle_file, 'w', encoding='utf-8') as f:
+            f.write(self._ass_document(events, width, height))
+        subtitle_filter = "subtitles=render.ass"
+        if FFMPEG_RENDER_FONTS_DIR:
+            fonts_dir = os.path.abspath(FFMPEG_RENDER_FONTS_DIR).replace('\\', '/').replace(':', '\\:')
+            subtitle_filter += f":fontsdir='{fonts_dir}'"
+        graph.append(f"[comp]{subtitle_filter}[vout]")
+
+        # 4. 语音：按目标起点延迟后混音，再随主轴变速
+        voices = []
+        audios = {m['id']: m for m in nested['materials'].get('audios', [])}
+        voice_segments = [seg for seg in self._segments(nested, 'audio') if seg['material_id'] in audios]
+        voice_sources = add_ranges([(self._resolve(audios[seg['material_id']]['path'], draft_dir),
+                                     _seconds(seg['source_timerange']['start']),
+                                     _seconds(seg['source_timerange']['duration'])) for seg in voice_segments], 'a')
+        for seg, source in zip(voice_segments, voice_sources):
+            delay = int(round(_seconds(seg['target_timerange']['start']) * 1000))
+            chain = ['aresample=48000', 'aformat=channel_layouts=stereo']
+            chain += atempo_chain(float(seg.get('speed') or 1.0))
+            chain += [f"volume={float(seg.get('volume', 1.0)):.6f}", f"adelay=delays={delay}:all=1"]
+            label = f"a{len(voices)}"
+            graph.append(f"[{source}]" + ','.join(chain) + f"[{label}]")
+            voices.append(label)
+
+        main_chain = [f"atrim=start={main_start:.6f}:duration={main_source_duration:.6f}", 'asetpts=PTS-STARTPTS']
+        main_chain += atempo_chain(main_speed)
+        main_chain += [f"volume={float(main_segment.get('volume', 1.0)):.6f}",
+                       f"adelay=delays={int(round(main_target_start * 1000))}:all=1"]
+        mix = ["voice"]
+        if voices:
+            graph.append(self._mix(voices, 'voicemix') + f";[voicemix]apad," + ','.join(main_chain) + "[voice]")
+        else:
+            graph.append(f"anullsrc=r=48000:cl=stereo,atrim=duration={duration:.6f}[voice]")
+
+        # 5. 背景音乐：同一素材首尾相接的循环片段合并为一个循环输入
+        main_audios = {m['id']: m for m in draft['materials'].get('audios', [])}
+        for run in self._background_runs(draft, main_audios):
+            material, start, target_start, length, volume = run
+            index = add_input(self._resolve(material['path'], draft_dir), start, length, loop=True)
+            label = f"bgm{len(mix)}"
+            graph.append(f"[{index}:a]aresample=48000,aformat=channel_layouts=stereo,volume={volume:.6f},"
+                         f"adelay=delays={int(round(target_start * 1000))}:all=1[{label}]")
+            mix.append(label)
+
+        graph.append(self._mix(mix, 'amixed') + f";[amixed]apad,atrim=duration={duration:.6f}[aout]")
+
+        script_file = os.path.join(work_dir, 'filter_graph.txt')
+        with open(script_file, 'w', encoding='utf-8') as f:
+            f.write(';\n'.join(graph))
+
+        return ([self.ffmpeg_bin, '-v', 'error', '-y'] + inputs +
+                ['-filter_complex_script', 'filter_graph.txt',
+                 '-map', '[vout]', '-map', '[aout]',
+                 '-c:v', 'libx264', '-preset', FFMPEG_RENDER_PRESET, '-crf', str(FFMPEG_RENDER_CRF),
+                 '-pix_fmt', 'yuv420p', '-r', f"{fps}",
+                 '-c:a', 'aac', '-b:a', '192k', '-ar', '48000',
+                 '-t', f"{duration:.6f}", '-movflags', '+faststart', output_path])
+
+    @staticmethod
+    def _mix(labels: List[str], output: str) -> str:
+        if len(labels) == 1:
+            return f"[{labels[0]}]anull[{output}]"
+        return (''.join(f"[{label}]" for label in labels) +
+                f"amix=inputs={len(labels)}:normalize=0:duration=longest[{output}]")
+
+    @staticmethod
+    def _resolve(path: str, draft_dir: str) -> str:
+        """占位路径 -> 草稿目录中的实际路径"""
+        return os.path.abspath(path.replace(DRAFT_PATH_PLACEHOLDER, draft_dir))
+
+    @staticmethod
+    def _segments(draft: Dict, track_type: str) -> List[Dict]:
+        segments = []
+        for track in draft.get('tracks', []):
+            if track.get('type') == track_type:
+                segments.extend(track.get('segments', []))
+        return sorted(segments, key=lambda s: s['target_timerange']['start'])
+
+    def _main_video_segment(self, draft: Dict) -> Dict:
+        segments = self._segments(draft, 'video')
+        if not segments:
+            raise ValueError("主轴没有视频片段")
+        return segments[0]
+
+    @staticmethod
+    def _nested_draft(draft: Dict, main_segment: Dict) -> Dict:
+        """主轴复合片段对应的嵌套草稿"""
+        drafts = draft['materials'].get('drafts', [])
+        if not drafts:
+            raise ValueError("草稿中没有嵌套草稿")
+        for item in drafts:
+            if item.get('id') == main_segment.get('material_id'):
+                return item['draft']
+        return drafts[0]['draft']
+
+    def _crop_box(self, material: Dict, draft_dir: str) -> Tuple[int, int, int, int]:
+        """素材裁剪框（像素），返回 (宽, 高, x, y)"""
+        src_w, src_h = probe_video_size(self._resolve(material['path'], draft_dir))
+        crop = material.get('crop') or {}
+        x1 = crop.get('upper_left_x', 0.0)
+        y1 = crop.get('upper_left_y', 0.0)
+        x2 = crop.get('lower_right_x', 1.0)
+        y2 = crop.get('lower_right_y', 1.0)
+        crop_w = _even((x2 - x1) * src_w)
+        crop_h = _even((y2 - y1) * src_h)
+        crop_x = min(int(x1 * src_w), src_w - crop_w)
+        crop_y = min(int(y1 * src_h), src_h - crop_h)
+        return crop_w, crop_h, max(0, crop_x), max(0, crop_y)
+
+    def _layout(self, material: Dict, segment: Dict, draft_dir: str, width: int, height: int) -> Dict:
+        """
+        前景尺寸和位置：裁剪后的画面先适配画布，再按片段的 clip 缩放和偏移
+        （剪映的 transform 以半个画布为单位，y 向上为正）
+        """
+        crop_w, crop_h, _, _ = self._crop_box(material, draft_dir)
+        clip = segment.get('clip') or {}
+        scale = clip.get('scale') or {}
+        transform = clip.get('transform') or {}
+        fit = min(width / crop_w, height / crop_h)
+        fg_width = _even(crop_w * fit * scale.get('x', 1.0))
+        fg_height = _even(crop_h * fit * scale.get('y', 1.0))
+        x = int(round((width - fg_width) / 2 + transform.get('x', 0.0) * width / 2))
+        y = int(round((height - fg_height) / 2 - transform.get('y', 0.0) * height / 2))
+        return {'size': (fg_width, fg_height), 'x': x, 'y': y}
+
+    @staticmethod
+    def _canvas_blur(nested: Dict, segment: Dict) -> float:
+        """片段引用的模糊画布强度，没有模糊画布时返回 0"""
+        canvases = {c['id']: c for c in nested['materials'].get('canvases', [])}
+        for ref in segment.get('extra_material_refs') or []:
+            canvas = canvases.get(ref)
+            if canvas and canvas.get('type') == 'canvas_blur':
+                return float(canvas.get('blur') or 0.0)
+        return 0.0
+
+    def _text_events(self, draft: Dict, width: int, height: int, to_main) -> List[str]:
+        """草稿文本片段 -> ASS 事件（已换算到主轴时间）"""
+        texts = {m['id']: m for m in draft['materials'].get('texts', [])}
+        events = []
+        for seg in self._segments(draft, 'text'):
+            material = texts.get(seg['material_id'])
+            if not material:
+                continue
+            try:
+                content = json.loads(material.get('content') or '{}')
+            except ValueError:
+                continue
+            text = content.get('text', '')
+            if not text.strip():
+                continue
+            style = (content.get('styles') or [{}])[0]
+            clip = seg.get('clip') or {}
+            scale = (clip.get('scale') or {}).get('x', 1.0)
+            transform = clip.get('transform') or {}
+
+            font_size = style.get('size', material.get('font_size', 15)) * scale * height * TEXT_SIZE_RATIO
+            fill = ((style.get('fill') or {}).get('content') or {}).get('solid', {}).get('color')
+            color = _ass_color(fill or _hex_to_rgb(material.get('text_color')))
+            tags = [r"\an5", f"\\pos({int(round(width / 2 + transform.get('x', 0.0) * width / 2))},"
+                             f"{int(round(height / 2 - transform.get('y', 0.0) * height / 2))})",
+                    f"\\fs{font_size:.1f}", f"\\c{color}", f"\\b{1 if style.get('bold') else 0}"]
+            strokes = style.get('strokes') or []
+            if strokes:
+                stroke_color = (strokes[0].get('content') or {}).get('solid', {}).get('color', [0, 0, 0])
+                tags += [f"\\3c{_ass_color(stroke_color)}", f"\\bord{strokes[0].get('width', 0.0) * font_size / 2:.1f}"]
+            else:
+                tags.append(r"\bord0")
+
+            start = _seconds(seg['target_timerange']['start'])
+            end = start + _seconds(seg['target_timerange']['duration'])
+            text = text.replace('{', '(').replace('}', ')').replace('\n', r'\N')
+            events.append(f"Dialogue: 0,{_ass_time(to_main(start))},{_ass_time(to_main(end))},Default,,0,0,0,,"
+                          f"{{{''.join(tags)}}}{text}")
+        return events
+
+    @staticmethod
+    def _ass_document(events: List[str], width: int, height: int) -> str:
+        return '\n'.join([
+            '[Script Info]',
+            'ScriptType: v4.00+',
+            f'PlayResX: {width}',
+            f'PlayResY: {height}',
+            'WrapStyle: 2',
+            'ScaledBorderAndShadow: yes',
+            '',
+            '[V4+ Styles]',
+            'Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, '
+            'Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, '
+            'Alignment, MarginL, MarginR, MarginV, Encoding',
+            f'Style: Default,{FFMPEG_RENDER_FONT},48,&H00FFFFFF,&H00FFFFFF,&H00000000,&H00000000,'
+            '0,0,0,0,100,100,0,0,1,0,0,5,0,0,0,1',
+            '',
+            '[Events]',
+            'Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text',
+        ] + events) + '\n'
+
+    def _background_runs(self, draft: Dict, audios: Dict[str, Dict]) -> List[Tuple[Dict, float, float, float, float]]:
+        """
+        主轴音频片段 -> [(素材, 源起点, 目标起点, 时长, 音量)]
+        DraftGenerator 把背景音乐切成首尾相接、都从头播放的片段，这些片段合并为一个 -stream_loop 输入
+        """
+        runs = []
+        previous_length = None
+        for seg in self._segments(draft, 'audio'):
+            material = audios.get(seg['material_id'])
+            if not material:
+                continue
+            start = _seconds(seg['source_timerange']['start'])
+            target_start = _seconds(seg['target_timerange']['start'])
+            length = _seconds(seg['target_timerange']['duration'])
+            volume = float(seg.get('volume', 1.0))
+            if runs:
+                last = runs[-1]
+                # 上一段必须完整播放了整个素材，下一段从头接上才等同于循环
+                if (last[0] is material and start == 0.0 and last[1] == 0.0 and last[4] == volume
+                        and abs(last[2] + last[3] - target_start) < 0.001
+                        and abs(previous_length - _seconds(material.get('duration', 0))) < 0.001):
+                    runs[-1] = (material, 0.0, last[2], last[3] + length, volume)
+                    previous_length = length
+                    continue
+            runs.append((material, start, target_start, length, volume))
+            previous_length = length
+        return runs
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("用法: python ffmpeg_render.py <draft_folder>")
+        sys.exit(1)
+
+    renderer = FFmpegRenderer()
+    if not renderer.test_export_service():
+        print("[ERROR] 本地渲染引擎不可用")
+        sys.exit(1)
+
+    video_path = renderer.export_video(os.path.abspath(sys.argv[1]))
+    if video_path:
+        print(f"[OK] 视频渲染成功: {video_path}")
+    else:
+        print("[ERROR] 视频渲染失败")
+        sys.exit(1)
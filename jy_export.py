@@ -6,14 +6,28 @@
 """
 
 import os
+import time
 import shutil
+import threading
 import requests
 import logging
-from typing import Optional
+from typing import Dict, List, Optional
 
 # 常量：导出视频的目标移动路径
 EXPORT_VIDEO_TARGET_DIR = "./output/exported_videos"
 
+# 多台导出服务地址（逗号分隔），未配置时只使用 EXPORT_VIDEO_URL
+EXPORT_VIDEO_URLS = [url.strip() for url in os.getenv("EXPORT_VIDEO_URLS", "").split(",") if url.strip()]
+
+# 每台导出服务同时处理的草稿数
+EXPORT_PER_HOST_IN_FLIGHT = int(os.getenv("EXPORT_PER_HOST_IN_FLIGHT", "1"))
+
+# 不可用的导出服务多久后重新探测（秒）
+EXPORT_HEALTH_RECHECK_SECONDS = 30
+
+# 连续导出失败多少次后暂时下线该服务（探测接口正常但导出一直失败的情况）
+EXPORT_HOST_MAX_FAILURES = 3
+
 # 配置日志格式，包含行号
 logging.basicConfig(
     level=logging.INFO,
@@ -34,6 +48,7 @@ class VideoExporter:
             target_dir: 导出视频的目标目录
         """
         self.export_url = export_url or os.getenv("EXPORT_VIDEO_URL", "http://localhost:51053")
+        self.target_dir = target_dir
         self.logger = logging.getLogger(__name__)
         
 
@@ -170,6 +185,166 @@ class VideoExporter:
         return False
 
 
+class _ExportHost:
+    """一台导出服务的状态和统计"""
+
+    def __init__(self, export_url: str, target_dir: str):
+        self.url = export_url
+        self.exporter = VideoExporter(export_url, target_dir)
+        self.healthy: Optional[bool] = None  # None 表示尚未探测
+        self.checked_at = 0.0
+        self.probing = False
+        self.consecutive_failures = 0
+        self.in_flight = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+
+
+class MultiHostVideoExporter:
+    """
+    多台导出服务的负载均衡导出器，接口与 VideoExporter 相同
+
+    每个草稿交给在途任务最少的可用服务；导出失败时换一台服务重试，
+    并重新探测失败的服务，不可用的服务在 EXPORT_HEALTH_RECHECK_SECONDS 后再探测
+    """
+
+    def __init__(self, export_urls: Optional[List[str]] = None, target_dir: str = EXPORT_VIDEO_TARGET_DIR,
+                 per_host_in_flight: int = EXPORT_PER_HOST_IN_FLIGHT):
+        """
+        初始化多服务导出器
+
+        Args:
+            export_urls: 导出服务URL列表，不提供则从环境变量读取
+            target_dir: 导出视频的目标目录
+            per_host_in_flight: 每台服务同时处理的草稿数
+        """
+        urls = export_urls or EXPORT_VIDEO_URLS or [os.getenv("EXPORT_VIDEO_URL", "http://localhost:51053")]
+        self.target_dir = target_dir
+        self.hosts = [_ExportHost(url, target_dir) for url in urls]
+        self.per_host_in_flight = max(1, per_host_in_flight)
+        self.logger = logging.getLogger(__name__)
+        self._cond = threading.Condition()
+        self._started_at: Optional[float] = None
+
+    @property
+    def capacity(self) -> int:
+        """全部服务同时可处理的草稿数"""
+        return len(self.hosts) * self.per_host_in_flight
+
+    def _probe(self, host: _ExportHost) -> bool:
+        healthy = host.exporter.test_export_service()
+        with self._cond:
+            if host.consecutive_failures >= EXPORT_HOST_MAX_FAILURES:
+                healthy = False
+                host.consecutive_failures = 0
+                self.logger.warning(f"导出服务 {host.url} 连续导出失败，暂时下线")
+            if host.healthy != healthy:
+                self.logger.info(f"导出服务 {host.url} {'可用' if healthy else '不可用'}")
+            host.healthy = healthy
+            host.checked_at = time.time()
+            host.probing = False
+            self._cond.notify_all()
+        return healthy
+
+    def _acquire(self, tried: set) -> Optional[_ExportHost]:
+        """选出在途任务最少的可用服务并占用一个名额；都忙时等待，没有可用服务时返回 None"""
+        while True:
+            with self._cond:
+                candidates = [h for h in self.hosts if h not in tried]
+                now = time.time()
+                stale = [h for h in candidates if not h.probing and (
+                    h.healthy is None or (not h.healthy and now - h.checked_at >= EXPORT_HEALTH_RECHECK_SECONDS))]
+                for host in stale:
+                    host.probing = True
+                if not stale:
+                    healthy = [h for h in candidates if h.healthy]
+                    if not healthy and not any(h.probing for h in candidates):
+                        return None
+                    free = [h for h in healthy if h.in_flight < self.per_host_in_flight]
+                    if free:
+                        host = min(free, key=lambda h: (h.in_flight, h.succeeded + h.failed))
+                        host.in_flight += 1
+                        if self._started_at is None:
+                            self._started_at = now
+                        return host
+                    self._cond.wait(timeout=EXPORT_HEALTH_RECHECK_SECONDS)
+                    continue
+
+            # 探测在锁外进行，避免阻塞其他线程
+            for host in stale:
+                self._probe(host)
+
+    def export_video(self, draft_abs_path: str, move_to_target: bool = False) -> Optional[str]:
+        """
+        导出剪映草稿为视频，失败时依次换其他服务重试
+
+        Returns:
+            成功返回视频文件路径，失败返回None
+        """
+        tried = set()
+        while True:
+            host = self._acquire(tried)
+            if host is None:
+                self.logger.error(f"没有可用的导出服务: {os.path.basename(draft_abs_path)}")
+                return None
+            tried.add(host)
+
+            start = time.time()
+            output_path = None
+            try:
+                output_path = host.exporter.export_video(draft_abs_path, move_to_target)
+            finally:
+                with self._cond:
+                    host.in_flight -= 1
+                    host.busy_seconds += time.time() - start
+                    if output_path:
+                        host.succeeded += 1
+                        host.consecutive_failures = 0
+                    else:
+                        host.failed += 1
+                        host.consecutive_failures += 1
+                    self._cond.notify_all()
+
+            if output_path:
+                return output_path
+
+            self.logger.warning(f"导出服务 {host.url} 导出失败，换其他服务重试")
+            with self._cond:
+                if host.probing:
+                    continue
+                host.probing = True
+            self._probe(host)
+
+    def test_export_service(self) -> bool:
+        """探测全部导出服务，至少一台可用时返回True"""
+        results = []
+        for host in self.hosts:
+            with self._cond:
+                host.probing = True
+            results.append(self._probe(host))
+        return any(results)
+
+    def report(self) -> List[Dict]:
+        """每台服务的导出统计"""
+        with self._cond:
+            elapsed = time.time() - self._started_at if self._started_at else 0.0
+            return [{
+                'url': h.url,
+                'healthy': h.healthy,
+                'succeeded': h.succeeded,
+                'failed': h.failed,
+                'avg_seconds': h.busy_seconds / (h.succeeded + h.failed) if h.succeeded + h.failed else 0.0,
+                'videos_per_minute': h.succeeded * 60.0 / elapsed if elapsed else 0.0,
+            } for h in self.hosts]
+
+    def log_report(self):
+        for item in self.report():
+            status = '可用' if item['healthy'] else ('未探测' if item['healthy'] is None else '不可用')
+            self.logger.info(f"导出服务 {item['url']} [{status}]: 成功 {item['succeeded']}，失败 {item['failed']}，"
+                             f"平均 {item['avg_seconds']:.1f}s/个，吞吐 {item['videos_per_minute']:.2f} 个/分钟")
+
+
 if __name__ == "__main__":
     # 测试代码
     import sys
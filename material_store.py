@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+草稿素材共享存储
+草稿 materials/ 中的视频和音频尽量不复制：优先 reflink（写时复制），其次硬链接；
+源文件在其他文件系统时先复制一份到共享存储，之后所有草稿都硬链接到这一份；
+都不支持时退化为符号链接，最后才复制
+"""
+
+import os
+import shutil
+import hashlib
+import threading
+import logging
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 共享存储目录，应与草稿输出目录在同一文件系统
+MATERIAL_STORE_DIR = os.environ.get('MATERIAL_STORE_DIR', './output/material_store')
+
+# 是否允许符号链接兜底（草稿需要整体拷到其他机器时可关闭）
+MATERIAL_STORE_ALLOW_SYMLINK = os.environ.get('MATERIAL_STORE_ALLOW_SYMLINK', '1') == '1'
+
+# Linux FICLONE ioctl
+_FICLONE = 0x40049409
+
+logger = logging.getLogger(__name__)
+
+
+def reflink(src: str, dst: str) -> bool:
+    """尝试创建 reflink（Btrfs/XFS 等支持写时复制的文件系统），失败返回 False"""
+    if fcntl is None:
+        return False
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+
+def hardlink(src: str, dst: str) -> bool:
+    """尝试创建硬链接，失败返回 False"""
+    try:
+        os.link(src, dst)
+        return True
+    except OSError:
+        return False
+
+
+class MaterialStore:
+    """草稿素材的放置和跨文件系统去重"""
+
+    def __init__(self, store_dir: str = MATERIAL_STORE_DIR, allow_symlink: bool = MATERIAL_STORE_ALLOW_SYMLINK):
+        self.store_dir = store_dir
+        self.allow_symlink = allow_symlink
+        self._lock = threading.Lock()
+        self._ingested: Dict[tuple, str] = {}
+
+    def place(self, src: str, dst: str) -> str:
+        """
+        把 src 放到 dst（dst 已存在时不处理）
+
+        Returns:
+            使用的方式：'exists' / 'reflink' / 'hardlink' / 'store' / 'symlink' / 'copy'
+        """
+        if os.path.exists(dst):
+            return 'exists'
+        if os.path.lexists(dst):  # 失效的符号链接
+            os.remove(dst)
+
+        if reflink(src, dst):
+            return 'reflink'
+        if hardlink(src, dst):
+            return 'hardlink'
+
+        # 源文件在其他文件系统：复制到共享存储一次，再从存储硬链接
+        stored = self._ingest(src)
+        if stored and hardlink(stored, dst):
+            return 'store'
+
+        if self.allow_symlink:
+            try:
+                os.symlink(os.path.abspath(src), dst)
+                return 'symlink'
+            except OSError:
+                pass
+
+        shutil.copy2(src, dst)
+        return 'copy'
+
+    def _ingest(self, src: str) -> Optional[str]:
+        """按 (路径, 大小, 修改时间) 把源文件放入共享存储，返回存储中的路径"""
+        try:
+            st = os.stat(src)
+        except OSError as e:
+            logger.warning(f"读取素材失败 {src}: {e}")
+            return None
+
+        key = (os.path.abspath(src), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            stored = self._ingested.get(key)
+            if stored and os.path.exists(stored):
+                return stored
+
+            digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:16]
+            name, ext = os.path.splitext(os.path.basename(src))
+            stored = os.path.join(self.store_dir, f"{name}_{digest}{ext}")
+            if not os.path.exists(stored):
+                try:
+                    os.makedirs(self.store_dir, exist_ok=True)
+                    tmp_path = f"{stored}.{os.getpid()}.tmp"
+                    if not reflink(src, tmp_path):
+                        shutil.copy2(src, tmp_path)
+                    os.replace(tmp_path, stored)
+                    logger.info(f"素材已放入共享存储: {stored}")
+                except OSError as e:
+                    logger.warning(f"放入共享存储失败 {src}: {e}")
+                    return None
+
+            self._ingested[key] = stored
+            return stored
@@ -4,12 +4,19 @@ from tts_client_new import TTSClient
 from draft_gen import DraftGenerator
 from dl_splitter_video import VideoDownloader
 from srt_generate import JSONSubtitleGenerator
-from data_models import StoryDialogue, StoryContent, VideoSegment, VideoProject
-from jy_export import VideoExporter
+from data_models import StoryDialogue, StoryContent, StoryPart, VideoSegment, VideoProject
+from jy_export import VideoExporter, MultiHostVideoExporter, EXPORT_VIDEO_URLS
+from ffmpeg_render import FFmpegRenderer
+from export_queue import ExportQueue, EXPORT_MAX_IN_FLIGHT
+from export_cache import CachedVideoExporter
+from draft_bundle import BundleVideoExporter
+from draft_lint import lint_draft_file, errors_only, format_issues
+from audio_utils import probe_audio_duration
 import sys
 import json
 import os
 import shutil
+import threading
 from datetime import datetime
 from typing import List, Dict, Optional
 from pathlib import Path
@@ -19,6 +26,19 @@ import logging
 
 PROJECT_CACHE_DIR = './output/project_cache'
 
+# 单文件旁白模式 - 开启时每个故事的对话语音拼成一个旁白文件，草稿只引用这一个音频
+ENABLE_STORY_NARRATION_TRACK = False
+
+# 导出引擎：'jianying' 调用剪映导出服务，'ffmpeg' 用本地 ffmpeg 直接渲染草稿，
+# 'bundle' 把草稿打包发送到远程导出服务（素材按内容去重，成片流式传回）
+EXPORT_ENGINE = os.environ.get('EXPORT_ENGINE', 'jianying')
+
+# 导出结果缓存 - 草稿内容和素材都没变时直接复用上次导出的视频
+ENABLE_EXPORT_CACHE = True
+
+# 导出前检查草稿结构和时间线，有错误的草稿不提交导出
+ENABLE_DRAFT_LINT = True
+
 sys_prompt = """
 你是一个专业的视频内容编辑助手。你的任务是接收用户输入的 JSON 数组（包含 index 字段，类似 SRT 格式），然后根据故事情节对内容进行精确切割和优化处理，最终输出为纯 JSON 格式。
 核心要求与优化目标：
@@ -92,7 +112,28 @@ class ShortStoryGenerator:
         self.draft_generator = DraftGenerator()
 
         # 初始化视频导出器
-        self.video_exporter = VideoExporter()
+        export_in_flight = EXPORT_MAX_IN_FLIGHT
+        if EXPORT_ENGINE == 'ffmpeg':
+            self.export_backend = FFmpegRenderer()
+        elif EXPORT_ENGINE == 'bundle':
+            self.export_backend = BundleVideoExporter()
+        elif len(EXPORT_VIDEO_URLS) > 1:
+            # 多台导出服务：负载均衡，队列深度随机器数增加
+            self.export_backend = MultiHostVideoExporter()
+            export_in_flight = max(export_in_flight, self.export_backend.capacity)
+        else:
+            self.export_backend = VideoExporter()
+        logging.info(f"📹 导出引擎: {EXPORT_ENGINE}")
+
+        if ENABLE_EXPORT_CACHE:
+            self.video_exporter = CachedVideoExporter(self.export_backend, engine=EXPORT_ENGINE)
+        else:
+            self.video_exporter = self.export_backend
+
+        # 导出队列：草稿提交后在后台导出，不阻塞后续故事的草稿生成
+        self.export_queue = ExportQueue(self.video_exporter, export_in_flight)
+        # 导出回调在工作线程中更新项目缓存
+        self._project_lock = threading.Lock()
 
     def generate(self, url: str) -> Optional[VideoProject]:
         logging.info(f"🎬 开始处理视频URL: {url}")
@@ -136,16 +177,23 @@ class ShortStoryGenerator:
 
                         # 第四步：为每个故事生成语音和草稿
                         logging.info(f"🎤 第四步：为 {len(stories)} 个故事生成语音和草稿...")
-                        for story_idx, story in enumerate(stories):
-                            self.process_story_for_segment(story, story_idx, video_segment)
 
-                            # 处理完每个故事后立即更新缓存
-                            self.save_project_to_cache(video_project)
+                        # 先为整个视频段的全部对话并发合成语音，后续逐个故事处理时直接命中缓存
+                        self.process_segment_audio(stories, self.get_voice_output_dir(video_segment))
+
+                        self.process_segment_stories(stories, video_segment, video_project)
 
                 video_project.add_segment(video_segment)
 
+            # 等待后台导出全部完成
+            stats = self.export_queue.wait_all()
+            logging.info(f"📹 导出统计: 提交 {stats['submitted']}，成功 {stats['succeeded']}，失败 {stats['failed']}")
+            if isinstance(self.export_backend, MultiHostVideoExporter):
+                self.export_backend.log_report()
+
             # 保存最终项目结果
-            cache_file = self.save_project_to_cache(video_project)
+            with self._project_lock:
+                cache_file = self.save_project_to_cache(video_project)
 
             # 整理导出的视频文件
             self.organize_exported_videos(video_project)
@@ -179,35 +227,88 @@ class ShortStoryGenerator:
             logging.info(f"❌ SRT文件生成异常: {e}")
             return None
 
-    def process_story_for_segment(self, story: StoryContent, story_idx: int, video_segment: VideoSegment):
+    def get_voice_output_dir(self, video_segment: VideoSegment) -> str:
+        """获取视频段的语音输出目录，不存在则创建"""
         video_id = video_segment.url.split("/")[-1].split("?")[0]
-        """为视频段中的故事生成语音和草稿"""
-        try:
-            logging.info(f"🎤 处理视频段 {video_id}:{video_segment.segment_index} 的故事 {story_idx + 1}: {story.story_title}")
+        base_filename = f"{video_id}_segment_{video_segment.segment_index}"
+        output_dir = f"./output/tmp_voice/{base_filename}"
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        return output_dir
+
+    def process_segment_stories(self, stories: List[StoryContent], video_segment: VideoSegment, video_project: VideoProject):
+        """视频段的全部故事：逐个准备语音，并行批量生成草稿，再提交到导出队列"""
+        video_id = video_segment.url.split("/")[-1].split("?")[0]
+        output_dir = self.get_voice_output_dir(video_segment)
 
-            # 创建输出目录
-            base_filename = f"{video_id}_segment_{video_segment.segment_index}"
-            output_dir = f"./output/tmp_voice/{base_filename}"
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
+        # 单个故事失败只跳过该故事，不影响同一视频段的其他故事
+        ready_stories = []
+        for story_idx, story in enumerate(stories):
+            try:
+                self.process_single_story_audio(story, story_idx, output_dir)
+                if ENABLE_STORY_NARRATION_TRACK:
+                    self.build_story_narration(story, story_idx, output_dir)
+                ready_stories.append(story)
+            except Exception as e:
+                logging.info(f"❌ 故事处理失败: {story.story_title}: {e}")
 
-            # 生成语音
-            processed_story = self.process_single_story_audio(story, story_idx, output_dir)
+        video_path = video_segment.org_video_file_path
+        if not os.path.exists(video_path):
+            logging.info(f"❌ 视频文件不存在: {video_path}")
+            return
 
-            # 生成草稿文件
-            draft_file = self.generate_draft_file(processed_story, story_idx, video_segment.org_video_file_path, video_id)
+        # 长故事在草稿阶段按对话边界拆成多个成片，每个成片单独导出
+        try:
+            self.draft_generator.generate_batch(ready_stories, video_path, video_id)
+        except Exception as e:
+            logging.info(f"❌ 草稿批量生成失败: {e}")
 
-            # 导出草稿为视频
-            if draft_file:
-                exported_video_path = self.export_draft_video(draft_file)
-                if exported_video_path:
-                    # 保存导出视频路径到 story 对象
-                    processed_story.exported_video_path = exported_video_path
+        for story in ready_stories:
+            parts = [part for part in story.parts if part.draft_path]
+            if not parts:
+                logging.info(f"✅ 故事处理完成（无草稿）: {story.story_title}")
+            for part in parts:
+                try:
+                    if self.lint_draft(part.draft_path):
+                        logging.info(f"✅ 草稿文件生成完成: {part.draft_path}")
+                        self.submit_draft_export(story, part, video_project)
+                    else:
+                        logging.info(f"❌ 草稿检查未通过，跳过导出: {story.story_title} 成片 {part.part_index}")
+                except Exception as e:
+                    logging.info(f"❌ 成片导出提交失败: {story.story_title} 成片 {part.part_index}: {e}")
+
+        with self._project_lock:
+            self.save_project_to_cache(video_project)
+
+    def lint_draft(self, draft_file: str) -> bool:
+        """导出前检查草稿，有问题时输出报告并返回 False"""
+        if not ENABLE_DRAFT_LINT:
+            return True
+        issues = lint_draft_file(draft_file)
+        errors = errors_only(issues)
+        if errors:
+            logging.error(f"❌ 草稿检查发现 {len(errors)} 个错误: {draft_file}\n{format_issues(errors)}")
+            return False
+        if issues:
+            logging.warning(f"⚠️ 草稿检查发现 {len(issues)} 个警告: {draft_file}\n{format_issues(issues)}")
+        return True
+
+    def submit_draft_export(self, story: StoryContent, part: StoryPart, video_project: VideoProject):
+        """把成片草稿放入导出队列，导出结束后回填 part.exported_video_path（只有一个成片时也回填 story）并更新缓存"""
+        draft_folder = os.path.dirname(os.path.abspath(part.draft_path))
+
+        def on_done(exported_video_path: Optional[str]):
+            if exported_video_path:
+                part.exported_video_path = exported_video_path
+                if len(story.parts) == 1:
+                    story.exported_video_path = exported_video_path
+            logging.info(f"✅ 故事处理完成: {story.story_title} ({part.part_index}/{len(story.parts)})")
 
-            logging.info(f"✅ 故事处理完成: {story.story_title}")
+            # 每个故事导出后立即更新缓存
+            with self._project_lock:
+                self.save_project_to_cache(video_project)
 
-        except Exception as e:
-            logging.info(f"❌ 故事处理失败: {e}")
+        return self.export_queue.submit(draft_folder, on_done)
 
     def organize_exported_videos(self, video_project: VideoProject) -> Dict[str, List[str]]:
         """整理导出的视频：按视频ID分组到文件夹中"""
@@ -218,8 +319,9 @@ class ShortStoryGenerator:
             exported_videos = []
             for segment in video_project.segments:
                 for story in segment.stories:
-                    if story.exported_video_path and os.path.exists(story.exported_video_path):
-                        exported_videos.append(story.exported_video_path)
+                    for exported_video_path in story.exported_video_paths():
+                        if os.path.exists(exported_video_path):
+                            exported_videos.append(exported_video_path)
 
             if not exported_videos:
                 logging.info("⚠️ 没有找到导出的视频文件")
@@ -452,119 +554,122 @@ class ShortStoryGenerator:
             return []
 
     def process_single_story_audio(self, story: StoryContent, story_idx: int, output_dir: str) -> StoryContent:
-        """为单个故事生成语音 - 带缓存逻辑"""
+        """为单个故事生成语音 - 带缓存逻辑，未缓存的对话并发合成"""
         logging.info(f"🎵 开始为故事生成语音: {story.story_title}")
 
-        # 为每个对话生成语音
-        for dialogue in story.dialogue_list:
-            try:
-                # 生成音频文件路径
-                audio_filename = f"story_{story_idx + 1}_dialogue_{dialogue.index}.mp3"
-                audio_path = os.path.join(output_dir, audio_filename)
-                srt_filename = f"story_{story_idx + 1}_dialogue_{dialogue.index}.srt"
-                srt_path = os.path.join(output_dir, srt_filename)
-
-                # 1. 检查语音文件是否已存在
-                if os.path.exists(audio_path):
-                    logging.info(f"  💾 发现缓存音频: {audio_filename}")
-
-                    # 检查文件大小是否正常（大于1KB）
-                    if os.path.getsize(audio_path) > 1024:
-                        # 更新对象中的路径信息
-                        dialogue.audio_path = audio_path
-
-                        # 检查字幕文件是否存在
-                        if os.path.exists(srt_path):
-                            dialogue.srt_path = srt_path
-                        else:
-                            dialogue.srt_path = None
+        pending = self._collect_pending_dialogues(story, story_idx, output_dir)
+        self._synthesize_dialogues(pending)
 
-                        logging.info(f"  ✅ 使用缓存音频: {audio_filename}")
-                        continue
-                    else:
-                        logging.info(f"  ⚠️ 缓存文件损坏（太小），将重新生成")
-                        # 删除损坏的文件
-                        try:
-                            os.remove(audio_path)
-                        except:
-                            pass
-
-                # 2. 生成新的语音文件
-                logging.info(f"  🎤 生成对话 {dialogue.index}: {dialogue.english[:50]}...")
-
-                # 调用TTS生成语音
-                generated_srt_path = self.tts_client.generate_and_save_audio(
-                    text=dialogue.english,
-                    output_file=audio_path,
-                    voice="zh-HK-HiuGaaiNeural"
-                )
+        logging.info(f"✅ 故事 '{story.story_title}' 语音处理完成!")
+        return story
+
+    def process_segment_audio(self, stories: List[StoryContent], output_dir: str) -> List[StoryContent]:
+        """为视频段的全部故事一次性提交语音合成，所有对话一起并发等待"""
+        logging.info(f"🎵 开始为 {len(stories)} 个故事批量生成语音")
+
+        pending = []
+        for story_idx, story in enumerate(stories):
+            pending.extend(self._collect_pending_dialogues(story, story_idx, output_dir))
+        self._synthesize_dialogues(pending)
 
-                # 3. 验证生成的文件
-                if os.path.exists(audio_path) and os.path.getsize(audio_path) > 1024:
+        logging.info(f"✅ 视频段语音处理完成，共合成 {len(pending)} 段对话")
+        return stories
+
+    def _collect_pending_dialogues(self, story: StoryContent, story_idx: int, output_dir: str) -> List[Dict]:
+        """检查语音缓存，命中的对话直接填充路径，返回仍需合成的对话"""
+        pending = []
+        for dialogue in story.dialogue_list:
+            # 生成音频文件路径
+            audio_filename = f"story_{story_idx + 1}_dialogue_{dialogue.index}.mp3"
+            audio_path = os.path.join(output_dir, audio_filename)
+            srt_filename = f"story_{story_idx + 1}_dialogue_{dialogue.index}.srt"
+            srt_path = os.path.join(output_dir, srt_filename)
+
+            # 检查语音文件是否已存在
+            if os.path.exists(audio_path):
+                logging.info(f"  💾 发现缓存音频: {audio_filename}")
+
+                # 检查文件大小是否正常（大于1KB）
+                if os.path.getsize(audio_path) > 1024:
                     # 更新对象中的路径信息
                     dialogue.audio_path = audio_path
-                    dialogue.srt_path = generated_srt_path if generated_srt_path else None
+                    dialogue.audio_duration = probe_audio_duration(audio_path)
+
+                    # 检查字幕文件是否存在
+                    if os.path.exists(srt_path):
+                        dialogue.srt_path = srt_path
+                    else:
+                        dialogue.srt_path = None
 
-                    logging.info(f"  ✅ 语音生成完成: {audio_filename}")
+                    logging.info(f"  ✅ 使用缓存音频: {audio_filename}")
+                    continue
                 else:
-                    logging.info(f"  ❌ 语音文件生成异常")
-                    dialogue.audio_path = None
-                    dialogue.srt_path = None
+                    logging.info(f"  ⚠️ 缓存文件损坏（太小），将重新生成")
+                    # 删除损坏的文件
+                    try:
+                        os.remove(audio_path)
+                    except:
+                        pass
+
+            logging.info(f"  🎤 待生成对话 {dialogue.index}: {dialogue.english[:50]}...")
+            pending.append({'dialogue': dialogue, 'audio_path': audio_path})
+
+        return pending
+
+    def _synthesize_dialogues(self, pending: List[Dict]):
+        """并发合成待生成的对话语音，并回填到对话对象"""
+        if not pending:
+            return
+
+        # 调用TTS并发生成语音
+        results = self.tts_client.generate_and_save_batch(
+            [{'text': item['dialogue'].english, 'output_file': item['audio_path']} for item in pending],
+            voice="zh-HK-HiuGaaiNeural"
+        )
 
-            except Exception as e:
-                logging.info(f"  ❌ 生成语音失败: {e}")
+        for item in pending:
+            dialogue = item['dialogue']
+            audio_path = item['audio_path']
+            generated_srt_path = results.get(audio_path)
+
+            if isinstance(generated_srt_path, Exception):
+                logging.info(f"  ❌ 生成语音失败: {generated_srt_path}")
                 dialogue.audio_path = None
                 dialogue.srt_path = None
+                continue
 
-        logging.info(f"✅ 故事 '{story.story_title}' 语音处理完成!")
-        return story
+            # 验证生成的文件
+            if os.path.exists(audio_path) and os.path.getsize(audio_path) > 1024:
+                # 更新对象中的路径信息
+                dialogue.audio_path = audio_path
+                dialogue.srt_path = generated_srt_path if generated_srt_path else None
+                dialogue.audio_duration = probe_audio_duration(audio_path)
 
-    def generate_draft_file(self, story: 'StoryContent', story_idx: int, video_path: str = None, video_id: str = None) -> str:
-        """为单个故事生成草稿文件"""
-        try:
-            logging.info(f"📝 开始为故事生成草稿: {story.story_title}")
-
-            # 使用 DraftGenerator 的 generate_from_story 方法
-            if not os.path.exists(video_path):
-                logging.info(f"❌ 视频文件不存在: {video_path}")
-                return None
-            
-            draft_file = self.draft_generator.generate_from_story(
-                story=story,
-                video_path=video_path,
-                story_idx=story_idx,
-                video_id=video_id
-            )
-
-            logging.info(f"✅ 草稿文件生成完成: {draft_file}")
-            return draft_file
-
-        except Exception as e:
-            logging.info(f"❌ 生成草稿文件失败: {e}")
-            import traceback
-            traceback.logging.info_exc()
-            return None
+                logging.info(f"  ✅ 语音生成完成: {os.path.basename(audio_path)}")
+            else:
+                logging.info(f"  ❌ 语音文件生成异常")
+                dialogue.audio_path = None
+                dialogue.srt_path = None
 
-    def export_draft_video(self, draft_file: str) -> Optional[str]:
-        """导出草稿为视频"""
+    def build_story_narration(self, story: StoryContent, story_idx: int, output_dir: str) -> Optional[str]:
+        """把故事各对话的语音拼成单个旁白文件，结果写入 story.narration_path / narration_map_path"""
         try:
-            # 获取草稿的绝对路径
-            draft_abs_path = os.path.abspath(draft_file)
-            draft_floder = os.path.dirname(draft_abs_path)
-            logging.info(f"📹 开始导出草稿: {draft_floder}")
-
-            # 调用导出方法
-            exported_video_path = self.video_exporter.export_video(draft_floder)
-
-            if exported_video_path:
-                logging.info(f"✅ 视频导出成功: {exported_video_path}")
-                return exported_video_path
-            else:
-                logging.info(f"❌ 视频导出失败")
+            dialogue_audio = [{'index': d.index, 'audio_path': d.audio_path}
+                              for d in story.dialogue_list if d.audio_path]
+            if not dialogue_audio:
+                logging.info(f"⚠️ 故事没有可用的语音，跳过旁白生成: {story.story_title}")
                 return None
 
+            narration_path = os.path.join(output_dir, f"story_{story_idx + 1}_narration.mp3")
+            story.narration_map_path = self.tts_client.save_narration_track(dialogue_audio, narration_path)
+            story.narration_path = narration_path
+            logging.info(f"🎙️ 旁白文件: {narration_path}")
+            return narration_path
+
         except Exception as e:
-            logging.info(f"❌ 导出视频异常: {e}")
+            logging.info(f"❌ 生成旁白失败，继续使用逐句音频: {e}")
+            story.narration_path = None
+            story.narration_map_path = None
             return None
 
     def save_stories_to_cache(self, stories: List[StoryContent], srt_file: str) -> str:
@@ -3,6 +3,7 @@
 """
 视频切割脚本 - 根据 dialogue 时间戳切割导出的视频
 目标：将视频切割为36-60秒的片段
+（draft_gen 开启 ENABLE_DRAFT_PARTS 时长故事已在草稿阶段拆成成片，这里只处理旧的整段导出）
 """
 
 import sys
@@ -309,6 +310,15 @@ class VideoSplitter:
         # 2. 遍历所有 segment 和 story
         for segment in project_data.get('segments', []):
             for story_idx, story in enumerate(segment.get('stories', [])):
+                # 生成草稿时已按对话边界拆成多个成片的故事，直接使用各成片视频，无需再切割
+                parts = story.get('parts') or []
+                if len(parts) > 1:
+                    part_videos = [p['exported_video_path'] for p in parts
+                                   if p.get('exported_video_path') and os.path.exists(p['exported_video_path'])]
+                    logger.info(f"\n📖 故事 '{story.get('story_title')}' 已按成片导出: {len(part_videos)}/{len(parts)} 个视频")
+                    all_output_files.extend(part_videos)
+                    continue
+
                 # 检查是否有导出的视频路径
                 video_path = story.get('exported_video_path')
                 if not video_path or not os.path.exists(video_path):
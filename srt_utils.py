@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SRT 字幕工具函数
+逐词字幕的解析、格式化和时间偏移
+"""
+
+from typing import List, Dict
+
+
+def format_srt_time(seconds: float) -> str:
+    """秒 -> 'HH:MM:SS,mmm'"""
+    total_ms = max(0, int(round(seconds * 1000)))
+    h, rest = divmod(total_ms, 3600 * 1000)
+    m, rest = divmod(rest, 60 * 1000)
+    s, ms = divmod(rest, 1000)
+    return f"{h:02}:{m:02}:{s:02},{ms:03}"
+
+
+def parse_srt_time(time_str: str) -> float:
+    """'HH:MM:SS,mmm' -> 秒"""
+    time_part, ms_part = time_str.strip().split(',')
+    h, m, s = map(int, time_part.split(':'))
+    return h * 3600 + m * 60 + s + int(ms_part) / 1000.0
+
+
+def format_srt(entries: List[Dict]) -> str:
+    """
+    生成 SRT 文本，格式与 whisper 命令行输出一致（每个条目后跟一个空行）
+
+    Args:
+        entries: [{'start': 秒, 'end': 秒, 'text': 文本}, ...]
+    """
+    blocks = []
+    for i, entry in enumerate(entries, start=1):
+        blocks.append(f"{i}\n{format_srt_time(entry['start'])} --> {format_srt_time(entry['end'])}\n{entry['text']}\n\n")
+    return ''.join(blocks)
+
+
+def parse_srt(content: str) -> List[Dict]:
+    """解析 SRT 文本为 [{'start': 秒, 'end': 秒, 'text': 文本}, ...]"""
+    entries = []
+    for block in content.strip().replace('\r\n', '\n').split('\n\n'):
+        lines = block.strip().split('\n')
+        if len(lines) >= 3 and ' --> ' in lines[1]:
+            start, end = lines[1].split(' --> ')
+            entries.append({
+                'start': parse_srt_time(start),
+                'end': parse_srt_time(end),
+                'text': '\n'.join(lines[2:]).strip()
+            })
+    return entries
+
+
+def shift_srt_entries(entries: List[Dict], offset: float) -> List[Dict]:
+    """所有条目整体平移 offset 秒"""
+    return [{**entry, 'start': entry['start'] + offset, 'end': entry['end'] + offset} for entry in entries]
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已知文本的逐词字幕对齐
+TTS 合成的文本是已知的，不需要再做语音识别：根据音频能量找出发声区间和停顿，
+按音节数估计每个词的时长，把标点处的词边界对齐到检测到的停顿上，生成逐词 SRT
+"""
+
+import re
+import math
+import logging
+from typing import List, Dict, Optional
+
+from srt_utils import format_srt
+
+# 能量分析帧长（毫秒）
+ALIGN_FRAME_MS = 10
+
+# 低于 (峰值 - ALIGN_SILENCE_RANGE_DB) 或 ALIGN_SILENCE_FLOOR_DB 的帧视为静音
+ALIGN_SILENCE_RANGE_DB = 35.0
+ALIGN_SILENCE_FLOOR_DB = -50.0
+
+# 句中停顿的最短时长（毫秒），更短的静音视为词内/词间的自然起伏
+ALIGN_MIN_PAUSE_MS = 120
+
+# 停顿与标点边界匹配时允许的最大偏差（占总发声时长的比例）
+ALIGN_PAUSE_TOLERANCE = 0.2
+
+logger = logging.getLogger(__name__)
+
+_VOWEL_GROUPS = re.compile(r'[aeiouy]+')
+_PAUSE_PUNCTUATION = re.compile(r'[.,!?;:…—"\)]$')
+
+
+def estimate_syllables(word: str) -> int:
+    """粗略估计英文单词的音节数（数字按读出的位数计算）"""
+    letters = re.sub(r'[^a-z0-9]', '', word.lower())
+    if not letters:
+        return 0
+    if letters.isdigit():
+        return len(letters) * 2
+
+    count = len(_VOWEL_GROUPS.findall(letters))
+    # 词尾不发音的 e
+    if letters.endswith('e') and not letters.endswith(('le', 'ee', 'ye')) and count > 1:
+        count -= 1
+    return max(1, count)
+
+
+def word_weight(word: str) -> float:
+    """词的相对时长权重：音节数为主，加上辅音簇带来的少量时长"""
+    syllables = estimate_syllables(word)
+    if syllables == 0:
+        return 0.2
+    letters = len(re.sub(r'[^A-Za-z0-9]', '', word))
+    return syllables + 0.08 * letters
+
+
+def detect_voiced_regions(frame_db: List[float], frame_ms: int = ALIGN_FRAME_MS) -> List[List[float]]:
+    """
+    根据逐帧能量找出发声区间
+
+    Returns:
+        [[开始秒, 结束秒], ...]，相邻区间之间是不短于 ALIGN_MIN_PAUSE_MS 的停顿
+    """
+    if not frame_db:
+        return []
+
+    peak = max(frame_db)
+    threshold = max(peak - ALIGN_SILENCE_RANGE_DB, ALIGN_SILENCE_FLOOR_DB)
+    voiced = [db > threshold for db in frame_db]
+
+    regions = []
+    start = None
+    for i, is_voiced in enumerate(voiced):
+        if is_voiced and start is None:
+            start = i
+        elif not is_voiced and start is not None:
+            regions.append([start, i])
+            start = None
+    if start is not None:
+        regions.append([start, len(voiced)])
+
+    # 合并短停顿
+    min_gap = max(1, ALIGN_MIN_PAUSE_MS // frame_ms)
+    merged = []
+    for region in regions:
+        if merged and region[0] - merged[-1][1] < min_gap:
+            merged[-1][1] = region[1]
+        else:
+            merged.append(region)
+
+    return [[s * frame_ms / 1000.0, e * frame_ms / 1000.0] for s, e in merged]
+
+
+def align_words(words: List[str], regions: List[List[float]]) -> List[Dict]:
+    """
+    把词分配到发声区间上
+
+    先按权重在“发声时间轴”（去掉停顿后的时间）上线性分配，再把每个停顿
+    锚定到附近的标点边界，使停顿两侧的词分别落在停顿前后。
+
+    Returns:
+        [{'start': 秒, 'end': 秒, 'text': 词}, ...]
+    """
+    if not words or not regions:
+        return []
+
+    weights = [word_weight(w) for w in words]
+    total_weight = sum(weights)
+    voiced_total = sum(e - s for s, e in regions)
+    if total_weight <= 0 or voiced_total <= 0:
+        return []
+
+    # 每个词结束时的累积权重比例
+    cumulative = []
+    acc = 0.0
+    for w in weights:
+        acc += w
+        cumulative.append(acc / total_weight)
+
+    # 每个停顿前的累积发声时长
+    pause_positions = []
+    acc = 0.0
+    for s, e in regions[:-1]:
+        acc += e - s
+        pause_positions.append(acc)
+
+    # 停顿按顺序匹配到最近的标点边界（单调，且在容差范围内）
+    candidates = [i for i, w in enumerate(words[:-1]) if _PAUSE_PUNCTUATION.search(w)]
+    anchors = [(0.0, 0.0)]  # (权重比例, 发声时间)
+    last_word = -1
+    for pos in pause_positions:
+        best = None
+        for i in candidates:
+            if i <= last_word:
+                continue
+            diff = abs(cumulative[i] * voiced_total - pos)
+            if diff <= ALIGN_PAUSE_TOLERANCE * voiced_total and (best is None or diff < best[1]):
+                best = (i, diff)
+        if best:
+            last_word = best[0]
+            anchors.append((cumulative[best[0]], pos))
+    anchors.append((1.0, voiced_total))
+
+    def to_voiced_time(fraction: float) -> float:
+        """权重比例 -> 发声时间，锚点之间分段线性"""
+        for (f0, t0), (f1, t1) in zip(anchors, anchors[1:]):
+            if fraction <= f1 or (f1, t1) == anchors[-1]:
+                if f1 - f0 <= 1e-9:
+                    return t1
+                return t0 + (fraction - f0) / (f1 - f0) * (t1 - t0)
+        return voiced_total
+
+    def to_real_time(voiced_time: float, at_end: bool) -> float:
+        """发声时间 -> 音频真实时间，跳过停顿；恰好落在区间边界时，词尾取前一区间、词首取后一区间"""
+        acc = 0.0
+        for idx, (s, e) in enumerate(regions):
+            length = e - s
+            is_last = idx == len(regions) - 1
+            if voiced_time < acc + length or (at_end and voiced_time <= acc + length) or is_last:
+                return min(e, s + max(0.0, voiced_time - acc))
+            acc += length
+        return regions[-1][1]
+
+    entries = []
+    prev_fraction = 0.0
+    for word, fraction in zip(words, cumulative):
+        start = to_real_time(to_voiced_time(prev_fraction), at_end=False)
+        end = to_real_time(to_voiced_time(fraction), at_end=True)
+        entries.append({'start': start, 'end': max(end, start + 0.001), 'text': word})
+        prev_fraction = fraction
+
+    return entries
+
+
+class TextAligner:
+    """基于已知文本和音频能量的逐词字幕对齐"""
+
+    def __init__(self, frame_ms: int = ALIGN_FRAME_MS):
+        self.frame_ms = frame_ms
+
+    def _frame_energies(self, audio_path: str) -> List[float]:
+        """逐帧计算音频能量（dBFS）"""
+        from pydub import AudioSegment
+
+        audio = AudioSegment.from_file(audio_path).set_channels(1)
+        max_amplitude = audio.max_possible_amplitude
+        energies = []
+        for start in range(0, len(audio), self.frame_ms):
+            rms = audio[start:start + self.frame_ms].rms
+            energies.append(20 * math.log10(rms / max_amplitude) if rms > 0 else -120.0)
+        return energies
+
+    def align(self, text: str, audio_path: str) -> List[Dict]:
+        """返回逐词条目 [{'start': 秒, 'end': 秒, 'text': 词}, ...]"""
+        words = text.split()
+        regions = detect_voiced_regions(self._frame_energies(audio_path), self.frame_ms)
+        return align_words(words, regions)
+
+    def text_to_srt(self, text: str, audio_path: str) -> Optional[str]:
+        """生成每行一个词的 SRT 文本，失败返回 None"""
+        try:
+            entries = self.align(text, audio_path)
+            if not entries:
+                logger.warning(f"文本对齐未得到结果: {audio_path}")
+                return None
+            return format_srt(entries)
+        except Exception as e:
+            logger.error(f"文本对齐失败 {audio_path}: {e}")
+            return None
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨项目 TTS 音频缓存
+按 (文本, 语音, 音调, 语速, 音量) 的哈希保存音频和字幕，超出容量时按最近最少使用淘汰
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+import logging
+from typing import Optional, Tuple
+
+# 缓存目录和容量上限（MB），可通过环境变量覆盖
+TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR', './output/tts_cache')
+TTS_CACHE_MAX_MB = int(os.environ.get('TTS_CACHE_MAX_MB', '2048'))
+
+logger = logging.getLogger(__name__)
+
+
+def link_or_copy(src: str, dst: str):
+    """优先硬链接，跨文件系统等不支持的情况下退化为复制；目标已存在时先删除再创建"""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def touch(path: str):
+    """把 path 的 mtime 更新为当前时间，不存在时创建空文件；失败时忽略"""
+    try:
+        os.utime(path, None)
+    except FileNotFoundError:
+        try:
+            open(path, 'a').close()
+        except OSError:
+            pass
+    except OSError:
+        pass
+
+
+class TTSAudioCache:
+    """
+    按内容寻址的 TTS 缓存，最近使用时间记录在每个条目的空标记文件（.used）的 mtime 上
+
+    音频和字幕会硬链接到各项目目录和草稿素材中，不能改它们的 mtime（旁白复用、时长缓存、素材摘要都以 mtime 判断文件是否变化）
+    """
+
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # 首次写入时扫描目录得到
+
+    @staticmethod
+    def make_key(text: str, voice: str, pitch: str, rate: str, volume: str) -> str:
+        """计算缓存键"""
+        raw = json.dumps([text, voice, pitch, rate, volume], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _entry_paths(self, key: str) -> Tuple[str, str]:
+        entry_dir = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(entry_dir, f"{key}.mp3"), os.path.join(entry_dir, f"{key}.srt")
+
+    def _marker_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.used")
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        查询缓存
+
+        Returns:
+            命中时返回 (音频路径, 字幕路径或 None)，未命中返回 None
+        """
+        audio_path, srt_path = self._entry_paths(key)
+        if not os.path.exists(audio_path):
+            return None
+
+        # 刷新最近使用时间
+        touch(self._marker_path(key))
+
+        return audio_path, srt_path if os.path.exists(srt_path) else None
+
+    def materialize(self, key: str, output_file: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        命中时把缓存的音频和字幕链接到 output_file 及同名 .srt
+
+        Returns:
+            命中时返回 (音频路径, 字幕路径或 None)，未命中返回 None
+        """
+        entry = self.get(key)
+        if not entry:
+            return None
+
+        cached_audio, cached_srt = entry
+        subtitle_file = os.path.splitext(output_file)[0] + '.srt' if cached_srt else None
+        try:
+            link_or_copy(cached_audio, output_file)
+            if subtitle_file:
+                link_or_copy(cached_srt, subtitle_file)
+        except FileNotFoundError:
+            # get() 之后条目被其他线程淘汰，按未命中处理
+            for path in (output_file, subtitle_file):
+                if path and os.path.lexists(path):
+                    os.remove(path)
+            logger.info(f"TTS缓存条目已被淘汰，按未命中处理: {key[:12]}")
+            return None
+
+        logger.info(f"TTS缓存命中: {key[:12]} -> {output_file}")
+        return output_file, subtitle_file
+
+    def put(self, key: str, audio_file: str, subtitle_file: Optional[str] = None):
+        """把生成好的音频和字幕放入缓存"""
+        audio_path, srt_path = self._entry_paths(key)
+        os.makedirs(os.path.dirname(audio_path), exist_ok=True)
+
+        with self._lock:
+            self._ensure_total()
+            for src, dst in ((audio_file, audio_path), (subtitle_file, srt_path)):
+                if not src:
+                    continue
+                old_size = os.path.getsize(dst) if os.path.exists(dst) else 0
+                link_or_copy(src, dst)
+                self._total_bytes += os.path.getsize(dst) - old_size
+            touch(self._marker_path(key))
+
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _ensure_total(self):
+        if self._total_bytes is not None:
+            return
+        self._total_bytes = sum(size for _, _, size in self._scan())
+
+    def _scan(self):
+        """遍历缓存文件，返回 [(mtime, 路径, 大小), ...]"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, path, st.st_size))
+        return entries
+
+    def _evict(self):
+        """按最近使用时间从旧到新删除，直到总大小回到上限的 90%"""
+        target = int(self.max_bytes * 0.9)
+
+        # 音频、字幕和使用标记按缓存键成组淘汰；有标记时以标记的 mtime 为准
+        groups = {}
+        for mtime, path, size in self._scan():
+            key, ext = os.path.splitext(os.path.basename(path))
+            group = groups.setdefault(key, {'mtime': 0.0, 'used': None, 'files': []})
+            if ext == '.used':
+                group['used'] = mtime
+            else:
+                group['mtime'] = max(group['mtime'], mtime)
+            group['files'].append((path, size))
+        for group in groups.values():
+            if group['used'] is not None:
+                group['mtime'] = group['used']
+        self._total_bytes = sum(size for g in groups.values() for _, size in g['files'])
+
+        removed = 0
+        for group in sorted(groups.values(), key=lambda g: g['mtime']):
+            if self._total_bytes <= target:
+                break
+            for path, size in group['files']:
+                try:
+                    # 已链接到各项目目录的文件不受影响，只减少一个链接
+                    os.remove(path)
+                    self._total_bytes -= size
+                except OSError as e:
+                    logger.warning(f"删除缓存文件失败 {path}: {e}")
+            removed += 1
+
+        logger.info(f"TTS缓存淘汰 {removed} 条记录，当前大小: {self._total_bytes / 1024 / 1024:.1f}MB")
@@ -6,15 +6,26 @@ TTS客户端 - 简化版本
 """
 
 import os
+import re
 import json
 import time
+import base64
+import hashlib
+import heapq
+import itertools
+import threading
 import requests
 import logging
-from pydub import AudioSegment
-import subprocess
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from typing import List, Dict, Optional
 import tempfile
 import shutil
 from dotenv import load_dotenv
+from tts_cache import TTSAudioCache
+from whisper_aligner import WhisperAligner
+from text_aligner import TextAligner
+from audio_utils import concat_mp3_bytes, decode_concat_mp3_bytes, concat_audio_files, probe_audio_duration
+from srt_utils import parse_srt, format_srt, shift_srt_entries
 
 
 # 默认加载当前目录下的 .env
@@ -29,150 +40,389 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logging.getLogger('urllib3').disabled = True
 
+# 合成参数：音调、语速、音量（同时参与 TTS 缓存键计算）
+TTS_PITCH = '+0Hz'
+TTS_RATE = '+0%'
+TTS_VOLUME = '+0%'
+
+# 流式下载的分块大小（字节）和校验失败后的重试次数
+TTS_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+TTS_DOWNLOAD_RETRIES = 2
+
+# TTS 服务未返回字幕时的兜底策略：
+#   'align'   - 按已知文本和音频能量对齐（不做语音识别），失败时再用 Whisper
+#   'whisper' - 直接使用 Whisper 识别
+TTS_SUBTITLE_FALLBACK = os.environ.get('TTS_SUBTITLE_FALLBACK', 'align')
+
+# 跨项目 TTS 缓存开关 - 相同文本和语音参数的音频只合成一次
+ENABLE_TTS_CACHE = True
+
+# 写入缓存前音频的最小字节数（与 short_story_generator 中的损坏检查一致）
+TTS_MIN_AUDIO_BYTES = 1024
+
+# 并发合成时同时在途的 TTS 任务数上限
+TTS_MAX_IN_FLIGHT = int(os.environ.get('TTS_MAX_IN_FLIGHT', '4'))
+
+# 长文本分块合成：超过该长度（字符）的文本按句子切分后并行合成再拼接
+TTS_CHUNK_THRESHOLD_CHARS = 200
+
+# 单个分块的最大长度（字符），超长句子再按逗号/空格切分
+TTS_CHUNK_MAX_CHARS = 200
+
+# 短于该长度（字符）的句子与相邻句子合并，避免过多碎片
+TTS_CHUNK_MIN_CHARS = 40
+
+# 任务轮询：首次查询间隔（秒）、退避倍数、最大查询间隔（秒）
+TTS_POLL_INITIAL_INTERVAL = 0.2
+TTS_POLL_BACKOFF = 1.5
+TTS_POLL_MAX_INTERVAL = 3.0
+
+# 单个 TTS 任务的最长等待时间（秒），超时后放弃该任务
+TTS_TASK_TIMEOUT = float(os.environ.get('TTS_TASK_TIMEOUT', '300'))
+
+
+def split_text_chunks(text: str,
+                      max_chars: int = TTS_CHUNK_MAX_CHARS,
+                      min_chars: int = TTS_CHUNK_MIN_CHARS) -> List[str]:
+    """按句子边界把长文本切分为合成分块"""
+    sentences = [s.strip() for s in re.split(r'(?<=[.!?;…])\s+', text.strip()) if s.strip()]
+
+    # 超长句子按逗号，再按空格切分
+    pieces = []
+    for sentence in sentences:
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(', ', 0, max_chars)
+            if cut <= 0:
+                cut = sentence.rfind(' ', 0, max_chars)
+            if cut <= 0:
+                # 没有可断开的位置，按长度硬切
+                pieces.append(sentence[:max_chars])
+                sentence = sentence[max_chars:].strip()
+                continue
+            pieces.append(sentence[:cut + 1].strip())
+            sentence = sentence[cut + 1:].strip()
+        if sentence:
+            pieces.append(sentence)
+
+    # 合并过短的片段
+    chunks = []
+    for piece in pieces:
+        if chunks and (len(chunks[-1]) < min_chars or len(piece) < min_chars) \
+                and len(chunks[-1]) + 1 + len(piece) <= max_chars:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+class TTSTaskPoller:
+    """共享的 TTS 任务轮询器 - 一个后台线程复用所有在途任务的状态查询"""
+
+    def __init__(self, base_url: str,
+                 initial_interval: float = TTS_POLL_INITIAL_INTERVAL,
+                 backoff: float = TTS_POLL_BACKOFF,
+                 max_interval: float = TTS_POLL_MAX_INTERVAL):
+        self.base_url = base_url
+        self.initial_interval = initial_interval
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.session = requests.Session()  # 只在轮询线程内使用
+
+        self._cond = threading.Condition()
+        self._queue = []  # 小顶堆: (下次查询时间, 序号, 任务)
+        self._seq = itertools.count()
+        self._thread = None
+
+    def submit(self, task_id: str, timeout: float = TTS_TASK_TIMEOUT) -> Future:
+        """
+        登记一个在途任务
 
-class TTSService:
-    """简化的TTS服务"""
+        Args:
+            task_id: TTS 任务ID
+            timeout: 最长等待时间（秒）
 
-    def __init__(self):
-        self.base_url = os.environ.get('TTS_OLD_URL', 'http://localhost:3000')
-        self.session = requests.Session()
+        Returns:
+            Future，完成时结果为任务信息（data 字段），失败或超时时为异常；
+            调用 future.cancel() 即可取消轮询
+        """
+        future = Future()
+        now = time.monotonic()
+        task = {
+            'task_id': task_id,
+            'future': future,
+            'deadline': now + timeout,
+            'interval': self.initial_interval,
+        }
+        with self._cond:
+            heapq.heappush(self._queue, (now + self.initial_interval, next(self._seq), task))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='tts-poller', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def pending_count(self) -> int:
+        """当前在途任务数"""
+        with self._cond:
+            return len(self._queue)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                due, _, task = self._queue[0]
+                wait_seconds = due - time.monotonic()
+                if wait_seconds > 0:
+                    # 等待期间可能有更早到期的新任务加入，醒来后重新检查
+                    self._cond.wait(wait_seconds)
+                    continue
+                heapq.heappop(self._queue)
+
+            self._poll_once(task)
+
+    def _poll_once(self, task: Dict):
+        future = task['future']
+        task_id = task['task_id']
+
+        if future.cancelled():
+            logger.info(f"任务已取消，停止轮询: {task_id}")
+            return
+
+        now = time.monotonic()
+        if now >= task['deadline']:
+            logger.error(f"TTS任务超时: {task_id}")
+            self._resolve(future, exception=TimeoutError(f"TTS任务超时: {task_id}"))
+            return
 
-    def _whisper_audio_to_srt(self, audio_data: bytes) -> str:
-        """使用 Whisper 将音频转换为 SRT 字幕"""
         try:
-            logger.info("开始使用 Whisper 作为兜底策略生成字幕")
-
-            # 创建临时音频文件
-            with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_audio:
-                temp_audio.write(audio_data)
-                temp_audio_path = temp_audio.name
-
-            # 创建临时输出目录
-            temp_dir = tempfile.mkdtemp()
-
-            try:
-                # 使用 whisper 命令行工具转换音频
-                cmd = [
-                    'whisper',
-                    temp_audio_path,
-                    '--output_dir', temp_dir,
-                    '--output_format', 'srt',
-                    '--language', 'en',
-                    '--model', 'base',
-                    '--word_timestamps', 'True',
-                    '--max_words_per_line', '1'
-                ]
-
-                logger.info(f"执行 Whisper 命令: {' '.join(cmd)}")
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-
-                if result.returncode == 0:
-                    # 查找生成的 SRT 文件
-                    base_name = os.path.splitext(os.path.basename(temp_audio_path))[0]
-                    srt_file_path = os.path.join(temp_dir, f"{base_name}.srt")
-
-                    if os.path.exists(srt_file_path):
-                        with open(srt_file_path, 'r', encoding='utf-8') as f:
-                            srt_content = f.read()
-                        logger.info(f"Whisper 生成字幕成功，大小: {len(srt_content)} 字符")
-                        return srt_content
-                    else:
-                        logger.error(f"未找到生成的 SRT 文件: {srt_file_path}")
-                        return None
-                else:
-                    logger.error(f"Whisper 执行失败: {result.stderr}")
-                    return None
-
-            finally:
-                # 清理临时文件
-                try:
-                    os.unlink(temp_audio_path)
-                    shutil.rmtree(temp_dir)
-                except Exception as e:
-                    logger.warning(f"清理临时文件失败: {e}")
-
-        except subprocess.TimeoutExpired:
-            logger.error("Whisper 执行超时")
-            return None
-        except FileNotFoundError:
-            logger.error("未找到 whisper 命令，请确保已安装 openai-whisper")
-            return None
+            status_url = f"{self.base_url}/api/v1/tts/task/{task_id}"
+            status_data = self.session.get(status_url, timeout=5).json()
+            task_info = status_data.get('data', {})
+            status = task_info.get('status')
         except Exception as e:
-            logger.error(f"Whisper 转换过程中发生错误: {e}")
-            return None
+            # 查询失败不直接判死，按退避间隔重试直到超时
+            logger.warning(f"查询任务状态失败 {task_id}: {e}")
+            status = None
+
+        if status == 'completed':
+            self._resolve(future, result=task_info)
+            return
+        if status == 'failed':
+            logger.error(f"TTS生成失败: {status_data}")
+            self._resolve(future, exception=Exception("TTS生成失败"))
+            return
+
+        # 仍在处理中：指数退避，且不越过任务截止时间
+        task['interval'] = min(task['interval'] * self.backoff, self.max_interval)
+        next_due = min(now + task['interval'], task['deadline'])
+        with self._cond:
+            heapq.heappush(self._queue, (next_due, next(self._seq), task))
+
+    @staticmethod
+    def _resolve(future: Future, result=None, exception: Optional[BaseException] = None):
+        if future.done():
+            return
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            # 与调用方的 cancel() 竞争，忽略即可
+            pass
 
-    def generate(self, text: str, voice: str) -> tuple[bytes, str]:
-        """生成语音，使用异步接口，返回音频数据和字幕文本"""
 
-        # 创建任务（异步接口会快速返回）
+class TTSService:
+    """简化的TTS服务"""
+
+    def __init__(self):
+        self.base_url = os.environ.get('TTS_OLD_URL', 'http://localhost:3000')
+        # requests.Session 不保证线程安全，并发合成时每个线程使用独立的会话
+        self._local = threading.local()
+        self.poller = TTSTaskPoller(self.base_url)
+        # 全局在途任务数上限（包括长文本分块产生的子任务）
+        self._in_flight = threading.BoundedSemaphore(TTS_MAX_IN_FLIGHT)
+
+    @property
+    def session(self) -> requests.Session:
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _whisper_audio_to_srt(self, audio_path: str) -> str:
+        """使用常驻的进程内 Whisper 将音频文件转换为逐词 SRT 字幕"""
+        logger.info("开始使用 Whisper 作为兜底策略生成字幕")
+        srt_content = WhisperAligner.get_instance().audio_to_srt(audio_path)
+        if srt_content:
+            logger.info(f"Whisper 生成字幕成功，大小: {len(srt_content)} 字符")
+        return srt_content
+
+    def _fallback_subtitles(self, audio_path: str, text: Optional[str]) -> Optional[str]:
+        """字幕兜底：优先用已知文本对齐，失败或未提供文本时使用 Whisper"""
+        if TTS_SUBTITLE_FALLBACK == 'align' and text:
+            srt_content = TextAligner().text_to_srt(text, audio_path)
+            if srt_content:
+                logger.info("文本对齐生成字幕成功")
+                return srt_content
+            logger.warning("文本对齐失败，改用 Whisper")
+        return self._whisper_audio_to_srt(audio_path)
+
+    def create_task(self, text: str, voice: str) -> str:
+        """创建TTS任务（异步接口会快速返回），返回任务ID"""
         url = f"{self.base_url}/api/v1/tts/create"
         payload = {
             'text': text,
             'voice': voice,
-            'pitch': '+0Hz',
-            'volume': '+0%',
-            'rate': '+0%'
+            'pitch': TTS_PITCH,
+            'volume': TTS_VOLUME,
+            'rate': TTS_RATE
         }
 
-        # 快速创建任务
         response = self.session.post(url, json=payload, timeout=10)
         task_data = response.json()
         task_id = task_data.get('taskId') or task_data.get('data', {}).get('id')
+        if not task_id:
+            raise Exception(f"TTS任务创建失败: {task_data}")
         logger.info(f"任务创建成功，ID: {task_id}")
+        return task_id
 
-        # 轮询任务状态（短间隔检查）
-        status_url = f"{self.base_url}/api/v1/tts/task/{task_id}"
-        while True:
-            time.sleep(1)  # 缩短等待时间
-            status_response = self.session.get(status_url, timeout=5)
-            status_data = status_response.json()
-            task_info = status_data.get('data', {})
-            status = task_info.get('status')
+    def submit(self, text: str, voice: str, timeout: float = TTS_TASK_TIMEOUT) -> Future:
+        """创建任务并交给共享轮询器，返回任务信息的 Future"""
+        task_id = self.create_task(text, voice)
+        return self.poller.submit(task_id, timeout)
 
-            if status == 'completed':
-                result = task_info.get('result', {})
-                audio_file = result.get('audio') or result.get('file')
-                srt_file = result.get('srt')
-
-                # 快速下载音频
-                filename = audio_file.split('/')[-1] if '/' in audio_file else audio_file
-                download_url = f"{self.base_url}/api/v1/tts/download/{filename}"
-                logger.info(f"下载音频: {download_url}")
-                audio_response = self.session.get(download_url, timeout=15)
-
-                # 下载字幕文件
-                subtitle_text = None
-                if srt_file:
-                    # 提取文件名
-                    srt_filename = srt_file.split('/')[-1] if '/' in srt_file else srt_file
-                    srt_download_url = f"{self.base_url}/api/v1/tts/download/{srt_filename}"
-                    logger.info(f"下载字幕: {srt_download_url}")
-
-                    srt_response = self.session.get(srt_download_url, timeout=30)
-                    if srt_response.status_code == 200:
-                        subtitle_text = srt_response.text
-                    else:
-                        logger.warning(f"下载字幕失败: {srt_response.status_code}")
-                        # 使用 Whisper 作为兜底策略
-                        subtitle_text = self._whisper_audio_to_srt(audio_response.content)
-                        if subtitle_text:
-                            logger.info("Whisper 兜底策略成功生成字幕")
-                        else:
-                            logger.warning("Whisper 兜底策略也失败了，将返回空字幕")
-                else:
-                    # 如果没有 srt_file，也尝试使用 Whisper 生成字幕
-                    logger.info("未获取到字幕文件，尝试使用 Whisper 生成字幕")
-                    subtitle_text = self._whisper_audio_to_srt(audio_response.content)
-                    if subtitle_text:
-                        logger.info("Whisper 成功生成字幕")
-                    else:
-                        logger.warning("Whisper 生成字幕失败，将返回空字幕")
+    def generate(self, text: str, voice: str, timeout: float = TTS_TASK_TIMEOUT) -> tuple[bytes, str]:
+        """生成语音，使用异步接口，返回音频数据和字幕文本"""
+        fd, temp_audio_path = tempfile.mkstemp(suffix='.mp3')
+        os.close(fd)
+        try:
+            subtitle_text = self.generate_to_file(text, voice, temp_audio_path, timeout)
+            with open(temp_audio_path, 'rb') as f:
+                return f.read(), subtitle_text
+        finally:
+            if os.path.exists(temp_audio_path):
+                os.unlink(temp_audio_path)
+
+    def generate_to_file(self, text: str, voice: str, output_file: str,
+                         timeout: float = TTS_TASK_TIMEOUT, subtitle_info: Optional[Dict] = None) -> Optional[str]:
+        """生成语音并直接流式写入 output_file，返回字幕文本；subtitle_info 中记录字幕是否来自兜底策略"""
+        with self._in_flight:
+            task_info = self.submit(text, voice, timeout).result()
+            return self._download_result(task_info, output_file, text, subtitle_info)
+
+    def _download_url(self, remote_file: str) -> str:
+        filename = remote_file.split('/')[-1] if '/' in remote_file else remote_file
+        return f"{self.base_url}/api/v1/tts/download/{filename}"
+
+    def _download_to_file(self, download_url: str, output_file: str, timeout: float = 15) -> str:
+        """
+        分块流式下载到 output_file，边写边计算 SHA-256
 
-                return audio_response.content, subtitle_text
+        校验 Content-Length 与实际字节数；服务端提供 Digest(sha-256) 或
+        X-Checksum-Sha256 头时同时校验摘要。先写 .part 文件，校验通过后再原子替换。
 
-            elif status == 'failed':
-                logger.error(f"TTS生成失败: {status_data}")
-                raise Exception("TTS生成失败")
+        Returns:
+            文件的 SHA-256 十六进制摘要
+        """
+        part_file = f"{output_file}.part"
+        last_error = None
+
+        for attempt in range(1, TTS_DOWNLOAD_RETRIES + 1):
+            try:
+                with self.session.get(download_url, timeout=timeout, stream=True) as response:
+                    response.raise_for_status()
+
+                    digest = hashlib.sha256()
+                    written = 0
+                    with open(part_file, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=TTS_DOWNLOAD_CHUNK_SIZE):
+                            if chunk:
+                                f.write(chunk)
+                                digest.update(chunk)
+                                written += len(chunk)
+
+                    expected_length = response.headers.get('Content-Length')
+                    # 压缩传输时 Content-Length 是压缩后的长度，无法与解码后的字节数比较
+                    if expected_length is not None and not response.headers.get('Content-Encoding'):
+                        if int(expected_length) != written:
+                            raise IOError(f"下载长度不匹配: 期望 {expected_length}, 实际 {written}")
+                    if written == 0:
+                        raise IOError("下载内容为空")
+
+                    expected_digest = self._expected_sha256(response.headers)
+                    if expected_digest and expected_digest != digest.hexdigest():
+                        raise IOError(f"下载校验和不匹配: 期望 {expected_digest}, 实际 {digest.hexdigest()}")
+
+                os.replace(part_file, output_file)
+                return digest.hexdigest()
+
+            except Exception as e:
+                last_error = e
+                logger.warning(f"下载失败（第 {attempt} 次）{download_url}: {e}")
+                if os.path.exists(part_file):
+                    os.unlink(part_file)
+
+        raise Exception(f"下载失败: {download_url}: {last_error}")
+
+    @staticmethod
+    def _expected_sha256(headers) -> Optional[str]:
+        """从响应头中解析服务端提供的 SHA-256 摘要（十六进制）"""
+        checksum = headers.get('X-Checksum-Sha256')
+        if checksum:
+            return checksum.strip().lower()
+
+        for part in headers.get('Digest', '').split(','):
+            algorithm, _, value = part.strip().partition('=')
+            if algorithm.lower() == 'sha-256' and value:
+                return base64.b64decode(value).hex()
+        return None
+
+    def _download_result(self, task_info: Dict, output_file: str, text: Optional[str] = None,
+                         subtitle_info: Optional[Dict] = None) -> Optional[str]:
+        """把已完成任务的音频流式下载到 output_file，返回字幕文本"""
+        if subtitle_info is not None:
+            subtitle_info['fallback'] = False
+        result = task_info.get('result', {})
+        audio_file = result.get('audio') or result.get('file')
+        srt_file = result.get('srt')
+
+        # 流式下载音频，不在内存中保留整个文件
+        download_url = self._download_url(audio_file)
+        logger.info(f"下载音频: {download_url}")
+        self._download_to_file(download_url, output_file)
+
+        # 下载字幕文件
+        subtitle_text = None
+        if srt_file:
+            srt_download_url = self._download_url(srt_file)
+            logger.info(f"下载字幕: {srt_download_url}")
+
+            srt_response = self.session.get(srt_download_url, timeout=30)
+            if srt_response.status_code == 200:
+                subtitle_text = srt_response.text
+            else:
+                logger.warning(f"下载字幕失败: {srt_response.status_code}")
+                # 使用兜底策略
+                if subtitle_info is not None:
+                    subtitle_info['fallback'] = True
+                subtitle_text = self._fallback_subtitles(output_file, text)
+                if subtitle_text:
+                    logger.info("兜底策略成功生成字幕")
+                else:
+                    logger.warning("兜底策略也失败了，将返回空字幕")
+        else:
+            # 如果没有 srt_file，也尝试使用兜底策略生成字幕
+            logger.info("未获取到字幕文件，尝试使用兜底策略生成字幕")
+            if subtitle_info is not None:
+                subtitle_info['fallback'] = True
+            subtitle_text = self._fallback_subtitles(output_file, text)
+            if subtitle_text:
+                logger.info("兜底策略成功生成字幕")
+            else:
+                logger.warning("兜底策略生成字幕失败，将返回空字幕")
+
+        return subtitle_text
 
 
 class TTSClient:
@@ -181,6 +431,7 @@ class TTSClient:
     def __init__(self):
         """初始化TTS客户端，只使用旧服务"""
         self.service = TTSService()
+        self.cache = TTSAudioCache() if ENABLE_TTS_CACHE else None
 
     def generate_speech(self, text: str, voice: str = "zh-CN-XiaoxiaoNeural") -> tuple[bytes, str]:
         """
@@ -195,7 +446,8 @@ class TTSClient:
         """
         return self.service.generate(text, voice)
 
-    def generate_and_save_audio(self, text: str, output_file: str, voice: str = "zh-CN-XiaoxiaoNeural") -> str:
+    def generate_and_save_audio(self, text: str, output_file: str, voice: str = "zh-CN-XiaoxiaoNeural",
+                                subtitle_info: Optional[Dict] = None) -> str:
         """
         直接生成语音并保存为音频文件
 
@@ -203,30 +455,208 @@ class TTSClient:
             text: 要转换的文本
             output_file: 输出音频文件路径
             voice: 语音类型
+            subtitle_info: 可选，写入 {'fallback': 字幕是否缺失或来自兜底策略}
 
         Returns:
             字幕文件路径（如果有的话）
         """
         logger.info(f"开始生成音频文件: {output_file}")
-
-        # 生成音频和字幕
-        audio_data, subtitle_text = self.generate_speech(text, voice)
-
-        # 保存音频文件
-        with open(output_file, 'wb') as f:
-            f.write(audio_data)
-        
+        info = {'fallback': False}
+
+        # 先查跨项目缓存，命中则直接链接到输出位置
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key(text, voice, TTS_PITCH, TTS_RATE, TTS_VOLUME)
+            hit = self.cache.materialize(cache_key, output_file)
+            if hit:
+                if subtitle_info is not None:
+                    subtitle_info.update(info)
+                return hit[1]
+
+        chunks = split_text_chunks(text) if len(text) > TTS_CHUNK_THRESHOLD_CHARS else [text]
+        if len(chunks) > 1:
+            # 长文本：按句子分块并行合成后拼接
+            subtitle_text = self._generate_chunked_audio(chunks, output_file, voice, info)
+        else:
+            # 生成音频并流式写入输出文件（先写 .part 再替换，避免改写与缓存共享的硬链接）
+            subtitle_text = self.service.generate_to_file(text, voice, output_file, subtitle_info=info)
 
         # 保存字幕文件（如果有的话）
         subtitle_file = None
         if subtitle_text:
             subtitle_file = output_file.replace('.mp3', '.srt').replace('.wav', '.srt')
-            with open(subtitle_file, 'w', encoding='utf-8') as f:
-                f.write(subtitle_text)
-            
+            self._write_file(subtitle_file, subtitle_text.encode('utf-8'))
+        else:
+            info['fallback'] = True
+        if subtitle_info is not None:
+            subtitle_info.update(info)
+
+        # 只缓存完整结果：音频可解析且字幕来自 TTS 服务，否则下次命中会一直拿到同一个坏结果
+        if self.cache:
+            if info['fallback']:
+                logger.info(f"字幕缺失或来自兜底策略，不写入TTS缓存: {output_file}")
+            elif not self._valid_audio(output_file):
+                logger.warning(f"音频文件异常，不写入TTS缓存: {output_file}")
+            else:
+                try:
+                    self.cache.put(cache_key, output_file, subtitle_file)
+                except Exception as e:
+                    logger.warning(f"写入TTS缓存失败: {e}")
 
         return subtitle_file
 
+    @staticmethod
+    def _valid_audio(path: str) -> bool:
+        """音频文件大小正常且能读出时长"""
+        try:
+            if os.path.getsize(path) <= TTS_MIN_AUDIO_BYTES:
+                return False
+        except OSError:
+            return False
+        return bool(probe_audio_duration(path))
+
+    def save_narration_track(self, dialogue_audio: List[Dict], output_file: str) -> str:
+        """
+        把一个故事的各段对话音频拼成单个旁白文件，并生成对话偏移映射
+
+        Args:
+            dialogue_audio: [{'index': 对话序号, 'audio_path': 音频路径}, ...]，按播放顺序
+            output_file: 旁白音频输出路径（.mp3）
+
+        Returns:
+            映射文件路径（与 output_file 同名的 .json），内容为
+            {'narration': 旁白文件名, 'duration': 总时长,
+             'dialogues': [{'index', 'start', 'end', 'audio'}, ...]}（时间单位：秒）
+        """
+        map_file = os.path.splitext(output_file)[0] + '.json'
+        # 重新合成的同长度 CBR 音频大小不变，同时比较修改时间
+        sources = []
+        for d in dialogue_audio:
+            st = os.stat(d['audio_path'])
+            sources.append({'audio': os.path.basename(d['audio_path']), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns})
+
+        # 源音频未变化时复用已有旁白
+        if os.path.exists(output_file) and os.path.exists(map_file):
+            try:
+                with open(map_file, 'r', encoding='utf-8') as f:
+                    existing = json.load(f)
+                if existing.get('sources') == sources:
+                    logger.info(f"使用已有旁白文件: {output_file}")
+                    return map_file
+            except Exception as e:
+                logger.warning(f"旁白映射文件读取失败，将重新生成: {e}")
+
+        durations = concat_audio_files([d['audio_path'] for d in dialogue_audio], output_file)
+
+        dialogues = []
+        offset = 0.0
+        for item, duration in zip(dialogue_audio, durations):
+            dialogues.append({
+                'index': item['index'],
+                'start': offset,
+                'end': offset + duration,
+                'audio': os.path.basename(item['audio_path'])
+            })
+            offset += duration
+
+        narration_map = {
+            'narration': os.path.basename(output_file),
+            'duration': offset,
+            'dialogues': dialogues,
+            'sources': sources
+        }
+        self._write_file(map_file, json.dumps(narration_map, ensure_ascii=False, indent=2).encode('utf-8'))
+        logger.info(f"旁白生成完成: {output_file}，{len(dialogues)} 段对话，总时长 {offset:.2f}s")
+        return map_file
+
+    def _generate_chunked_audio(self, chunks: List[str], output_file: str, voice: str,
+                                subtitle_info: Dict) -> Optional[str]:
+        """
+        并行合成各分块，按帧拼接音频，并把各分块字幕按偏移合并，返回合并后的字幕文本
+        任一分块缺少字幕或字幕来自兜底策略时，subtitle_info['fallback'] 置为 True（整段结果不写入缓存）
+        """
+        logger.info(f"长文本分为 {len(chunks)} 块并行合成: {output_file}")
+        output_dir = os.path.dirname(os.path.abspath(output_file))
+        chunk_dir = tempfile.mkdtemp(prefix='tts_chunks_', dir=output_dir)
+        try:
+            chunk_files = [os.path.join(chunk_dir, f"chunk_{i}.mp3") for i in range(len(chunks))]
+            chunk_infos = [{} for _ in chunks]
+            results = self.generate_and_save_batch(
+                [{'text': chunk, 'output_file': path, 'subtitle_info': info}
+                 for chunk, path, info in zip(chunks, chunk_files, chunk_infos)],
+                voice=voice,
+                max_in_flight=len(chunks)
+            )
+            for path in chunk_files:
+                if isinstance(results.get(path), Exception):
+                    raise Exception(f"分块合成失败: {results[path]}")
+
+            tmp_output = f"{output_file}.part.mp3"
+            durations = concat_audio_files(chunk_files, tmp_output)
+            os.replace(tmp_output, output_file)
+
+            # 字幕按每块的起始偏移平移后合并
+            entries = []
+            offset = 0.0
+            for path, duration in zip(chunk_files, durations):
+                srt_path = results.get(path)
+                if srt_path and os.path.exists(srt_path):
+                    with open(srt_path, 'r', encoding='utf-8') as f:
+                        entries.extend(shift_srt_entries(parse_srt(f.read()), offset))
+                else:
+                    logger.warning(f"分块缺少字幕: {path}")
+                    subtitle_info['fallback'] = True
+                offset += duration
+            if any(info.get('fallback') for info in chunk_infos):
+                subtitle_info['fallback'] = True
+
+            return format_srt(entries) if entries else None
+        finally:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+
+    @staticmethod
+    def _write_file(path: str, data: bytes):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def generate_and_save_batch(self, items: List[Dict[str, str]],
+                                voice: str = "zh-CN-XiaoxiaoNeural",
+                                max_in_flight: int = TTS_MAX_IN_FLIGHT) -> Dict[str, object]:
+        """
+        并发生成多段语音并分别保存，同时在途的任务数不超过 max_in_flight
+
+        Args:
+            items: [{'text': 文本, 'output_file': 输出音频文件路径, 'subtitle_info': 可选，见 generate_and_save_audio}, ...]
+            voice: 语音类型
+            max_in_flight: 同时在途的 TTS 任务数上限
+
+        Returns:
+            {output_file: 字幕文件路径（可能为 None）或失败时的异常对象}
+        """
+        results: Dict[str, object] = {}
+        if not items:
+            return results
+
+        workers = max(1, min(max_in_flight, len(items)))
+        logger.info(f"并发生成 {len(items)} 段语音，最大并发数: {workers}")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tts') as executor:
+            futures = {
+                item['output_file']: executor.submit(self.generate_and_save_audio, item['text'], item['output_file'],
+                                                     voice, item.get('subtitle_info'))
+                for item in items
+            }
+            for output_file, future in futures.items():
+                try:
+                    results[output_file] = future.result()
+                except Exception as e:
+                    logger.error(f"生成音频失败 {output_file}: {e}")
+                    results[output_file] = e
+
+        return results
+
     def generate_story_audio(self, story_text: str, voice: str = "zh-HK-HiuMaanNeural") -> bytes:
         """
         生成故事音频
@@ -243,7 +673,7 @@ class TTSClient:
 
         # 每3行合并为一批处理
         batch_size = 3
-        audio_segments = []
+        audio_chunks = []
 
         for i in range(0, len(lines), batch_size):
             batch_lines = lines[i:i + batch_size]
@@ -251,22 +681,15 @@ class TTSClient:
 
             # 生成音频
             audio_data, _ = self.generate_speech(batch_text, voice)  # 忽略字幕
+            audio_chunks.append(audio_data)
 
-            # 转换为AudioSegment
-            import io
-            audio_segment = AudioSegment.from_file(io.BytesIO(audio_data), format="mp3")
-            audio_segments.append(audio_segment)
-
-        # 合并所有音频
-        combined = AudioSegment.empty()
-        for segment in audio_segments:
-            combined += segment
-
-        # 导出为字节数据
-        import io
-        output = io.BytesIO()
-        combined.export(output, format="mp3")
-        return output.getvalue()
+        # 合并所有音频：格式一致时按帧拼接（线性时间、不重新编码），否则解码后拼接
+        try:
+            combined, _ = concat_mp3_bytes(audio_chunks)
+            return combined
+        except ValueError as e:
+            logger.warning(f"无法按帧拼接，改为解码拼接: {e}")
+            return decode_concat_mp3_bytes(audio_chunks)
 
 
 # 简单的命令行接口
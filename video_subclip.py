@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按故事裁剪视频素材
+只保留故事实际用到的源时间范围（对齐到关键帧，流复制不重新编码），
+拼成一个紧凑的子片段，并给出原时间到子片段时间的映射
+"""
+
+import os
+import tempfile
+import subprocess
+import threading
+import logging
+from typing import List, Dict, Optional, Tuple
+
+from audio_utils import ffprobe_duration
+
+# 间隔小于该值（秒）的相邻范围合并为一段，避免切出大量碎片
+SUBCLIP_MERGE_GAP = 2.0
+
+logger = logging.getLogger(__name__)
+
+# 关键帧缓存：绝对路径 -> (大小, 修改时间, 关键帧时间列表)
+_keyframe_cache: Dict[str, Tuple[int, int, List[float]]] = {}
+_keyframe_cache_lock = threading.Lock()
+
+
+def probe_keyframes(video_path: str) -> List[float]:
+    """读取视频流的关键帧时间（秒），只读包信息不解码；同一文件只探测一次"""
+    st = os.stat(video_path)
+    key = os.path.abspath(video_path)
+    with _keyframe_cache_lock:
+        cached = _keyframe_cache.get(key)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+
+    cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+           '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', video_path]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    keyframes = []
+    for line in result.stdout.splitlines():
+        parts = line.strip().split(',')
+        if len(parts) >= 2 and 'K' in parts[1] and parts[0] not in ('', 'N/A'):
+            keyframes.append(float(parts[0]))
+    keyframes.sort()
+
+    with _keyframe_cache_lock:
+        _keyframe_cache[key] = (st.st_size, st.st_mtime_ns, keyframes)
+    return keyframes
+
+
+def plan_subclip_ranges(ranges: List[Tuple[float, float]], keyframes: List[float],
+                        merge_gap: float = SUBCLIP_MERGE_GAP) -> List[List[float]]:
+    """
+    计算需要切出的范围：合并相邻范围，起点向前对齐到关键帧，终点向后对齐到关键帧
+
+    Returns:
+        [[开始秒, 结束秒或 None（到文件末尾）], ...]，按时间排序且互不重叠
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start - merged[-1][1] <= merge_gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    planned = []
+    for start, end in merged:
+        snapped_start = max([k for k in keyframes if k <= start], default=0.0)
+        snapped_end = min([k for k in keyframes if k >= end], default=None)
+        if planned and (planned[-1][1] is None or snapped_start <= planned[-1][1]):
+            planned[-1][1] = None if planned[-1][1] is None or snapped_end is None else max(planned[-1][1], snapped_end)
+        else:
+            planned.append([snapped_start, snapped_end])
+    return planned
+
+
+def cut_subclip(video_path: str, ranges: List[Tuple[float, float]], output_path: str) -> List[Dict]:
+    """
+    把 ranges 覆盖的部分流复制到 output_path
+
+    Args:
+        ranges: 需要保留的源时间范围 [(开始秒, 结束秒), ...]
+
+    Returns:
+        片段映射 [{'source_start': 秒, 'source_end': 秒或 None, 'offset': 在子片段中的起点秒}, ...]
+    """
+    planned = plan_subclip_ranges(ranges, probe_keyframes(video_path))
+    ext = os.path.splitext(output_path)[1]
+    work_dir = tempfile.mkdtemp(prefix='subclip_', dir=os.path.dirname(os.path.abspath(output_path)))
+
+    try:
+        pieces = []
+        mapping = []
+        offset = 0.0
+        for i, (start, end) in enumerate(planned):
+            piece = os.path.join(work_dir, f"piece_{i}{ext}")
+            cmd = ['ffmpeg', '-v', 'error', '-ss', f"{start:.6f}", '-i', video_path]
+            if end is not None:
+                cmd += ['-t', f"{end - start:.6f}"]
+            cmd += ['-map', '0', '-c', 'copy', '-avoid_negative_ts', 'make_zero', '-y', piece]
+            subprocess.run(cmd, capture_output=True, check=True)
+
+            mapping.append({'source_start': start, 'source_end': end, 'offset': offset})
+            pieces.append(piece)
+            piece_duration = ffprobe_duration(piece)
+            offset += piece_duration if piece_duration is not None else (end - start if end is not None else 0.0)
+
+        tmp_output = os.path.join(work_dir, f"output{ext}")
+        if len(pieces) == 1:
+            os.replace(pieces[0], tmp_output)
+        else:
+            list_file = os.path.join(work_dir, 'pieces.txt')
+            with open(list_file, 'w', encoding='utf-8') as f:
+                for piece in pieces:
+                    escaped = os.path.abspath(piece).replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+            cmd = ['ffmpeg', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_file,
+                   '-map', '0', '-c', 'copy', '-y', tmp_output]
+            subprocess.run(cmd, capture_output=True, check=True)
+        os.replace(tmp_output, output_path)
+    finally:
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+
+    logger.info(f"裁剪视频素材: {len(ranges)} 个范围 -> {len(planned)} 段, {os.path.basename(output_path)}")
+    return mapping
+
+
+def map_source_time(mapping: List[Dict], source_time: float) -> Optional[float]:
+    """原视频时间 -> 子片段时间，不在任何保留范围内时返回 None"""
+    for piece in mapping:
+        end = piece['source_end']
+        if piece['source_start'] <= source_time and (end is None or source_time < end):
+            return piece['offset'] + source_time - piece['source_start']
+    return None
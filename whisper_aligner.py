@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内 Whisper 字幕对齐服务
+模型常驻内存，后台线程成批处理请求，结果按音频内容哈希缓存
+用于 TTS 服务未返回字幕时的兜底
+"""
+
+import os
+import queue
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional, Dict, List
+
+from srt_utils import format_srt
+
+# 模型名称和设备（设备为空时由 whisper 自动选择）
+WHISPER_ALIGN_MODEL = os.environ.get('WHISPER_ALIGN_MODEL', 'base')
+WHISPER_ALIGN_DEVICE = os.environ.get('WHISPER_ALIGN_DEVICE') or None
+
+# 单批最多处理的音频数
+WHISPER_ALIGN_BATCH_SIZE = 8
+
+# 对齐结果的磁盘缓存目录
+WHISPER_ALIGN_CACHE_DIR = os.environ.get('WHISPER_ALIGN_CACHE_DIR', './output/whisper_align_cache')
+
+# 内存中最多保留的对齐结果条数，超出时淘汰最久未用的（磁盘缓存不受影响）
+WHISPER_ALIGN_MEMORY_CACHE_SIZE = int(os.environ.get('WHISPER_ALIGN_MEMORY_CACHE_SIZE', '512'))
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(path: str) -> str:
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class WhisperAligner:
+    """常驻的 Whisper 对齐服务，进程内单例"""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> 'WhisperAligner':
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self, model_name: str = WHISPER_ALIGN_MODEL,
+                 device: Optional[str] = WHISPER_ALIGN_DEVICE,
+                 cache_dir: str = WHISPER_ALIGN_CACHE_DIR,
+                 batch_size: int = WHISPER_ALIGN_BATCH_SIZE,
+                 memory_cache_size: int = WHISPER_ALIGN_MEMORY_CACHE_SIZE):
+        self.model_name = model_name
+        self.device = device
+        self.cache_dir = cache_dir
+        self.batch_size = batch_size
+        self.memory_cache_size = memory_cache_size
+
+        self._model = None
+        self._memory_cache: 'OrderedDict[str, str]' = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def audio_to_srt(self, audio_path: str) -> Optional[str]:
+        """同步接口：返回逐词 SRT 文本，失败返回 None"""
+        try:
+            return self.submit(audio_path).result()
+        except Exception as e:
+            logger.error(f"Whisper 对齐失败 {audio_path}: {e}")
+            return None
+
+    def submit(self, audio_path: str) -> Future:
+        """提交一个音频，返回 SRT 文本的 Future"""
+        future = Future()
+        audio_hash = file_sha256(audio_path)
+
+        cached = self._get_cached(audio_hash)
+        if cached is not None:
+            logger.info(f"Whisper 对齐缓存命中: {audio_hash[:12]}")
+            future.set_result(cached)
+            return future
+
+        self._ensure_worker()
+        self._requests.put((audio_hash, audio_path, future))
+        return future
+
+    def _cache_path(self, audio_hash: str) -> str:
+        return os.path.join(self.cache_dir, audio_hash[:2], f"{audio_hash}.srt")
+
+    def _remember(self, audio_hash: str, srt_content: str):
+        """写入内存缓存，超出条数上限时淘汰最久未用的"""
+        with self._memory_lock:
+            self._memory_cache[audio_hash] = srt_content
+            self._memory_cache.move_to_end(audio_hash)
+            while len(self._memory_cache) > self.memory_cache_size:
+                self._memory_cache.popitem(last=False)
+
+    def _get_cached(self, audio_hash: str) -> Optional[str]:
+        with self._memory_lock:
+            if audio_hash in self._memory_cache:
+                self._memory_cache.move_to_end(audio_hash)
+                return self._memory_cache[audio_hash]
+
+        cache_path = self._cache_path(audio_hash)
+        if os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                srt_content = f.read()
+            self._remember(audio_hash, srt_content)
+            return srt_content
+        return None
+
+    def _put_cached(self, audio_hash: str, srt_content: str):
+        self._remember(audio_hash, srt_content)
+        cache_path = self._cache_path(audio_hash)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(srt_content)
+        os.replace(tmp_path, cache_path)
+
+    def _ensure_worker(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='whisper-aligner', daemon=True)
+                self._thread.start()
+
+    def _load_model(self):
+        if self._model is None:
+            import whisper
+            logger.info(f"加载 Whisper 模型: {self.model_name}")
+            self._model = whisper.load_model(self.model_name, device=self.device)
+        return self._model
+
+    def _run(self):
+        while True:
+            # 阻塞等待第一个请求，再把队列中已有的请求凑成一批
+            batch = [self._requests.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._requests.get_nowait())
+                except queue.Empty:
+                    break
+
+            # 同一音频只转录一次；已被调用方取消的请求直接丢弃，其余标记为运行中后不能再被取消
+            grouped: Dict[str, List] = {}
+            for audio_hash, audio_path, future in batch:
+                if future.set_running_or_notify_cancel():
+                    grouped.setdefault(audio_hash, []).append((audio_path, future))
+            if not grouped:
+                continue
+
+            logger.info(f"Whisper 对齐批次: {len(batch)} 个请求, {len(grouped)} 个不同音频")
+            for audio_hash, waiters in grouped.items():
+                try:
+                    srt_content = self._get_cached(audio_hash)
+                    if srt_content is None:
+                        srt_content = self._transcribe(waiters[0][0])
+                        self._put_cached(audio_hash, srt_content)
+                    for _, future in waiters:
+                        future.set_result(srt_content)
+                except Exception as e:
+                    for _, future in waiters:
+                        if not future.done():
+                            future.set_exception(e)
+
+    def _transcribe(self, audio_path: str) -> str:
+        """转录单个音频为每行一个词的 SRT，与 whisper 命令行 --max_words_per_line 1 的输出一致"""
+        model = self._load_model()
+        result = model.transcribe(audio_path, language='en', word_timestamps=True, verbose=None)
+
+        entries = []
+        for segment in result.get('segments', []):
+            for word in segment.get('words', []):
+                text = word['word'].strip().replace('-->', '->')
+                if text:
+                    entries.append({'start': word['start'], 'end': word['end'], 'text': text})
+
+        if not entries:
+            raise ValueError("Whisper 未识别到任何词")
+        return format_srt(entries)